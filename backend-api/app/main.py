@@ -1,24 +1,37 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import Session, sessionmaker
-from pydantic import BaseModel, Field
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List
-from datetime import datetime
-import os
-import secrets
-
-# Database setup
-DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://amoghdagar@localhost/university_db")
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from datetime import datetime, timezone
+import csv
+
+from app import queries
+from app.database import DBSession, get_db, dispose_engines, pool_stats, request_engine, statement_stats, warm_pool
+from app.queries import statements
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_condition, split_page
+from app.utils.stats import dashboard_stats, reconcile_stats
+from app.utils.user_import import detect_format, import_users, parse_upload
+from app.utils.enrollments import enroll_pairs, parse_pairs_csv
+from app.utils.registrations import REVIEW_BATCH_MAX, review_registrations
+from app.utils.export import export_response
+from app.utils.auth import (
+    STREAM_TOKEN_EXPIRE_SECONDS, TokenUser, create_access_token, create_stream_token, get_current_user,
+    get_stream_user, require_roles, revocations,
+)
+from app.utils.passwords import password_hasher
+from app.utils.last_login import last_logins
+from app.utils.feed import feed_query, student_access
+from app.utils.search import WINDOW_ATTRS, search_query
+from app.utils.conditional import check_not_modified, make_etag, table_versions
+from app.utils.responses import json_response, records
+from app.utils.compression import RESPONSE_COMPRESSION, CompressionMiddleware
+from app.utils.metrics import METRICS_ENABLED, MetricsMiddleware, cache_lines, pool_lines, request_metrics
+from app.utils.slow_queries import SLOW_QUERY_MS, slow_queries
+from app.utils.notifications import pg_listener
+from app.utils.invalidation import CACHE_INVALIDATION, cache_invalidation
+from app.utils.content_stream import CONTENT_STREAM, content_streams
 
 app = FastAPI(title="University LMS API v3.0", version="3.0.0")
 
@@ -30,8 +43,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
+
+# Outermost, so latency includes compression and every other middleware
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    request_metrics.install(request_engine())
+
+if SLOW_QUERY_MS > 0:
+    slow_queries.install(request_engine())
+
+# Both ride on the worker's single LISTEN connection
+if CACHE_INVALIDATION:
+    cache_invalidation.install(pg_listener)
+if CONTENT_STREAM:
+    content_streams.install(pg_listener)
+
+@app.on_event("startup")
+async def start_background_services():
+    await warm_pool()
+    revocations.start()
+    password_hasher.start()
+    last_logins.start()
+    slow_queries.start()
+    pg_listener.start()
+    if CONTENT_STREAM:
+        content_streams.start()
+
+@app.on_event("shutdown")
+async def shutdown_database():
+    await content_streams.stop()
+    await pg_listener.stop()
+    await slow_queries.stop()
+    await revocations.stop()
+    await last_logins.stop()
+    password_hasher.shutdown()
+    await dispose_engines()
+
 # ==================== Pydantic Models ====================
 
+def parse_due_date(value):
+    # asyncpg binds TIMESTAMP columns strictly: blank form values become NULL and
+    # timezone-aware inputs are stored as naive UTC, matching the column type
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 class LoginRequest(BaseModel):
     university_id: str
     password: str
@@ -88,6 +150,9 @@ class EnrollmentRequest(BaseModel):
     class_id: int
     student_id: int
 
+class BulkEnrollmentRequest(BaseModel):
+    enrollments: List[EnrollmentRequest]
+
 class CreateContentRequest(BaseModel):
     class_id: int
     title: str
@@ -95,14 +160,24 @@ class CreateContentRequest(BaseModel):
     description: Optional[str] = None
     content: Optional[str] = None
     visibility: str = Field(default="private", pattern="^(public|private|enrolled)$")
-    due_date: Optional[str] = None
+    due_date: Optional[datetime] = None
+
+    @field_validator("due_date", mode="before")
+    @classmethod
+    def normalize_due_date(cls, value):
+        return parse_due_date(value)
 
 class UpdateContentRequest(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     content: Optional[str] = None
     visibility: Optional[str] = None
-    due_date: Optional[str] = None
+    due_date: Optional[datetime] = None
+
+    @field_validator("due_date", mode="before")
+    @classmethod
+    def normalize_due_date(cls, value):
+        return parse_due_date(value)
 
 class UpdateVisibilityRequest(BaseModel):
     visibility: str = Field(..., pattern="^(public|private|enrolled)$")
@@ -124,44 +199,45 @@ class ApproveRegistrationRequest(BaseModel):
     registration_id: int
     approved: bool
 
-# Helper function to generate JWT (simple token for now)
-def create_access_token(user_id: int) -> str:
-    return f"token_{user_id}_{secrets.token_urlsafe(32)}"
+class ReviewRegistrationsRequest(BaseModel):
+    approved: bool
+    # Either these ids, or the oldest `limit` pending requests (optionally of one role)
+    registration_ids: Optional[List[int]] = Field(None, max_length=REVIEW_BATCH_MAX)
+    requested_role: Optional[str] = Field(None, pattern="^(student|professor|ta)$")
+    limit: int = Field(500, ge=1, le=REVIEW_BATCH_MAX)
 
-# Helper function to get current user from token (simplified)
-def get_current_user(token: str, db: Session) -> dict:
-    # In production, properly validate JWT
-    if not token or not token.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    # For now, extract user_id from token
-    # This is simplified - use proper JWT in production
-    return {"id": 1, "role": "admin"}  # Placeholder
+# Role checks read the signed token only; no per-request user lookup
+ADMIN_ONLY = [Depends(require_roles("admin"))]
+PROFESSOR_ONLY = [Depends(require_roles("professor"))]
+TEACHING_STAFF = [Depends(require_roles("professor", "ta"))]
+STUDENTS = [Depends(require_roles("student", "ta"))]
 
 # ==================== Authentication Endpoints ====================
 
 @app.post("/api/auth/login", response_model=LoginResponse)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
-    query = text("""
-        SELECT id, university_id, username, password, name, email, role, is_active
-        FROM users
-        WHERE university_id = :university_id AND is_active = true
-    """)
-    user = db.execute(query, {"university_id": request.university_id}).first()
+async def login(request: LoginRequest, db: DBSession = Depends(get_db)):
+    user = (await db.execute(queries.LOGIN_USER, {"university_id": request.university_id})).first()
 
-    if not user or user.password != request.password:
+    # bcrypt runs in the hashing pool; unknown ids are checked against a dummy hash
+    matches, new_hash = await password_hasher.verify(request.password, user.password if user else None)
+    if not user or not matches:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
 
-    # Update last login
-    db.execute(
-        text("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = :id"),
-        {"id": user.id}
-    )
-    db.commit()
+    if new_hash:
+        # Plaintext or outdated hash: store the fresh one unless the password changed meanwhile
+        await db.execute(
+            queries.REHASH_PASSWORD,
+            {"new_hash": new_hash, "id": user.id, "old_hash": user.password}
+        )
+        await db.commit()
 
-    access_token = create_access_token(user.id)
+    # Written in batches by the write-behind buffer, not on the login path
+    last_logins.record(user.id)
+
+    access_token = create_access_token(user.id, user.role)
 
     return LoginResponse(
         access_token=access_token,
@@ -177,124 +253,143 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
     )
 
 @app.post("/api/auth/logout")
-async def logout():
+async def logout(current_user: TokenUser = Depends(get_current_user), db: DBSession = Depends(get_db)):
+    revoked = await revocations.revoke_token(db, current_user)
+    await db.commit()
+    revocations.apply(*revoked)
     return {"message": "Logged out successfully"}
 
+# What each conflict reported by SUBMIT_REGISTRATION means to the applicant
+REGISTRATION_CONFLICTS = {
+    "university_id": "An account with this university ID already exists",
+    "username": "This username is already taken",
+    "email": "An account with this email already exists",
+    "pending_university_id": "A pending registration with this university ID already exists",
+    "pending_email": "A pending registration with this email already exists",
+    "pending": "A pending registration with this university ID or email already exists",
+}
+
 @app.post("/api/auth/register")
-async def register(request: RegistrationRequest, db: Session = Depends(get_db)):
+async def register(request: RegistrationRequest, db: DBSession = Depends(get_db)):
     """Submit a registration request for admin approval"""
+    password_hash = await password_hasher.hash(request.password)
     try:
-        # Check if university_id or email already exists in users or pending_registrations
-        existing_user = db.execute(
-            text("SELECT id FROM users WHERE university_id = :uid OR email = :email"),
-            {"uid": request.university_id, "email": request.email}
-        ).first()
-
-        if existing_user:
-            raise HTTPException(status_code=400, detail="University ID or email already exists")
-
-        existing_pending = db.execute(
-            text("SELECT id FROM pending_registrations WHERE university_id = :uid OR email = :email AND status = 'pending'"),
-            {"uid": request.university_id, "email": request.email}
-        ).first()
-
-        if existing_pending:
-            raise HTTPException(status_code=400, detail="A pending registration with this ID or email already exists")
-
-        # Insert registration request
-        query = text("""
-            INSERT INTO pending_registrations (university_id, username, password, name, email, requested_role, reason)
-            VALUES (:university_id, :username, :password, :name, :email, :requested_role, :reason)
-            RETURNING id
-        """)
-        result = db.execute(query, {
+        # Duplicate checks and the insert are one statement, backed by unique indexes
+        result = (await db.execute(queries.SUBMIT_REGISTRATION, {
             "university_id": request.university_id,
             "username": request.username,
-            "password": request.password,
+            "password": password_hash,
             "name": request.name,
             "email": request.email,
             "requested_role": request.requested_role,
             "reason": request.reason
-        }).first()
-        db.commit()
-
-        return {
-            "message": "Registration request submitted successfully. Please wait for admin approval.",
-            "registration_id": result.id
-        }
-    except HTTPException:
-        raise
+        })).first()
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
+    if result.conflict is not None:
+        raise HTTPException(status_code=400, detail=REGISTRATION_CONFLICTS[result.conflict])
+    return {
+        "message": "Registration request submitted successfully. Please wait for admin approval.",
+        "registration_id": result.id
+    }
+
 # ==================== Admin Endpoints ====================
 
-@app.get("/api/admin/dashboard")
-async def get_admin_dashboard(db: Session = Depends(get_db)):
-    stats_query = text("""
-        SELECT
-            (SELECT COUNT(*) FROM users WHERE role != 'admin') as total_users,
-            (SELECT COUNT(*) FROM users WHERE role = 'student') as total_students,
-            (SELECT COUNT(*) FROM users WHERE role = 'professor') as total_professors,
-            (SELECT COUNT(*) FROM classes) as total_classes,
-            (SELECT COUNT(*) FROM enrollments) as total_enrollments,
-            (SELECT COUNT(*) FROM course_content) as total_content
-    """)
-    stats = db.execute(stats_query).first()
-
-    return DashboardStats(
-        total_users=stats.total_users,
-        total_students=stats.total_students,
-        total_professors=stats.total_professors,
-        total_classes=stats.total_classes,
-        total_enrollments=stats.total_enrollments,
-        total_content=stats.total_content
-    )
+def _dashboard_fields(stats: dict) -> dict:
+    return {field: stats.get(field, 0) for field in DashboardStats.model_fields}
+
+@app.get("/api/admin/dashboard", dependencies=ADMIN_ONLY)
+async def get_admin_dashboard(db: DBSession = Depends(get_db)):
+    # Counters are maintained by triggers on the underlying tables
+    return DashboardStats(**_dashboard_fields(await dashboard_stats.get(db)))
+
+@app.post("/api/admin/stats/reconcile", dependencies=ADMIN_ONLY)
+async def reconcile_dashboard_stats(db: DBSession = Depends(get_db)):
+    """Rebuild the dashboard counters from full table counts"""
+    return DashboardStats(**_dashboard_fields(await reconcile_stats(db)))
+
+@app.get("/api/admin/last-login-buffer", dependencies=ADMIN_ONLY)
+async def get_last_login_buffer_stats():
+    """Write-behind counters for last_login: pending, written, dropped, delayed"""
+    return last_logins.stats()
+
+@app.get("/api/admin/statement-cache", dependencies=ADMIN_ONLY)
+async def get_statement_cache_stats():
+    """Hit/miss counters for compiled SQL, prepared statements and assembled filter statements"""
+    return {**statement_stats.stats(), "dynamic": statements.stats()}
+
+@app.get("/api/admin/pool", dependencies=ADMIN_ONLY)
+async def get_pool_stats():
+    """Connection pool occupancy, checkout wait times, overflow events and timeouts"""
+    return pool_stats()
+
+@app.get("/api/admin/slow-queries", dependencies=ADMIN_ONLY)
+async def get_slow_queries(limit: int = Query(50, ge=1, le=500)):
+    """Recent statements over SLOW_QUERY_MS, newest first, with sampled EXPLAIN plans"""
+    return {**slow_queries.stats(), "queries": slow_queries.entries(limit)}
+
+@app.get("/api/admin/caches", dependencies=ADMIN_ONLY)
+async def get_cache_stats():
+    """In-process cache sizes and hit rates, and the invalidation listener's state"""
+    return cache_invalidation.stats()
+
+@app.get("/api/admin/content-stream", dependencies=ADMIN_ONLY)
+async def get_content_stream_stats():
+    """Open content streams, events fanned out, slow readers dropped and resumes"""
+    return content_streams.stats()
+
+@app.get("/api/admin/users", dependencies=ADMIN_ONLY)
+async def get_all_users(
+    role: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: DBSession = Depends(get_db)
+):
+    conditions = []
+    params = {"limit": limit + 1}
 
-@app.get("/api/admin/users")
-async def get_all_users(role: Optional[str] = None, db: Session = Depends(get_db)):
     if role:
-        query = text("SELECT * FROM users WHERE role = :role ORDER BY created_at DESC")
-        users = db.execute(query, {"role": role}).fetchall()
-    else:
-        query = text("SELECT * FROM users ORDER BY created_at DESC")
-        users = db.execute(query).fetchall()
+        conditions.append("role = :role")
+        params["role"] = role
+    cursor_condition = keyset_condition("created_at", "id", after, params)
+    if cursor_condition:
+        conditions.append(cursor_condition)
 
-    return {
-        "users": [
-            {
-                "id": u.id,
-                "university_id": u.university_id,
-                "username": u.username,
-                "name": u.name,
-                "email": u.email,
-                "role": u.role,
-                "is_active": u.is_active,
-                "created_at": u.created_at.isoformat() if u.created_at else None
-            }
-            for u in users
-        ]
-    }
+    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    query = statements.text(f"""
+        SELECT id, university_id, username, name, email, role, is_active, created_at
+        FROM users
+        {where_clause}
+        ORDER BY created_at DESC, id DESC
+        LIMIT :limit
+    """)
+    users, next_cursor = split_page((await db.execute(query, params)).fetchall(), limit)
 
-@app.post("/api/admin/users/create")
-async def create_user(request: CreateUserRequest, db: Session = Depends(get_db)):
+    return json_response({"users": records(users), "next_cursor": next_cursor})
+
+@app.post("/api/admin/users/create", dependencies=ADMIN_ONLY)
+async def create_user(
+    request: CreateUserRequest,
+    current_user: TokenUser = Depends(get_current_user),
+    db: DBSession = Depends(get_db)
+):
+    password_hash = await password_hasher.hash(request.password)
     try:
-        query = text("""
-            INSERT INTO users (university_id, username, password, name, email, role, created_by)
-            VALUES (:university_id, :username, :password, :name, :email, :role, :created_by)
-            RETURNING id, university_id, username, name, email, role, is_active
-        """)
-        user = db.execute(query, {
+        user = (await db.execute(queries.INSERT_USER, {
             "university_id": request.university_id,
             "username": request.username,
-            "password": request.password,
+            "password": password_hash,
             "name": request.name,
             "email": request.email,
             "role": request.role,
-            "created_by": 1  # Admin user
-        }).first()
-        db.commit()
+            "created_by": current_user.id
+        })).first()
+        await db.commit()
+        dashboard_stats.invalidate()
 
         return {
             "id": user.id,
@@ -306,11 +401,46 @@ async def create_user(request: CreateUserRequest, db: Session = Depends(get_db))
             "is_active": user.is_active
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.patch("/api/admin/users/{user_id}")
-async def update_user(user_id: int, request: UpdateUserRequest, db: Session = Depends(get_db)):
+@app.post("/api/admin/users/import", dependencies=ADMIN_ONLY)
+async def import_users_bulk(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    current_user: TokenUser = Depends(get_current_user),
+    db: DBSession = Depends(get_db)
+):
+    """Bulk-create users from a CSV or NDJSON upload.
+
+    Rows need university_id, username, password (a bcrypt hash, so the import
+    never takes the login hashing pool), name, email and role. Invalid or
+    conflicting rows are reported individually; the rest are inserted.
+    """
+    fmt = format or detect_format(file.filename, file.content_type)
+    try:
+        rows, errors, received = await run_in_threadpool(parse_upload, file.file, fmt)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read {fmt} upload: {e}")
+
+    try:
+        rejected = await import_users(db, rows, created_by=current_user.id) if rows else []
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    dashboard_stats.invalidate()
+
+    errors = sorted(errors + rejected, key=lambda error: error["line"])
+    return {
+        "received": received,
+        "inserted": len(rows) - len(rejected),
+        "failed": len(errors),
+        "errors": errors
+    }
+
+@app.patch("/api/admin/users/{user_id}", dependencies=ADMIN_ONLY)
+async def update_user(user_id: int, request: UpdateUserRequest, db: DBSession = Depends(get_db)):
     updates = []
     params = {"user_id": user_id}
 
@@ -327,66 +457,66 @@ async def update_user(user_id: int, request: UpdateUserRequest, db: Session = De
     if not updates:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    query = text(f"UPDATE users SET {', '.join(updates)} WHERE id = :user_id RETURNING id")
-    result = db.execute(query, params).first()
+    query = statements.text(f"UPDATE users SET {', '.join(updates)} WHERE id = :user_id RETURNING id")
+    result = (await db.execute(query, params)).first()
 
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
 
-    db.commit()
+    revoked = await revocations.revoke_user(db, user_id) if request.is_active is False else None
+    await db.commit()
+    if revoked is not None:
+        revocations.apply(*revoked)
     return {"message": "User updated successfully"}
 
-@app.post("/api/admin/users/{user_id}/reset-password")
-async def reset_user_password(user_id: int, request: ResetPasswordRequest, db: Session = Depends(get_db)):
-    query = text("UPDATE users SET password = :password WHERE id = :user_id RETURNING id")
-    result = db.execute(query, {"password": request.new_password, "user_id": user_id}).first()
+@app.post("/api/admin/users/{user_id}/reset-password", dependencies=ADMIN_ONLY)
+async def reset_user_password(user_id: int, request: ResetPasswordRequest, db: DBSession = Depends(get_db)):
+    password_hash = await password_hasher.hash(request.new_password)
+    result = (await db.execute(queries.RESET_PASSWORD, {"password": password_hash, "user_id": user_id})).first()
 
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
 
-    db.commit()
+    revoked = await revocations.revoke_user(db, user_id)
+    await db.commit()
+    revocations.apply(*revoked)
     return {"message": "Password reset successfully"}
 
-@app.get("/api/admin/classes")
-async def get_all_classes(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT c.*, u.name as professor_name,
-               (SELECT COUNT(*) FROM enrollments WHERE class_id = c.id) as enrollment_count
+@app.get("/api/admin/classes", dependencies=ADMIN_ONLY)
+async def get_all_classes(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: DBSession = Depends(get_db)
+):
+    versions = await table_versions(db, ("classes", "class_counts", "users"))
+    not_modified = check_not_modified(request, response, make_etag("admin-classes", versions.tag), versions.changed_at)
+    if not_modified:
+        return not_modified
+
+    params = {"limit": limit + 1}
+    cursor_condition = keyset_condition("c.created_at", "c.id", after, params)
+    where_clause = f"WHERE {cursor_condition}" if cursor_condition else ""
+
+    query = statements.text(f"""
+        SELECT c.id, c.class_code, c.title, c.description, c.professor_id, c.term, c.schedule,
+               c.location, c.max_students, c.is_active, c.enrollment_count, c.created_at,
+               u.name as professor_name
         FROM classes c
         LEFT JOIN users u ON c.professor_id = u.id
-        ORDER BY c.created_at DESC
+        {where_clause}
+        ORDER BY c.created_at DESC, c.id DESC
+        LIMIT :limit
     """)
-    classes = db.execute(query).fetchall()
+    classes, next_cursor = split_page((await db.execute(query, params)).fetchall(), limit)
 
-    return {
-        "classes": [
-            {
-                "id": c.id,
-                "class_code": c.class_code,
-                "title": c.title,
-                "description": c.description,
-                "professor_id": c.professor_id,
-                "professor_name": c.professor_name,
-                "term": c.term,
-                "schedule": c.schedule,
-                "location": c.location,
-                "max_students": c.max_students,
-                "is_active": c.is_active,
-                "enrollment_count": c.enrollment_count
-            }
-            for c in classes
-        ]
-    }
+    return json_response({"classes": records(classes), "next_cursor": next_cursor}, response)
 
-@app.post("/api/admin/classes/create")
-async def create_class(request: CreateClassRequest, db: Session = Depends(get_db)):
+@app.post("/api/admin/classes/create", dependencies=ADMIN_ONLY)
+async def create_class(request: CreateClassRequest, db: DBSession = Depends(get_db)):
     try:
-        query = text("""
-            INSERT INTO classes (class_code, title, description, professor_id, term, schedule, location, max_students)
-            VALUES (:class_code, :title, :description, :professor_id, :term, :schedule, :location, :max_students)
-            RETURNING id, class_code, title
-        """)
-        cls = db.execute(query, {
+        cls = (await db.execute(queries.INSERT_CLASS, {
             "class_code": request.class_code,
             "title": request.title,
             "description": request.description,
@@ -395,67 +525,112 @@ async def create_class(request: CreateClassRequest, db: Session = Depends(get_db
             "schedule": request.schedule,
             "location": request.location,
             "max_students": request.max_students
-        }).first()
-        db.commit()
+        })).first()
+        await db.commit()
+        dashboard_stats.invalidate()
 
         return {"id": cls.id, "class_code": cls.class_code, "title": cls.title}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/api/admin/enrollments/create")
-async def enroll_student(request: EnrollmentRequest, db: Session = Depends(get_db)):
+@app.post("/api/admin/enrollments/create", dependencies=ADMIN_ONLY)
+async def enroll_student(request: EnrollmentRequest, db: DBSession = Depends(get_db)):
     try:
-        query = text("""
-            INSERT INTO enrollments (class_id, student_id)
-            VALUES (:class_id, :student_id)
-            RETURNING id
-        """)
-        enrollment = db.execute(query, {
+        # Lock the class row so concurrent enrollments can't overshoot max_students
+        enrollment = (await db.execute(queries.ENROLL_STUDENT, {
             "class_id": request.class_id,
             "student_id": request.student_id
-        }).first()
-        db.commit()
+        })).first()
+
+        if not enrollment:
+            await db.rollback()
+            exists = (await db.execute(
+                queries.CLASS_EXISTS, {"class_id": request.class_id}
+            )).first()
+            if not exists:
+                raise HTTPException(status_code=404, detail="Class not found")
+            raise HTTPException(status_code=409, detail="Class is at capacity")
+
+        await db.commit()
+        dashboard_stats.invalidate()
+        student_access.invalidate([request.student_id])
 
         return {"id": enrollment.id, "message": "Student enrolled successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/admin/classes/{class_id}/students")
-async def get_class_students(class_id: int, db: Session = Depends(get_db)):
-    query = text("""
-        SELECT u.id, u.university_id, u.name, u.email, e.enrolled_at, e.status
-        FROM enrollments e
-        JOIN users u ON e.student_id = u.id
-        WHERE e.class_id = :class_id
-        ORDER BY u.name
-    """)
-    students = db.execute(query, {"class_id": class_id}).fetchall()
+@app.post("/api/admin/enrollments/bulk", dependencies=ADMIN_ONLY)
+async def enroll_students_bulk(request: BulkEnrollmentRequest, db: DBSession = Depends(get_db)):
+    """Apply many enrollments in one transaction, respecting class capacity"""
+    pairs = [(e.class_id, e.student_id) for e in request.enrollments]
+    try:
+        summary = await enroll_pairs(db, pairs)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    dashboard_stats.invalidate()
+    student_access.invalidate({student_id for _, student_id in pairs})
+    return summary
 
-    return {
-        "students": [
-            {
-                "id": s.id,
-                "university_id": s.university_id,
-                "name": s.name,
-                "email": s.email,
-                "enrolled_at": s.enrolled_at.isoformat() if s.enrolled_at else None,
-                "status": s.status
-            }
-            for s in students
-        ]
-    }
+@app.delete("/api/admin/enrollments/{class_id}/{student_id}", dependencies=ADMIN_ONLY)
+async def drop_enrollment(class_id: int, student_id: int, db: DBSession = Depends(get_db)):
+    result = (await db.execute(queries.DROP_ENROLLMENT, {"class_id": class_id, "student_id": student_id})).first()
+
+    if not result:
+        raise HTTPException(status_code=404, detail="Enrollment not found")
 
-@app.get("/api/admin/content")
+    await db.commit()
+    dashboard_stats.invalidate()
+    student_access.invalidate([student_id])
+    return {"message": "Student dropped from class"}
+
+@app.post("/api/admin/enrollments/import", dependencies=ADMIN_ONLY)
+async def import_enrollments(file: UploadFile = File(...), db: DBSession = Depends(get_db)):
+    """Bulk enrollment from a CSV upload with class_id,student_id columns"""
+    try:
+        pairs, errors = await run_in_threadpool(parse_pairs_csv, file.file)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read csv upload: {e}")
+
+    try:
+        summary = await enroll_pairs(db, pairs)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    dashboard_stats.invalidate()
+    student_access.invalidate({student_id for _, student_id in pairs})
+    return {**summary, "errors": errors}
+
+@app.get("/api/admin/classes/{class_id}/students", dependencies=ADMIN_ONLY)
+async def get_class_students(class_id: int, db: DBSession = Depends(get_db)):
+    students = (await db.execute(queries.CLASS_STUDENTS, {"class_id": class_id})).fetchall()
+
+    return json_response({"students": records(students)})
+
+@app.get("/api/admin/content", dependencies=ADMIN_ONLY)
 async def get_all_content(
+    request: Request,
+    response: Response,
     class_id: Optional[int] = None,
     content_type: Optional[str] = None,
     visibility: Optional[str] = None,
-    db: Session = Depends(get_db)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: DBSession = Depends(get_db)
 ):
+    versions = await table_versions(db, ("course_content", "classes", "users"))
+    not_modified = check_not_modified(request, response, make_etag("admin-content", versions.tag), versions.changed_at)
+    if not_modified:
+        return not_modified
+
     conditions = []
-    params = {}
+    params = {"limit": limit + 1}
 
     if class_id:
         conditions.append("cc.class_id = :class_id")
@@ -466,222 +641,240 @@ async def get_all_content(
     if visibility:
         conditions.append("cc.visibility = :visibility")
         params["visibility"] = visibility
+    cursor_condition = keyset_condition("cc.created_at", "cc.id", after, params)
+    if cursor_condition:
+        conditions.append(cursor_condition)
 
     where_clause = " AND " + " AND ".join(conditions) if conditions else ""
 
-    query = text(f"""
-        SELECT cc.*, c.title as class_title, u.name as professor_name
+    query = statements.text(f"""
+        SELECT cc.id, cc.class_id, cc.title, cc.content_type, cc.visibility, cc.created_by, cc.created_at,
+               c.title as class_title, u.name as professor_name
         FROM course_content cc
         JOIN classes c ON cc.class_id = c.id
         JOIN users u ON cc.created_by = u.id
         WHERE 1=1 {where_clause}
-        ORDER BY cc.created_at DESC
+        ORDER BY cc.created_at DESC, cc.id DESC
+        LIMIT :limit
     """)
-    content = db.execute(query, params).fetchall()
+    content, next_cursor = split_page((await db.execute(query, params)).fetchall(), limit)
 
-    return {
-        "content": [
-            {
-                "id": item.id,
-                "class_id": item.class_id,
-                "class_title": item.class_title,
-                "title": item.title,
-                "content_type": item.content_type,
-                "visibility": item.visibility,
-                "created_by": item.created_by,
-                "professor_name": item.professor_name,
-                "created_at": item.created_at.isoformat() if item.created_at else None
-            }
-            for item in content
-        ]
-    }
+    return json_response({"content": records(content), "next_cursor": next_cursor}, response)
 
-@app.patch("/api/admin/content/{content_id}/visibility")
-async def update_content_visibility(content_id: int, request: UpdateVisibilityRequest, db: Session = Depends(get_db)):
-    query = text("UPDATE course_content SET visibility = :visibility WHERE id = :content_id RETURNING id")
-    result = db.execute(query, {"visibility": request.visibility, "content_id": content_id}).first()
+@app.patch("/api/admin/content/{content_id}/visibility", dependencies=ADMIN_ONLY)
+async def update_content_visibility(content_id: int, request: UpdateVisibilityRequest, db: DBSession = Depends(get_db)):
+    result = (await db.execute(queries.UPDATE_VISIBILITY, {"visibility": request.visibility, "content_id": content_id})).first()
 
     if not result:
         raise HTTPException(status_code=404, detail="Content not found")
 
-    db.commit()
+    await db.commit()
     return {"message": "Visibility updated successfully"}
 
-@app.get("/api/admin/pending-registrations")
-async def get_pending_registrations(status: Optional[str] = None, db: Session = Depends(get_db)):
-    """Get all pending registration requests"""
+@app.get("/api/admin/pending-registrations", dependencies=ADMIN_ONLY)
+async def get_pending_registrations(
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: DBSession = Depends(get_db)
+):
+    """Get pending registration requests, newest first, one page at a time"""
+    conditions = []
+    params = {"limit": limit + 1}
+
     if status:
-        query = text("""
-            SELECT * FROM pending_registrations
-            WHERE status = :status
-            ORDER BY requested_at DESC
-        """)
-        registrations = db.execute(query, {"status": status}).fetchall()
-    else:
-        query = text("SELECT * FROM pending_registrations ORDER BY requested_at DESC")
-        registrations = db.execute(query).fetchall()
+        conditions.append("status = :status")
+        params["status"] = status
+    cursor_condition = keyset_condition("requested_at", "id", after, params)
+    if cursor_condition:
+        conditions.append(cursor_condition)
+
+    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    query = statements.text(f"""
+        SELECT id, university_id, username, name, email, requested_role, reason, status,
+               requested_at, reviewed_at, review_note
+        FROM pending_registrations
+        {where_clause}
+        ORDER BY requested_at DESC, id DESC
+        LIMIT :limit
+    """)
+    registrations, next_cursor = split_page(
+        (await db.execute(query, params)).fetchall(), limit, sort_attr="requested_at"
+    )
 
-    return {
-        "registrations": [
-            {
-                "id": r.id,
-                "university_id": r.university_id,
-                "username": r.username,
-                "name": r.name,
-                "email": r.email,
-                "requested_role": r.requested_role,
-                "reason": r.reason,
-                "status": r.status,
-                "requested_at": r.requested_at.isoformat() if r.requested_at else None,
-                "reviewed_at": r.reviewed_at.isoformat() if r.reviewed_at else None
-            }
-            for r in registrations
-        ]
-    }
+    return json_response({"registrations": records(registrations), "next_cursor": next_cursor})
 
-@app.post("/api/admin/approve-registration")
-async def approve_registration(request: ApproveRegistrationRequest, db: Session = Depends(get_db)):
+@app.post("/api/admin/approve-registration", dependencies=ADMIN_ONLY)
+async def approve_registration(
+    request: ApproveRegistrationRequest,
+    current_user: TokenUser = Depends(get_current_user),
+    db: DBSession = Depends(get_db)
+):
     """Approve or reject a registration request"""
     try:
-        # Get the registration
-        reg_query = text("SELECT * FROM pending_registrations WHERE id = :id AND status = 'pending'")
-        registration = db.execute(reg_query, {"id": request.registration_id}).first()
-
-        if not registration:
-            raise HTTPException(status_code=404, detail="Registration not found or already processed")
-
-        if request.approved:
-            # Create the user account
-            user_query = text("""
-                INSERT INTO users (university_id, username, password, name, email, role, created_by)
-                VALUES (:university_id, :username, :password, :name, :email, :role, :created_by)
-                RETURNING id
-            """)
-            user = db.execute(user_query, {
-                "university_id": registration.university_id,
-                "username": registration.username,
-                "password": registration.password,
-                "name": registration.name,
-                "email": registration.email,
-                "role": registration.requested_role,
-                "created_by": 1  # Admin
-            }).first()
-
-            # Update registration status
-            update_query = text("""
-                UPDATE pending_registrations
-                SET status = 'approved', reviewed_by = :reviewed_by, reviewed_at = CURRENT_TIMESTAMP
-                WHERE id = :id
-            """)
-            db.execute(update_query, {"reviewed_by": 1, "id": request.registration_id})
-            db.commit()
-
-            return {
-                "message": "Registration approved and user account created",
-                "user_id": user.id
-            }
-        else:
-            # Reject the registration
-            update_query = text("""
-                UPDATE pending_registrations
-                SET status = 'rejected', reviewed_by = :reviewed_by, reviewed_at = CURRENT_TIMESTAMP
-                WHERE id = :id
-            """)
-            db.execute(update_query, {"reviewed_by": 1, "id": request.registration_id})
-            db.commit()
-
-            return {"message": "Registration rejected"}
+        summary = await review_registrations(db, current_user.id, request.approved, ids=[request.registration_id])
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
 
-    except HTTPException:
-        raise
+    result = summary["results"][0]
+    if result["outcome"] == "approved":
+        dashboard_stats.invalidate()
+        return {
+            "message": "Registration approved and user account created",
+            "user_id": result["user_id"]
+        }
+    if result["outcome"] == "rejected":
+        return {"message": "Registration rejected"}
+    if result["outcome"] == "conflict":
+        raise HTTPException(status_code=400, detail="University ID, username or email already exists; registration rejected")
+    if result["outcome"] == "locked":
+        raise HTTPException(status_code=409, detail="Registration is being reviewed by another admin")
+    raise HTTPException(status_code=404, detail="Registration not found or already processed")
+
+@app.post("/api/admin/registrations/review", dependencies=ADMIN_ONLY)
+async def review_registrations_batch(
+    request: ReviewRegistrationsRequest,
+    current_user: TokenUser = Depends(get_current_user),
+    db: DBSession = Depends(get_db)
+):
+    """Approve or reject many registration requests in one transaction, with an outcome per id"""
+    if request.registration_ids is not None and request.requested_role is not None:
+        raise HTTPException(status_code=400, detail="Give registration_ids or requested_role, not both")
+    try:
+        summary = await review_registrations(
+            db, current_user.id, request.approved,
+            ids=request.registration_ids, requested_role=request.requested_role, limit=request.limit,
+        )
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    if summary["approved"]:
+        dashboard_stats.invalidate()
+    return summary
+
+# ==================== Export Endpoints ====================
+
+EXPORT_FORMAT = Query("csv", pattern="^(csv|ndjson)$")
+
+@app.get("/api/admin/export/users", dependencies=ADMIN_ONLY)
+async def export_users(role: Optional[str] = None, format: str = EXPORT_FORMAT):
+    columns = ["id", "university_id", "username", "name", "email", "role", "is_active", "created_at", "last_login"]
+    where_clause = "WHERE role = :role" if role else ""
+    query = statements.text(f"""
+        SELECT {", ".join(columns)}
+        FROM users
+        {where_clause}
+        ORDER BY id
+    """)
+    return export_response(query, {"role": role} if role else None, columns, format, "users")
+
+@app.get("/api/admin/export/classes/{class_id}/students", dependencies=ADMIN_ONLY)
+async def export_class_students(class_id: int, format: str = EXPORT_FORMAT):
+    columns = ["id", "university_id", "name", "email", "enrolled_at", "status"]
+    return export_response(queries.EXPORT_CLASS_STUDENTS, {"class_id": class_id}, columns, format, f"class-{class_id}-roster")
+
+@app.get("/api/admin/export/content", dependencies=ADMIN_ONLY)
+async def export_content(
+    class_id: Optional[int] = None,
+    content_type: Optional[str] = None,
+    visibility: Optional[str] = None,
+    format: str = EXPORT_FORMAT
+):
+    conditions = []
+    params = {}
+
+    if class_id:
+        conditions.append("cc.class_id = :class_id")
+        params["class_id"] = class_id
+    if content_type:
+        conditions.append("cc.content_type = :content_type")
+        params["content_type"] = content_type
+    if visibility:
+        conditions.append("cc.visibility = :visibility")
+        params["visibility"] = visibility
+
+    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    columns = ["id", "class_id", "class_code", "title", "content_type", "visibility",
+               "created_by", "created_at", "updated_at", "due_date"]
+    query = statements.text(f"""
+        SELECT cc.id, cc.class_id, c.class_code, cc.title, cc.content_type, cc.visibility,
+               cc.created_by, cc.created_at, cc.updated_at, cc.due_date
+        FROM course_content cc
+        JOIN classes c ON cc.class_id = c.id
+        {where_clause}
+        ORDER BY cc.id
+    """)
+    return export_response(query, params, columns, format, "content")
 
 # ==================== Professor Endpoints ====================
 
-@app.get("/api/professor/my-classes")
-async def get_professor_classes(db: Session = Depends(get_db)):
+@app.get("/api/professor/my-classes", dependencies=TEACHING_STAFF)
+async def get_professor_classes(request: Request, response: Response, db: DBSession = Depends(get_db)):
+    versions = await table_versions(db, ("classes", "class_counts"))
+    not_modified = check_not_modified(request, response, make_etag("professor-classes", versions.tag), versions.changed_at)
+    if not_modified:
+        return not_modified
+
     # In production, get professor_id from auth token
     # For now, return all classes
-    query = text("""
-        SELECT c.*,
-               (SELECT COUNT(*) FROM enrollments WHERE class_id = c.id) as enrollment_count,
-               (SELECT COUNT(*) FROM course_content WHERE class_id = c.id) as content_count
-        FROM classes c
-        ORDER BY c.created_at DESC
-    """)
-    classes = db.execute(query).fetchall()
+    # enrollment_count / content_count are trigger-maintained columns on classes
+    classes = (await db.execute(queries.PROFESSOR_CLASSES)).fetchall()
 
-    return {
-        "classes": [
-            {
-                "id": c.id,
-                "class_code": c.class_code,
-                "title": c.title,
-                "description": c.description,
-                "term": c.term,
-                "schedule": c.schedule,
-                "location": c.location,
-                "max_students": c.max_students,
-                "enrollment_count": c.enrollment_count,
-                "content_count": c.content_count
-            }
-            for c in classes
-        ]
-    }
+    return json_response({"classes": records(classes)}, response)
 
-@app.get("/api/professor/classes/{class_id}/roster")
-async def get_professor_class_roster(class_id: int, db: Session = Depends(get_db)):
-    query = text("""
-        SELECT u.id, u.university_id, u.name, u.email
-        FROM enrollments e
-        JOIN users u ON e.student_id = u.id
-        WHERE e.class_id = :class_id AND e.status = 'active'
-        ORDER BY u.name
-    """)
-    students = db.execute(query, {"class_id": class_id}).fetchall()
+@app.get("/api/professor/classes/{class_id}/roster", dependencies=TEACHING_STAFF)
+async def get_professor_class_roster(class_id: int, db: DBSession = Depends(get_db)):
+    students = (await db.execute(queries.CLASS_ROSTER, {"class_id": class_id})).fetchall()
 
-    return {
-        "students": [
-            {"id": s.id, "university_id": s.university_id, "name": s.name, "email": s.email}
-            for s in students
-        ]
-    }
+    return json_response({"students": records(students)})
 
-@app.post("/api/professor/content/create")
-async def create_content(request: CreateContentRequest, db: Session = Depends(get_db)):
+@app.post("/api/professor/content/create", dependencies=TEACHING_STAFF)
+async def create_content(
+    request: CreateContentRequest,
+    current_user: TokenUser = Depends(get_current_user),
+    db: DBSession = Depends(get_db)
+):
     try:
-        query = text("""
-            INSERT INTO course_content (class_id, title, content_type, description, content, visibility, created_by, due_date)
-            VALUES (:class_id, :title, :content_type, :description, :content, :visibility, :created_by, :due_date)
-            RETURNING id, title
-        """)
-        content = db.execute(query, {
+        content = (await db.execute(queries.INSERT_CONTENT, {
             "class_id": request.class_id,
             "title": request.title,
             "content_type": request.content_type,
             "description": request.description,
             "content": request.content,
             "visibility": request.visibility,
-            "created_by": 1,  # In production, get from auth
+            "created_by": current_user.id,
             "due_date": request.due_date
-        }).first()
-        db.commit()
+        })).first()
+        await db.commit()
+        dashboard_stats.invalidate()
 
         return {"id": content.id, "title": content.title}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/professor/content")
+@app.get("/api/professor/content", dependencies=TEACHING_STAFF)
 async def get_professor_content(
+    request: Request,
+    response: Response,
     class_id: Optional[int] = None,
     content_type: Optional[str] = None,
-    db: Session = Depends(get_db)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: DBSession = Depends(get_db)
 ):
+    versions = await table_versions(db, ("course_content", "classes"))
+    not_modified = check_not_modified(request, response, make_etag("professor-content", versions.tag), versions.changed_at)
+    if not_modified:
+        return not_modified
+
     conditions = []
-    params = {}
+    params = {"limit": limit + 1}
 
     if class_id:
         conditions.append("cc.class_id = :class_id")
@@ -689,38 +882,27 @@ async def get_professor_content(
     if content_type:
         conditions.append("cc.content_type = :content_type")
         params["content_type"] = content_type
+    cursor_condition = keyset_condition("cc.created_at", "cc.id", after, params)
+    if cursor_condition:
+        conditions.append(cursor_condition)
 
     where_clause = " AND " + " AND ".join(conditions) if conditions else ""
 
-    query = text(f"""
-        SELECT cc.*, c.title as class_title, c.class_code
+    query = statements.text(f"""
+        SELECT cc.id, cc.class_id, cc.title, cc.content_type, cc.description, cc.visibility,
+               cc.created_at, cc.due_date, c.title as class_title, c.class_code
         FROM course_content cc
         JOIN classes c ON cc.class_id = c.id
         WHERE 1=1 {where_clause}
-        ORDER BY cc.created_at DESC
+        ORDER BY cc.created_at DESC, cc.id DESC
+        LIMIT :limit
     """)
-    content = db.execute(query, params).fetchall()
+    content, next_cursor = split_page((await db.execute(query, params)).fetchall(), limit)
 
-    return {
-        "content": [
-            {
-                "id": item.id,
-                "class_id": item.class_id,
-                "class_code": item.class_code,
-                "class_title": item.class_title,
-                "title": item.title,
-                "content_type": item.content_type,
-                "description": item.description,
-                "visibility": item.visibility,
-                "created_at": item.created_at.isoformat() if item.created_at else None,
-                "due_date": item.due_date.isoformat() if item.due_date else None
-            }
-            for item in content
-        ]
-    }
+    return json_response({"content": records(content), "next_cursor": next_cursor}, response)
 
-@app.patch("/api/professor/content/{content_id}")
-async def update_content(content_id: int, request: UpdateContentRequest, db: Session = Depends(get_db)):
+@app.patch("/api/professor/content/{content_id}", dependencies=TEACHING_STAFF)
+async def update_content(content_id: int, request: UpdateContentRequest, db: DBSession = Depends(get_db)):
     updates = []
     params = {"content_id": content_id}
 
@@ -746,178 +928,177 @@ async def update_content(content_id: int, request: UpdateContentRequest, db: Ses
     if not updates:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    query = text(f"UPDATE course_content SET {', '.join(updates)} WHERE id = :content_id RETURNING id")
-    result = db.execute(query, params).first()
+    query = statements.text(f"UPDATE course_content SET {', '.join(updates)} WHERE id = :content_id RETURNING id")
+    result = (await db.execute(query, params)).first()
 
     if not result:
         raise HTTPException(status_code=404, detail="Content not found")
 
-    db.commit()
+    await db.commit()
     return {"message": "Content updated successfully"}
 
-@app.delete("/api/professor/content/{content_id}")
-async def delete_content(content_id: int, db: Session = Depends(get_db)):
-    query = text("DELETE FROM course_content WHERE id = :content_id RETURNING id")
-    result = db.execute(query, {"content_id": content_id}).first()
+@app.delete("/api/professor/content/{content_id}", dependencies=TEACHING_STAFF)
+async def delete_content(content_id: int, db: DBSession = Depends(get_db)):
+    result = (await db.execute(queries.DELETE_CONTENT, {"content_id": content_id})).first()
 
     if not result:
         raise HTTPException(status_code=404, detail="Content not found")
 
-    db.commit()
+    await db.commit()
+    dashboard_stats.invalidate()
     return {"message": "Content deleted successfully"}
 
-@app.post("/api/professor/ta/assign")
-async def assign_ta(request: AssignTARequest, db: Session = Depends(get_db)):
+@app.post("/api/professor/ta/assign", dependencies=PROFESSOR_ONLY)
+async def assign_ta(
+    request: AssignTARequest,
+    current_user: TokenUser = Depends(get_current_user),
+    db: DBSession = Depends(get_db)
+):
     try:
-        query = text("""
-            INSERT INTO ta_assignments (class_id, ta_id, assigned_by)
-            VALUES (:class_id, :ta_id, :assigned_by)
-            RETURNING id
-        """)
-        ta = db.execute(query, {
+        ta = (await db.execute(queries.ASSIGN_TA, {
             "class_id": request.class_id,
             "ta_id": request.student_id,
-            "assigned_by": 1  # In production, get from auth
-        }).first()
-        db.commit()
+            "assigned_by": current_user.id
+        })).first()
+        await db.commit()
+        student_access.invalidate([request.student_id])
 
         return {"id": ta.id, "message": "TA assigned successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.delete("/api/professor/ta/{ta_id}")
-async def remove_ta(ta_id: int, db: Session = Depends(get_db)):
-    query = text("DELETE FROM ta_assignments WHERE id = :ta_id RETURNING id")
-    result = db.execute(query, {"ta_id": ta_id}).first()
+@app.delete("/api/professor/ta/{ta_id}", dependencies=PROFESSOR_ONLY)
+async def remove_ta(ta_id: int, db: DBSession = Depends(get_db)):
+    result = (await db.execute(queries.REMOVE_TA, {"ta_id": ta_id})).first()
 
     if not result:
         raise HTTPException(status_code=404, detail="TA assignment not found")
 
-    db.commit()
+    await db.commit()
+    student_access.invalidate([result.ta_id])
     return {"message": "TA removed successfully"}
 
-@app.get("/api/professor/classes/{class_id}/tas")
-async def get_class_tas(class_id: int, db: Session = Depends(get_db)):
-    query = text("""
-        SELECT ta.id as assignment_id, u.id, u.university_id, u.name, u.email, ta.assigned_at
-        FROM ta_assignments ta
-        JOIN users u ON ta.ta_id = u.id
-        WHERE ta.class_id = :class_id
-        ORDER BY u.name
-    """)
-    tas = db.execute(query, {"class_id": class_id}).fetchall()
+@app.get("/api/professor/classes/{class_id}/tas", dependencies=TEACHING_STAFF)
+async def get_class_tas(class_id: int, db: DBSession = Depends(get_db)):
+    tas = (await db.execute(queries.CLASS_TAS, {"class_id": class_id})).fetchall()
 
-    return {
-        "tas": [
-            {
-                "assignment_id": ta.assignment_id,
-                "id": ta.id,
-                "university_id": ta.university_id,
-                "name": ta.name,
-                "email": ta.email,
-                "assigned_at": ta.assigned_at.isoformat() if ta.assigned_at else None
-            }
-            for ta in tas
-        ]
-    }
+    return json_response({"tas": records(tas)})
 
-@app.get("/api/professor/available-tas")
-async def get_available_tas(db: Session = Depends(get_db)):
+@app.get("/api/professor/available-tas", dependencies=PROFESSOR_ONLY)
+async def get_available_tas(db: DBSession = Depends(get_db)):
     """Get all users who can be assigned as TAs (students and TAs)"""
-    query = text("""
-        SELECT id, university_id, username, name, email, role
-        FROM users
-        WHERE role IN ('student', 'ta') AND is_active = true
-        ORDER BY name
-    """)
-    users = db.execute(query).fetchall()
+    users = (await db.execute(queries.AVAILABLE_TAS)).fetchall()
 
-    return {
-        "users": [
-            {
-                "id": u.id,
-                "university_id": u.university_id,
-                "username": u.username,
-                "name": u.name,
-                "email": u.email,
-                "role": u.role
-            }
-            for u in users
-        ]
-    }
+    return json_response({"users": records(users)})
 
 # ==================== Student Endpoints ====================
 
-@app.get("/api/student/my-classes")
-async def get_student_classes(db: Session = Depends(get_db)):
+@app.get("/api/student/my-classes", dependencies=STUDENTS)
+async def get_student_classes(db: DBSession = Depends(get_db)):
     # In production, get student_id from auth token
     # For now, return empty array
     return {"classes": []}
 
-@app.get("/api/student/content")
+@app.get("/api/student/content", dependencies=STUDENTS)
 async def get_accessible_content(
+    request: Request,
+    response: Response,
     class_id: Optional[int] = None,
     content_type: Optional[str] = None,
     visibility: Optional[str] = None,
-    db: Session = Depends(get_db)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: TokenUser = Depends(get_current_user),
+    db: DBSession = Depends(get_db)
 ):
-    # In production, filter based on student's enrolled classes
-    # For now, return public content
-    conditions = ["cc.visibility = 'public'"]
-    params = {}
-
-    if class_id:
-        conditions.append("cc.class_id = :class_id")
-        params["class_id"] = class_id
-    if content_type:
-        conditions.append("cc.content_type = :content_type")
-        params["content_type"] = content_type
+    """Public content from every class, plus enrolled content from the
+    student's classes and private content from classes they TA"""
+    access = await student_access.get(db, current_user.id)
+    # The feed also depends on whose it is and which classes they can see
+    versions = await table_versions(db, ("course_content", "classes", "users"))
+    etag = make_etag("student-content", current_user.id, sorted(access.enrolled), sorted(access.ta), versions.tag)
+    not_modified = check_not_modified(request, response, etag, versions.changed_at)
+    if not_modified:
+        return not_modified
+
+    query, params = feed_query(access, limit, after, class_id, content_type, visibility)
+    rows = (await db.execute(query, params)).fetchall() if query is not None else []
+    content, next_cursor = split_page(rows, limit)
+
+    return json_response({"content": records(content), "next_cursor": next_cursor}, response)
+
+@app.post("/api/student/content/stream-token", dependencies=STUDENTS)
+async def issue_stream_token(current_user: TokenUser = Depends(get_current_user)):
+    """Short-lived token for ?access_token= on the content stream, which EventSource
+    needs because it can't send headers. Fetch a fresh one before each reconnect"""
+    return {"stream_token": create_stream_token(current_user), "expires_in": STREAM_TOKEN_EXPIRE_SECONDS}
+
+@app.get("/api/student/content/stream")
+async def stream_content_events(
+    request: Request,
+    last_event_id: Optional[int] = Query(None, ge=0),
+    current_user: TokenUser = Depends(get_stream_user),
+):
+    """Server-sent events for content the caller can see as it is created, updated,
+    hidden or deleted. Resumes after the Last-Event-ID header (or ?last_event_id=)"""
+    if current_user.role not in ("student", "ta"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+    if not CONTENT_STREAM:
+        raise HTTPException(status_code=404, detail="Content stream is disabled")
+    header = request.headers.get("last-event-id")
+    if header is not None:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    # No database session is held for the stream's lifetime; the hub opens
+    # short ones when it needs to read
+    return StreamingResponse(
+        content_streams.stream(current_user.id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    where_clause = " AND ".join(conditions)
+@app.get("/api/student/content/{content_id}", dependencies=STUDENTS)
+async def get_content_details(
+    content_id: int,
+    request: Request,
+    response: Response,
+    preview: Optional[int] = Query(None, ge=1),
+    current_user: TokenUser = Depends(get_current_user),
+    db: DBSession = Depends(get_db)
+):
+    """Get one content item with its body; `preview` returns only the first that many characters"""
+    # Access and freshness are settled from the row's header columns before
+    # the body is read
+    probe = (await db.execute(queries.CONTENT_VERSION, {"content_id": content_id})).first()
 
-    query = text(f"""
-        SELECT cc.*, c.title as class_title, c.class_code, u.name as professor_name
-        FROM course_content cc
-        JOIN classes c ON cc.class_id = c.id
-        JOIN users u ON cc.created_by = u.id
-        WHERE {where_clause}
-        ORDER BY cc.created_at DESC
-    """)
-    content = db.execute(query, params).fetchall()
+    # Content the student can't see is reported as missing rather than forbidden
+    if not probe:
+        raise HTTPException(status_code=404, detail="Content not found")
+    access = await student_access.get(db, current_user.id)
+    if not access.can_view(probe.class_id, probe.visibility):
+        raise HTTPException(status_code=404, detail="Content not found")
 
-    return {
-        "content": [
-            {
-                "id": item.id,
-                "class_id": item.class_id,
-                "class_code": item.class_code,
-                "class_title": item.class_title,
-                "title": item.title,
-                "content_type": item.content_type,
-                "description": item.description,
-                "professor_name": item.professor_name,
-                "created_at": item.created_at.isoformat() if item.created_at else None,
-                "due_date": item.due_date.isoformat() if item.due_date else None
-            }
-            for item in content
-        ]
-    }
+    versions = await table_versions(db, ("classes", "users"))
+    etag = make_etag("content", content_id, probe.updated_at.timestamp(), versions.tag)
+    not_modified = check_not_modified(request, response, etag, max(probe.updated_at, versions.changed_at))
+    if not_modified:
+        return not_modified
 
-@app.get("/api/student/content/{content_id}")
-async def get_content_details(content_id: int, db: Session = Depends(get_db)):
-    query = text("""
-        SELECT cc.*, c.title as class_title, c.class_code, u.name as professor_name
-        FROM course_content cc
-        JOIN classes c ON cc.class_id = c.id
-        JOIN users u ON cc.created_by = u.id
-        WHERE cc.id = :content_id
-    """)
-    content = db.execute(query, {"content_id": content_id}).first()
+    query = queries.CONTENT_PREVIEW if preview else queries.CONTENT_DETAIL
+    content = (await db.execute(query, {"content_id": content_id, "preview": preview})).first()
 
-    if not content:
+    # Deleted, or moved out of reach, since the probe
+    if not content or not access.can_view(content.class_id, content.visibility):
         raise HTTPException(status_code=404, detail="Content not found")
 
+    body = content.content
+    truncated = bool(preview and body and len(body) > preview)
+    if truncated:
+        body = body[:preview]
+
     return {
         "id": content.id,
         "class_id": content.class_id,
@@ -926,20 +1107,21 @@ async def get_content_details(content_id: int, db: Session = Depends(get_db)):
         "title": content.title,
         "content_type": content.content_type,
         "description": content.description,
-        "content": content.content,
+        "content": body,
+        "content_truncated": truncated,
         "visibility": content.visibility,
         "professor_name": content.professor_name,
         "created_at": content.created_at.isoformat() if content.created_at else None,
         "due_date": content.due_date.isoformat() if content.due_date else None
     }
 
-@app.get("/api/student/ta/my-assignments")
-async def get_my_ta_assignments(db: Session = Depends(get_db)):
+@app.get("/api/student/ta/my-assignments", dependencies=STUDENTS)
+async def get_my_ta_assignments(db: DBSession = Depends(get_db)):
     # In production, get student_id from auth token
     return {"assignments": []}
 
-@app.get("/api/student/dashboard")
-async def get_student_dashboard(db: Session = Depends(get_db)):
+@app.get("/api/student/dashboard", dependencies=STUDENTS)
+async def get_student_dashboard(db: DBSession = Depends(get_db)):
     # In production, get student_id from auth token
     return {
         "enrolled_classes": 0,
@@ -947,6 +1129,32 @@ async def get_student_dashboard(db: Session = Depends(get_db)):
         "upcoming_assignments": 0
     }
 
+# ==================== Search Endpoints ====================
+
+@app.get("/api/content/search")
+async def search_content(
+    q: str = Query(..., min_length=1, max_length=200),
+    class_id: Optional[int] = None,
+    content_type: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None,
+    current_user: TokenUser = Depends(get_current_user),
+    db: DBSession = Depends(get_db)
+):
+    """Ranked full-text search over content titles, descriptions and bodies.
+
+    Accepts web-search syntax ("quoted phrases", -excluded, or). Students and
+    TAs only match content they could open; matches are wrapped in <mark> tags.
+    """
+    # Students and TAs get the feed's visibility rules; professors and admins see every row
+    access = await student_access.get(db, current_user.id) if current_user.role in ("student", "ta") else None
+    query, params = search_query(q, limit, after, access, class_id, content_type)
+    results, next_cursor = split_page(
+        (await db.execute(query, params)).fetchall(), limit, sort_attr="rank", extra_attrs=WINDOW_ATTRS
+    )
+
+    return json_response({"results": records(results, exclude=WINDOW_ATTRS), "next_cursor": next_cursor})
+
 # ==================== Health Check ====================
 
 @app.get("/")
@@ -961,3 +1169,11 @@ async def root():
 @app.get("/api/health")
 async def health():
     return {"status": "healthy", "version": "3.0.0"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition for this worker"""
+    return PlainTextResponse(
+        request_metrics.render(pool_lines(pool_stats()) + cache_lines(cache_invalidation.stats())),
+        media_type="text/plain; version=0.0.4",
+    )
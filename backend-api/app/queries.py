@@ -0,0 +1,198 @@
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+from app.database import STATEMENT_CACHE_SIZE
+from app.utils.cache import LRUCache
+
+
+# SQL statements used by the endpoints in app.main. Fixed statements are
+# built once at import; statements assembled per request from optional filters
+# go through `statements`, which returns the same TextClause for the same SQL.
+# Identical SQL text is what lets SQLAlchemy reuse its compiled form and
+# asyncpg reuse the connection's server-side prepared statement.
+
+
+class StatementCache:
+    """Bounded cache of TextClauses keyed by their SQL."""
+
+    def __init__(self, maxsize: int):
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def text(self, sql: str) -> TextClause:
+        statement = self._cache.get(sql)
+        if statement is None:
+            statement = text(sql)
+            self._cache.set(sql, statement)
+        return statement
+
+    def stats(self) -> dict:
+        return {"size": len(self._cache), "hits": self._cache.hits, "misses": self._cache.misses}
+
+
+statements = StatementCache(STATEMENT_CACHE_SIZE)
+
+
+LOGIN_USER = text("""
+    SELECT id, university_id, username, password, name, email, role, is_active
+    FROM users
+    WHERE university_id = :university_id AND is_active = true
+""")
+
+REHASH_PASSWORD = text("UPDATE users SET password = :new_hash WHERE id = :id AND password = :old_hash")
+
+# Registration in one statement. Existing accounts are looked up by
+# university_id, username and email (each indexed); a request that clashes
+# with none is inserted, and the partial unique indexes on pending rows turn a
+# second pending request for the same university_id or email, concurrent ones
+# included, into a skipped insert. `conflict` names what clashed; a clash
+# with a request committed after this statement began shows up only as
+# 'pending', since the statement's snapshot can't see that row.
+SUBMIT_REGISTRATION = text("""
+    WITH account AS (
+        SELECT CASE
+                   WHEN EXISTS (SELECT 1 FROM users WHERE university_id = :university_id) THEN 'university_id'
+                   WHEN EXISTS (SELECT 1 FROM users WHERE username = :username) THEN 'username'
+                   WHEN EXISTS (SELECT 1 FROM users WHERE email = :email) THEN 'email'
+               END AS conflict
+    ),
+    inserted AS (
+        INSERT INTO pending_registrations (university_id, username, password, name, email, requested_role, reason)
+        SELECT :university_id, :username, :password, :name, :email, :requested_role, :reason
+        FROM account
+        WHERE account.conflict IS NULL
+        ON CONFLICT DO NOTHING
+        RETURNING id
+    )
+    SELECT inserted.id,
+           CASE
+               WHEN account.conflict IS NOT NULL THEN account.conflict
+               WHEN inserted.id IS NOT NULL THEN NULL
+               WHEN EXISTS (
+                   SELECT 1 FROM pending_registrations
+                   WHERE university_id = :university_id AND status = 'pending'
+               ) THEN 'pending_university_id'
+               WHEN EXISTS (
+                   SELECT 1 FROM pending_registrations
+                   WHERE email = :email AND status = 'pending'
+               ) THEN 'pending_email'
+               ELSE 'pending'
+           END AS conflict
+    FROM account
+    LEFT JOIN inserted ON true
+""")
+
+INSERT_USER = text("""
+    INSERT INTO users (university_id, username, password, name, email, role, created_by)
+    VALUES (:university_id, :username, :password, :name, :email, :role, :created_by)
+    RETURNING id, university_id, username, name, email, role, is_active
+""")
+
+RESET_PASSWORD = text("UPDATE users SET password = :password WHERE id = :user_id RETURNING id")
+
+INSERT_CLASS = text("""
+    INSERT INTO classes (class_code, title, description, professor_id, term, schedule, location, max_students)
+    VALUES (:class_code, :title, :description, :professor_id, :term, :schedule, :location, :max_students)
+    RETURNING id, class_code, title
+""")
+
+ENROLL_STUDENT = text("""
+    INSERT INTO enrollments (class_id, student_id)
+    SELECT c.id, :student_id
+    FROM (SELECT id, max_students, enrollment_count FROM classes WHERE id = :class_id FOR UPDATE) c
+    WHERE c.max_students IS NULL OR c.enrollment_count < c.max_students
+    RETURNING id
+""")
+
+CLASS_EXISTS = text("SELECT id FROM classes WHERE id = :class_id")
+
+DROP_ENROLLMENT = text(
+    "DELETE FROM enrollments WHERE class_id = :class_id AND student_id = :student_id RETURNING id"
+)
+
+CLASS_STUDENTS = text("""
+    SELECT u.id, u.university_id, u.name, u.email, e.enrolled_at, e.status
+    FROM enrollments e
+    JOIN users u ON e.student_id = u.id
+    WHERE e.class_id = :class_id
+    ORDER BY u.name
+""")
+
+UPDATE_VISIBILITY = text("""
+    UPDATE course_content SET visibility = :visibility, updated_at = CURRENT_TIMESTAMP
+    WHERE id = :content_id
+    RETURNING id
+""")
+
+EXPORT_CLASS_STUDENTS = text("""
+    SELECT u.id, u.university_id, u.name, u.email, e.enrolled_at, e.status
+    FROM enrollments e
+    JOIN users u ON e.student_id = u.id
+    WHERE e.class_id = :class_id
+    ORDER BY u.name
+""")
+
+PROFESSOR_CLASSES = text("""
+    SELECT c.id, c.class_code, c.title, c.description, c.term, c.schedule, c.location,
+           c.max_students, c.enrollment_count, c.content_count
+    FROM classes c
+    ORDER BY c.created_at DESC
+""")
+
+CLASS_ROSTER = text("""
+    SELECT u.id, u.university_id, u.name, u.email
+    FROM enrollments e
+    JOIN users u ON e.student_id = u.id
+    WHERE e.class_id = :class_id AND e.status = 'active'
+    ORDER BY u.name
+""")
+
+INSERT_CONTENT = text("""
+    INSERT INTO course_content (class_id, title, content_type, description, content, visibility, created_by, due_date)
+    VALUES (:class_id, :title, :content_type, :description, :content, :visibility, :created_by, :due_date)
+    RETURNING id, title
+""")
+
+DELETE_CONTENT = text("DELETE FROM course_content WHERE id = :content_id RETURNING id")
+
+ASSIGN_TA = text("""
+    INSERT INTO ta_assignments (class_id, ta_id, assigned_by)
+    VALUES (:class_id, :ta_id, :assigned_by)
+    RETURNING id
+""")
+
+REMOVE_TA = text("DELETE FROM ta_assignments WHERE id = :ta_id RETURNING id, ta_id")
+
+CLASS_TAS = text("""
+    SELECT ta.id as assignment_id, u.id, u.university_id, u.name, u.email, ta.assigned_at
+    FROM ta_assignments ta
+    JOIN users u ON ta.ta_id = u.id
+    WHERE ta.class_id = :class_id
+    ORDER BY u.name
+""")
+
+AVAILABLE_TAS = text("""
+    SELECT id, university_id, username, name, email, role
+    FROM users
+    WHERE role IN ('student', 'ta') AND is_active = true
+    ORDER BY name
+""")
+
+CONTENT_VERSION = text("""
+    SELECT class_id, visibility, CAST(coalesce(updated_at, created_at) AS TIMESTAMPTZ) AS updated_at
+    FROM course_content
+    WHERE id = :content_id
+""")
+
+_CONTENT_DETAIL = """
+    SELECT cc.id, cc.class_id, cc.title, cc.content_type, cc.description, {body} AS content,
+           cc.visibility, cc.created_at, cc.due_date,
+           c.title as class_title, c.class_code, u.name as professor_name
+    FROM course_content cc
+    JOIN classes c ON cc.class_id = c.id
+    JOIN users u ON cc.created_by = u.id
+    WHERE cc.id = :content_id
+"""
+CONTENT_DETAIL = text(_CONTENT_DETAIL.format(body="cc.content"))
+# left() reads only the leading chunks of a TOASTed body; one extra
+# character tells whether anything was cut off
+CONTENT_PREVIEW = text(_CONTENT_DETAIL.format(body="left(cc.content, :preview + 1)"))
@@ -1,59 +1,275 @@
+import asyncio
+import logging
+import os
+import secrets
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.member import Member
-
-SECRET_KEY = "cse412-lms-secret-key-change-in-production"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-security = HTTPBearer()
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        university_id: int = payload.get("sub")
-        if university_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-            )
-        return payload
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
+from sqlalchemy import text
+
+from app.database import DBSession, db_session
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+SECRET_KEY = os.getenv("SECRET_KEY", "cse412-lms-secret-key-change-in-production")
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", str(60 * 24 * 7)))  # 7 days
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "30"))
+# Lifetime of the stream-only tokens EventSource passes in the query string
+STREAM_TOKEN_EXPIRE_SECONDS = int(os.getenv("STREAM_TOKEN_EXPIRE_SECONDS", "60"))
+
+# Access tokens authenticate every endpoint; stream tokens only open event streams
+ACCESS_SCOPE = "access"
+STREAM_SCOPE = "stream"
+
+security = HTTPBearer(auto_error=False)
+
+
+class TokenUser(NamedTuple):
+    id: int
+    role: str
+    jti: str
+    issued_at: float
+    expires_at: int
+    scope: str = ACCESS_SCOPE
+
+
+class Revocation(NamedTuple):
+    """Revocations written in a transaction, applied locally once it commits."""
+    jtis: Tuple[str, ...]
+    cutoffs: Dict[int, float]
+
+
+def create_access_token(
+    user_id: int, role: str, expires_delta: Optional[timedelta] = None, scope: str = ACCESS_SCOPE
+) -> str:
+    """Issue a signed JWT carrying everything endpoints need about the caller."""
+    # iat keeps sub-second precision so a token issued right after a
+    # user-wide revocation isn't caught by it
+    now = time.time()
+    lifetime = expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = {
+        "sub": str(user_id),
+        "role": role,
+        "jti": secrets.token_urlsafe(16),
+        "iat": now,
+        "exp": int(now + lifetime.total_seconds()),
+        "scope": scope,
+    }
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+def create_stream_token(user: TokenUser) -> str:
+    """Issue a short-lived token that can only open event streams.
+
+    EventSource can't send headers, so its token travels in the query string
+    and ends up in access logs; this keeps the long-lived access token out of
+    them.
+    """
+    return create_access_token(
+        user.id, user.role, timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS), scope=STREAM_SCOPE
+    )
+
+
+class RevocationList:
+    """Local copy of revoked_tokens, refreshed in the background.
+
+    Holds revoked token ids plus per-user cutoffs (tokens issued at or before
+    the cutoff are rejected, used when a user is deactivated or their password
+    is reset). Checks never touch the database. Revocations made by other
+    workers arrive over the invalidation bus; the periodic reload catches
+    anything it missed.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.jtis: Set[str] = set()
+        self.user_cutoffs: Dict[int, float] = {}
+        self.refreshed_at: Optional[float] = None
+        self._applied = 0
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, user: TokenUser) -> bool:
+        if user.jti in self.jtis:
+            return True
+        cutoff = self.user_cutoffs.get(user.id)
+        return cutoff is not None and user.issued_at <= cutoff
+
+    async def refresh(self, db: DBSession):
+        applied = self._applied
+        rows = (await db.execute(
+            text("SELECT jti, user_id, revoked_at FROM revoked_tokens WHERE expires_at > :now"),
+            {"now": datetime.utcnow()}
+        )).fetchall()
+        jtis, cutoffs = set(), {}
+        for row in rows:
+            if row.jti:
+                jtis.add(row.jti)
+            else:
+                cutoff = _utc_timestamp(row.revoked_at)
+                cutoffs[row.user_id] = max(cutoff, cutoffs.get(row.user_id, 0))
+        if applied != self._applied:
+            # Revocations applied while the table was read may postdate its
+            # snapshot; keep them (expired entries go on the next reload)
+            jtis |= self.jtis
+            for user_id, cutoff in self.user_cutoffs.items():
+                cutoffs[user_id] = max(cutoff, cutoffs.get(user_id, 0))
+        self.jtis, self.user_cutoffs = jtis, cutoffs
+        self.refreshed_at = time.time()
+
+    def apply(self, jtis: Iterable[str], cutoffs: Dict[int, float]):
+        """Add committed revocations without reloading the table."""
+        self._applied += 1
+        self.jtis.update(jtis)
+        for user_id, cutoff in cutoffs.items():
+            self.user_cutoffs[user_id] = max(cutoff, self.user_cutoffs.get(user_id, 0))
+
+    def reload_soon(self):
+        """Cut the background task's current wait short."""
+        self._wake.set()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.jtis) + len(self.user_cutoffs),
+            "revoked_tokens": len(self.jtis),
+            "revoked_users": len(self.user_cutoffs),
+            "refresh_seconds": self.refresh_seconds,
+            "age_seconds": round(time.time() - self.refreshed_at, 1) if self.refreshed_at else None,
+        }
+
+    async def revoke_token(self, db: DBSession, user: TokenUser) -> Revocation:
+        """Revoke one token (caller commits, then applies the result).
+
+        The local copy only changes through apply(), so a transaction that
+        rolls back never leaves this worker rejecting a token that is valid.
+        """
+        await db.execute(
+            text("""
+                INSERT INTO revoked_tokens (jti, user_id, expires_at)
+                VALUES (:jti, :user_id, :expires_at)
+                ON CONFLICT (jti) DO NOTHING
+            """),
+            {"jti": user.jti, "user_id": user.id, "expires_at": datetime.utcfromtimestamp(user.expires_at)}
         )
+        return Revocation((user.jti,), {})
+
+    async def revoke_user(self, db: DBSession, user_id: int) -> Revocation:
+        """Reject every token issued to the user so far (caller commits, then applies)."""
+        revoked_at = datetime.utcnow()
+        await db.execute(
+            text("""
+                INSERT INTO revoked_tokens (user_id, revoked_at, expires_at)
+                VALUES (:user_id, :revoked_at, :expires_at)
+            """),
+            {
+                "user_id": user_id,
+                "revoked_at": revoked_at,
+                "expires_at": revoked_at + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+            }
+        )
+        return Revocation((), {user_id: _utc_timestamp(revoked_at)})
+
+    async def _refresh_forever(self):
+        while not self._stopping:
+            try:
+                async with db_session() as db:
+                    await self.refresh(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Refreshing the token deny-list failed; keeping the previous copy")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            # wait_for() can swallow a cancel that lands as the wake-up
+            # fires, so the flag ends the loop in that case
+            self._stopping = True
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
 
-def get_current_user(
-    payload: dict = Depends(verify_token),
-    db: Session = Depends(get_db)
-):
-    university_id = payload.get("sub")
-    user = db.query(Member).filter(Member.universityID == university_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+
+def _utc_timestamp(value: datetime) -> float:
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+verified_tokens = LRUCache(maxsize=TOKEN_CACHE_SIZE)
+revocations = RevocationList(REVOCATION_REFRESH_SECONDS)
+
+
+def _unauthorized(detail: str = "Could not validate credentials"):
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def decode_token(token: str, scope: str = ACCESS_SCOPE) -> TokenUser:
+    """Verify a token's signature and claims, caching the result per token."""
+    user = verified_tokens.get(token)
+    if user is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            user = TokenUser(
+                id=int(payload["sub"]),
+                role=payload["role"],
+                jti=payload["jti"],
+                issued_at=float(payload["iat"]),
+                expires_at=int(payload["exp"]),
+                scope=payload.get("scope", ACCESS_SCOPE),
+            )
+        except (JWTError, KeyError, TypeError, ValueError):
+            raise _unauthorized()
+        verified_tokens.set(token, user)
+    if user.expires_at <= time.time():
+        verified_tokens.pop(token)
+        raise _unauthorized("Token expired")
+    if user.scope != scope:
+        raise _unauthorized()
+    if revocations.is_revoked(user):
+        raise _unauthorized("Token revoked")
     return user
+
+def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)) -> TokenUser:
+    if credentials is None:
+        raise _unauthorized("Not authenticated")
+    return decode_token(credentials.credentials)
+
+def get_stream_user(
+    access_token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+) -> TokenUser:
+    """get_current_user that also takes ?access_token=, since EventSource can't send
+    headers. The query string only accepts stream tokens (see create_stream_token)."""
+    if credentials is not None:
+        return decode_token(credentials.credentials)
+    if access_token:
+        return decode_token(access_token, scope=STREAM_SCOPE)
+    raise _unauthorized("Not authenticated")
+
+def require_roles(*roles: str):
+    """Dependency factory restricting an endpoint to the given roles."""
+    def check_role(user: TokenUser = Depends(get_current_user)) -> TokenUser:
+        if user.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+        return user
+    return check_role
@@ -0,0 +1,155 @@
+import os
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "false").lower() in ("1", "true", "yes")
+# Bodies smaller than this go out as-is: below about a packet, compressing
+# costs more CPU than the bytes it saves
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Brotli's higher qualities are meant for static assets; 4 compresses JSON
+# better than gzip -6 at similar speed
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Server-sent events must reach the client as written
+UNCOMPRESSED_TYPES = (b"text/event-stream",)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    wildcard = accepted.get("*", 0.0)
+    candidates = ("br", "gzip") if brotli is not None else ("gzip",)
+    for encoding in candidates:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def vary_on_encoding(headers) -> list:
+    """`headers` with Accept-Encoding in Vary, merged into any Vary already set."""
+    merged = []
+    found = False
+    for name, value in headers:
+        if name == b"vary" and not found:
+            found = True
+            tokens = [token.strip().lower() for token in value.split(b",")]
+            if b"*" not in tokens and b"accept-encoding" not in tokens:
+                value = value + b", Accept-Encoding" if value.strip() else b"Accept-Encoding"
+        merged.append((name, value))
+    if not found:
+        merged.append((b"vary", b"Accept-Encoding"))
+    return merged
+
+
+class _Encoder:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """Compress response bodies with brotli or gzip, as the client prefers.
+
+    Bodies under `minimum_size` that arrive in one piece pass through.
+    Streamed bodies (exports) are compressed chunk by chunk, each chunk
+    flushed so the client keeps receiving data as it is produced.
+    Responses that already carry a Content-Encoding and event streams are
+    left alone. Every other response says Vary: Accept-Encoding, compressed
+    or not, so a shared cache never hands one client's encoding to another.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    @staticmethod
+    def _compressible(headers) -> bool:
+        content_type = next((value for name, value in headers if name == b"content-type"), b"")
+        return not (any(name == b"content-encoding" for name, _ in headers)
+                    or content_type.startswith(UNCOMPRESSED_TYPES))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+
+        start = None
+        encoder = None
+
+        async def send_compressed(message):
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                # Held until the first body chunk shows whether to compress
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                start_message, start = start, None
+                headers = start_message["headers"]
+                if not self._compressible(headers):
+                    await send(start_message)
+                    await send(message)
+                    return
+                headers = vary_on_encoding(headers)
+                if encoding is None or not (more_body or len(body) >= self.minimum_size):
+                    await send({**start_message, "headers": headers})
+                    await send(message)
+                    return
+                encoder = _Encoder(encoding)
+                headers = [(k, v) for k, v in headers if k != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    body = encoder.finish(body)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start_message, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send({**start_message, "headers": headers})
+            if encoder is None:
+                await send(message)
+                return
+            data = encoder.compress(body) if more_body else encoder.finish(body)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,106 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, NamedTuple, Optional
+from fastapi import Request, Response
+from sqlalchemy import text
+
+from app.database import DBSession
+
+# A version is the sum of its shards, which only ever grow
+VERSIONS_QUERY = text("""
+    SELECT table_name, CAST(SUM(version) AS BIGINT) AS version, MAX(changed_at) AS changed_at
+    FROM table_versions
+    WHERE table_name = ANY(CAST(:tables AS VARCHAR[]))
+    GROUP BY table_name
+    ORDER BY table_name
+""")
+
+# Browsers may reuse a stored copy only after revalidating it, and shared
+# caches must not store per-user responses at all
+CACHE_CONTROL = "private, no-cache"
+# HTTP dates have one-second resolution: a resource changed within the last
+# second could change again inside the same second, so it gets no
+# Last-Modified (clients fall back to the ETag)
+LAST_MODIFIED_SETTLE = timedelta(seconds=1)
+
+
+class Versions(NamedTuple):
+    """table_versions rows behind a response."""
+    tag: str
+    changed_at: datetime
+
+
+async def table_versions(db: DBSession, tables: Iterable[str]) -> Versions:
+    """Read the change counters of `tables`: one index range scan per table."""
+    rows = (await db.execute(VERSIONS_QUERY, {"tables": sorted(tables)})).fetchall()
+    return Versions(
+        tag=",".join(f"{row.table_name}:{row.version}" for row in rows),
+        changed_at=_as_utc(max(row.changed_at for row in rows)),
+    )
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over everything the representation depends on."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Timestamps are stored as naive UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """Answer a conditional GET from its validators.
+
+    Returns a 304 response when the client's copy is current. Otherwise sets
+    the validator headers on `response` and returns None, and the endpoint
+    builds the body as usual. If-None-Match takes precedence over
+    If-Modified-Since.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        last_modified = _as_utc(last_modified)
+        if last_modified > datetime.now(timezone.utc) - LAST_MODIFIED_SETTLE:
+            last_modified = None
+        else:
+            headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = bool(if_modified_since and last_modified
+                     and _not_modified_since(if_modified_since, last_modified))
+
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
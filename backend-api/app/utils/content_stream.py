@@ -0,0 +1,436 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Deque, Dict, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import text
+
+from app.database import db_session
+from app.utils.feed import AccessSet, student_access
+from app.utils.notifications import PostgresListener, Subscriber
+
+logger = logging.getLogger(__name__)
+
+CONTENT_STREAM = os.getenv("CONTENT_STREAM", "true").lower() in ("1", "true", "yes")
+# Events waiting to be written to one connection; a client that falls this
+# far behind is disconnected and resumes from the event log
+CONTENT_STREAM_QUEUE_SIZE = int(os.getenv("CONTENT_STREAM_QUEUE_SIZE", "64"))
+# Keeps idle connections open through proxies and advances clients' resume point
+CONTENT_STREAM_PING_SECONDS = float(os.getenv("CONTENT_STREAM_PING_SECONDS", "25"))
+# Events replayed to a resuming client at most; one further behind is told to reload
+CONTENT_STREAM_REPLAY_LIMIT = int(os.getenv("CONTENT_STREAM_REPLAY_LIMIT", "500"))
+CONTENT_EVENT_RETENTION_HOURS = float(os.getenv("CONTENT_EVENT_RETENTION_HOURS", "24"))
+
+CONTENT_EVENTS_CHANNEL = "content_events"
+ACCESS_CHANNEL = "cache_invalidation"
+# How often the log is read while the listener is down
+POLL_SECONDS = 5
+PRUNE_SECONDS = 3600
+FETCH_BATCH = 500
+# Sessions streams may hold at once for access sets and replays, so a burst
+# of reconnects queues here instead of draining the connection pool
+ACCESS_LOADS = 4
+# Reconnect delay EventSource clients are told to use
+RETRY_MS = 5000
+# How long a new stream waits for the hub's first read of the log before it is
+# told the stream is unavailable and to retry
+READY_SECONDS = 10
+
+# A reader's place in the log: (txid, id) of the last event it has read
+Position = Tuple[int, int]
+
+EVENT_COLUMNS = "id, txid, content_id, class_id, kind, visibility, old_visibility, title, content_type, due_date, occurred_at"
+# Only events from transactions older than any still running: one of those
+# may yet commit events that sort before the ones already visible
+SETTLED = "txid < txid_snapshot_xmin(txid_current_snapshot())"
+EVENTS_AFTER = text(f"""
+    SELECT {EVENT_COLUMNS}
+    FROM content_events
+    WHERE (txid, id) > (:after_txid, :after_id) AND {SETTLED}
+    ORDER BY txid, id
+    LIMIT :limit
+""")
+LAST_SETTLED = text(f"""
+    SELECT txid, id FROM content_events
+    WHERE {SETTLED}
+    ORDER BY txid DESC, id DESC
+    LIMIT 1
+""")
+EVENT_POSITION = text("SELECT txid, id FROM content_events WHERE id = :id")
+FIRST_EVENT = text("SELECT MIN(id) AS first_id FROM content_events")
+# The last event is kept whatever its age: it marks where the log stands
+PRUNE_EVENTS = text("""
+    DELETE FROM content_events
+    WHERE occurred_at < (CURRENT_TIMESTAMP AT TIME ZONE 'UTC') - CAST(:seconds AS DOUBLE PRECISION) * INTERVAL '1 second'
+      AND (txid, id) < (SELECT txid, id FROM content_events ORDER BY txid DESC, id DESC LIMIT 1)
+""")
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _frame(event_id: int, kind: str, data: dict) -> str:
+    return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+class ContentEvent(NamedTuple):
+    """One content_events row, with its SSE frames rendered once for every reader."""
+    id: int
+    txid: int
+    class_id: int
+    visibility: Optional[str]
+    old_visibility: Optional[str]
+    # For readers who can see the content now
+    frame: Optional[str]
+    # For readers who could see it before the change but not after
+    gone_frame: str
+
+    @classmethod
+    def from_row(cls, row) -> "ContentEvent":
+        gone = {"event_id": row.id, "content_id": row.content_id, "class_id": row.class_id}
+        frame = None
+        if row.visibility is not None:
+            frame = _frame(row.id, row.kind, {
+                **gone,
+                "kind": row.kind,
+                "title": row.title,
+                "content_type": row.content_type,
+                "visibility": row.visibility,
+                "due_date": _iso(row.due_date),
+                "occurred_at": _iso(row.occurred_at),
+            })
+        gone_kind = "deleted" if row.kind == "deleted" else "removed"
+        return cls(row.id, row.txid, row.class_id, row.visibility, row.old_visibility,
+                   frame, _frame(row.id, gone_kind, {**gone, "kind": gone_kind}))
+
+    @property
+    def position(self) -> Position:
+        return (self.txid, self.id)
+
+    def frame_for(self, access: AccessSet) -> Optional[str]:
+        if self.visibility is not None and access.can_view(self.class_id, self.visibility):
+            return self.frame
+        if self.old_visibility is not None and access.can_view(self.class_id, self.old_visibility):
+            return self.gone_frame
+        return None
+
+
+class StreamSubscription:
+    """Per-connection state: the reader's access set and its pending events."""
+    __slots__ = ("user_id", "access", "stale", "pending", "wake", "ping", "closed")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.access: Optional[AccessSet] = None
+        # Set when the reader's enrollments or TA assignments changed
+        self.stale = True
+        self.pending: Deque[ContentEvent] = deque()
+        self.wake = asyncio.Event()
+        self.ping = False
+        self.closed = False
+
+
+class ContentStreamHub(Subscriber):
+    """Fans course_content changes out to every open content stream.
+
+    A trigger logs each change to content_events and NOTIFYs content_events;
+    the hub reads the new rows once per worker and queues each event for the
+    connections whose reader can see it (or could, before the change), so
+    idle connections cost no queries. A connection whose queue passes
+    `queue_size` is closed rather than buffered without bound; the client
+    reconnects with Last-Event-ID and replays from the log. The hub's one
+    task also sends every connection its heartbeat, and prunes the log.
+
+    Events are read in (txid, id) order and only once every transaction
+    that could still add one before them has ended, so writers need no lock
+    to commit in id order; a long-running write anywhere in the database
+    holds delivery back until it ends.
+    """
+
+    channels = (CONTENT_EVENTS_CHANNEL, ACCESS_CHANNEL)
+
+    def __init__(self, queue_size: int, ping_seconds: float, replay_limit: int, retention_hours: float):
+        self.queue_size = queue_size
+        self.ping_seconds = ping_seconds
+        self.replay_limit = replay_limit
+        self.retention_seconds = retention_hours * 3600
+        self.listener: Optional[PostgresListener] = None
+        self.position: Optional[Position] = None
+        self.counters = {
+            "opened": 0,
+            "closed": 0,
+            "events": 0,
+            "queued": 0,
+            "sent": 0,
+            "dropped_slow": 0,
+            "resumed": 0,
+            "replayed": 0,
+            "resets": 0,
+            "pruned": 0,
+            "unavailable": 0,
+        }
+        self._subscriptions: Set[StreamSubscription] = set()
+        self._by_user: Dict[int, Set[StreamSubscription]] = {}
+        self._wake = asyncio.Event()
+        self._ready = asyncio.Event()
+        self._loads = asyncio.Semaphore(ACCESS_LOADS)
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def install(self, listener: PostgresListener):
+        self.listener = listener
+        listener.subscribe(self)
+
+    def on_notify(self, channel: str, payload: str):
+        if channel == CONTENT_EVENTS_CHANNEL:
+            self._wake.set()
+            return
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("entity") not in ("enrollments", "ta_assignments"):
+            return
+        if message.get("all"):
+            self._mark_stale(self._subscriptions)
+        else:
+            for user_id in message.get("users", ()):
+                self._mark_stale(self._by_user.get(user_id, ()))
+
+    def on_connect(self):
+        # Access changes may have gone unheard; the log itself loses nothing
+        self._mark_stale(self._subscriptions)
+        self._wake.set()
+
+    @staticmethod
+    def _mark_stale(subscriptions):
+        for subscription in subscriptions:
+            subscription.stale = True
+
+    async def _fetch(self):
+        async with db_session() as db:
+            if self.position is None:
+                row = (await db.execute(LAST_SETTLED)).first()
+                self.position = (row.txid, row.id) if row is not None else (0, 0)
+                self._ready.set()
+                return
+            while True:
+                txid, event_id = self.position
+                rows = (await db.execute(
+                    EVENTS_AFTER, {"after_txid": txid, "after_id": event_id, "limit": FETCH_BATCH},
+                )).fetchall()
+                for row in rows:
+                    event = ContentEvent.from_row(row)
+                    self._dispatch(event)
+                    self.position = event.position
+                if len(rows) < FETCH_BATCH:
+                    break
+
+    def _dispatch(self, event: ContentEvent):
+        self.counters["events"] += 1
+        overflowed = []
+        for subscription in self._subscriptions:
+            # A stale reader, or one whose access set is still loading, gets
+            # everything and sorts it out once it has a current one
+            if (not subscription.stale and subscription.access is not None
+                    and event.frame_for(subscription.access) is None):
+                continue
+            if len(subscription.pending) >= self.queue_size:
+                overflowed.append(subscription)
+                continue
+            subscription.pending.append(event)
+            subscription.wake.set()
+            self.counters["queued"] += 1
+        for subscription in overflowed:
+            self.counters["dropped_slow"] += 1
+            self._close(subscription)
+
+    async def _prune(self):
+        async with db_session() as db:
+            result = await db.execute(PRUNE_EVENTS, {"seconds": self.retention_seconds})
+            await db.commit()
+        self.counters["pruned"] += result.rowcount
+
+    def _ping_all(self):
+        for subscription in self._subscriptions:
+            subscription.ping = True
+            subscription.wake.set()
+
+    async def _run_forever(self):
+        next_ping = next_prune = time.monotonic()
+        while not self._stopping:
+            try:
+                await self._fetch()
+                if time.monotonic() >= next_prune:
+                    next_prune = time.monotonic() + PRUNE_SECONDS
+                    await self._prune()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Reading content events failed; retrying")
+            if time.monotonic() >= next_ping:
+                next_ping = time.monotonic() + self.ping_seconds
+                self._ping_all()
+            timeout = next_ping - time.monotonic()
+            if self.listener is None or not self.listener.connected:
+                # No word of access changes either: readers reload theirs
+                # with the next event they are sent
+                self._mark_stale(self._subscriptions)
+                timeout = min(timeout, POLL_SECONDS)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _register(self, subscription: StreamSubscription):
+        self._subscriptions.add(subscription)
+        self._by_user.setdefault(subscription.user_id, set()).add(subscription)
+        self.counters["opened"] += 1
+
+    def _close(self, subscription: StreamSubscription):
+        if subscription.closed:
+            return
+        subscription.closed = True
+        subscription.pending.clear()
+        subscription.wake.set()
+        self._subscriptions.discard(subscription)
+        same_user = self._by_user.get(subscription.user_id)
+        if same_user is not None:
+            same_user.discard(subscription)
+            if not same_user:
+                del self._by_user[subscription.user_id]
+        self.counters["closed"] += 1
+
+    async def _load_access(self, subscription: StreamSubscription):
+        # Cleared before the read, so a change landing meanwhile marks it again
+        subscription.stale = False
+        async with self._loads, db_session() as db:
+            subscription.access = await student_access.get(db, subscription.user_id)
+
+    async def _replay(self, subscription: StreamSubscription, after: int):
+        """Frames for events after event `after` the reader can see, and the position read to.
+
+        Returns no frames but a reset if `after` is no longer in the log (or
+        never was) or more than `replay_limit` events have been read since.
+        """
+        async with self._loads, db_session() as db:
+            if after == 0:
+                # Before the first event: good while the log still starts there
+                first_id = (await db.execute(FIRST_EVENT)).first().first_id
+                since = (0, 0) if first_id is None or first_id == 1 else None
+            else:
+                row = (await db.execute(EVENT_POSITION, {"id": after})).first()
+                since = (row.txid, row.id) if row is not None else None
+            if since is None:
+                return None, None
+            rows = (await db.execute(
+                EVENTS_AFTER, {"after_txid": since[0], "after_id": since[1], "limit": self.replay_limit + 1},
+            )).fetchall()
+        if len(rows) > self.replay_limit:
+            return None, None
+        frames = []
+        for row in rows:
+            event = ContentEvent.from_row(row)
+            since = event.position
+            frame = event.frame_for(subscription.access)
+            if frame is not None:
+                frames.append(frame)
+        return frames, since
+
+    async def stream(self, user_id: int, last_event_id: Optional[int] = None) -> AsyncIterator[str]:
+        """Server-sent events for one reader, resuming after `last_event_id` if given."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=READY_SECONDS)
+        except asyncio.TimeoutError:
+            # The log can't be read (the database is down, say): end the
+            # stream rather than hold it silent, and let the client come back
+            self.counters["unavailable"] += 1
+            yield f"retry: {RETRY_MS}\n\n" + "event: unavailable\ndata: {}\n\n"
+            return
+        subscription = StreamSubscription(user_id)
+        # Registered before anything is read, so no event read from here on
+        # can fall between the replay and the live queue
+        self._register(subscription)
+        position = self.position
+        try:
+            await self._load_access(subscription)
+            if last_event_id is None or last_event_id == position[1]:
+                yield f"retry: {RETRY_MS}\nid: {position[1]}\n\n"
+            else:
+                self.counters["resumed"] += 1
+                frames, replayed_to = await self._replay(subscription, last_event_id)
+                yield f"retry: {RETRY_MS}\n\n"
+                if frames is None:
+                    # Pruned since, or an id this log never issued (say, from
+                    # before a database reset)
+                    self.counters["resets"] += 1
+                    yield _frame(position[1], "reset", {"event_id": position[1]})
+                else:
+                    self.counters["replayed"] += len(frames)
+                    for frame in frames:
+                        yield frame
+                    # Events up to here came from the replay; the queue may repeat them
+                    position = max(position, replayed_to)
+
+            while not subscription.closed:
+                if not subscription.pending:
+                    if subscription.ping:
+                        subscription.ping = False
+                        # Nothing queued means every event up to the hub's
+                        # position was either sent or not for this reader
+                        position = max(position, self.position)
+                        yield f": ping\nid: {position[1]}\n\n"
+                        continue
+                    await subscription.wake.wait()
+                    subscription.wake.clear()
+                    continue
+                event = subscription.pending.popleft()
+                if event.position <= position:
+                    continue
+                if subscription.stale:
+                    await self._load_access(subscription)
+                position = event.position
+                frame = event.frame_for(subscription.access)
+                if frame is not None:
+                    self.counters["sent"] += 1
+                    yield frame
+        finally:
+            self._close(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._task is not None,
+            "connections": len(self._subscriptions),
+            "readers": len(self._by_user),
+            "last_event_id": self.position[1] if self.position is not None else None,
+            "listener_connected": self.listener.connected if self.listener is not None else False,
+            **self.counters,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Stop reading events and end every open stream."""
+        if self._task is not None:
+            self._stopping = True
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscription in list(self._subscriptions):
+            self._close(subscription)
+
+
+content_streams = ContentStreamHub(
+    CONTENT_STREAM_QUEUE_SIZE, CONTENT_STREAM_PING_SECONDS, CONTENT_STREAM_REPLAY_LIMIT, CONTENT_EVENT_RETENTION_HOURS,
+)
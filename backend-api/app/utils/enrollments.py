@@ -0,0 +1,111 @@
+import csv
+import io
+from collections import Counter
+from typing import BinaryIO, List, Tuple
+from sqlalchemy import text
+
+from app.database import DBSession
+
+# One statement for the whole batch. The target classes are locked so
+# concurrent loads into the same class queue up, and each class admits
+# requests in submission order until max_students is reached. Only pairs
+# that were not inserted come back, tagged with the reason.
+BULK_ENROLL = text("""
+    WITH req AS (
+        SELECT r.class_id, r.student_id, MIN(r.ord) AS ord
+        FROM unnest(CAST(:class_ids AS INTEGER[]), CAST(:student_ids AS INTEGER[]))
+             WITH ORDINALITY AS r(class_id, student_id, ord)
+        GROUP BY r.class_id, r.student_id
+    ),
+    cap AS MATERIALIZED (
+        SELECT c.id,
+               CASE WHEN c.max_students IS NULL THEN NULL
+                    ELSE GREATEST(c.max_students - c.enrollment_count, 0)
+               END AS remaining
+        FROM classes c
+        WHERE c.id IN (SELECT class_id FROM req)
+        FOR UPDATE
+    ),
+    fresh AS (
+        SELECT req.class_id, req.student_id, req.ord
+        FROM req
+        WHERE req.class_id IN (SELECT id FROM cap)
+          AND EXISTS (SELECT 1 FROM users u WHERE u.id = req.student_id AND u.role IN ('student', 'ta'))
+          AND NOT EXISTS (
+              SELECT 1 FROM enrollments e
+              WHERE e.class_id = req.class_id AND e.student_id = req.student_id
+          )
+    ),
+    ranked AS (
+        SELECT f.class_id, f.student_id,
+               cap.remaining IS NULL
+               OR row_number() OVER (PARTITION BY f.class_id ORDER BY f.ord) <= cap.remaining AS fits
+        FROM fresh f
+        JOIN cap ON cap.id = f.class_id
+    ),
+    inserted AS (
+        INSERT INTO enrollments (class_id, student_id)
+        SELECT class_id, student_id FROM ranked WHERE fits
+        ON CONFLICT (class_id, student_id) DO NOTHING
+        RETURNING class_id, student_id
+    )
+    SELECT req.class_id, req.student_id,
+           CASE
+               WHEN req.class_id NOT IN (SELECT id FROM cap) THEN 'unknown_class'
+               WHEN r.class_id IS NULL
+                    AND NOT EXISTS (SELECT 1 FROM users u WHERE u.id = req.student_id AND u.role IN ('student', 'ta'))
+                    THEN 'unknown_student'
+               WHEN r.fits IS FALSE THEN 'over_capacity'
+               ELSE 'duplicate'
+           END AS outcome
+    FROM req
+    LEFT JOIN ranked r ON r.class_id = req.class_id AND r.student_id = req.student_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM inserted i
+        WHERE i.class_id = req.class_id AND i.student_id = req.student_id
+    )
+    ORDER BY req.ord
+""")
+
+OUTCOMES = ("duplicate", "over_capacity", "unknown_class", "unknown_student")
+
+
+async def enroll_pairs(db: DBSession, pairs: List[Tuple[int, int]]) -> dict:
+    """Apply (class_id, student_id) pairs in one statement and summarize.
+
+    Repeats of a pair inside the request count as duplicates. The caller
+    commits.
+    """
+    if not pairs:
+        return {"requested": 0, "inserted": 0, **{outcome: 0 for outcome in OUTCOMES}, "rejected": []}
+
+    unique_pairs = len(set(pairs))
+    rejected = (await db.execute(BULK_ENROLL, {
+        "class_ids": [class_id for class_id, _ in pairs],
+        "student_ids": [student_id for _, student_id in pairs],
+    })).fetchall()
+
+    counts = Counter(row.outcome for row in rejected)
+    counts["duplicate"] += len(pairs) - unique_pairs
+    return {
+        "requested": len(pairs),
+        "inserted": unique_pairs - len(rejected),
+        **{outcome: counts[outcome] for outcome in OUTCOMES},
+        "rejected": [
+            {"class_id": row.class_id, "student_id": row.student_id, "reason": row.outcome}
+            for row in rejected
+            if row.outcome != "duplicate"
+        ],
+    }
+
+
+def parse_pairs_csv(stream: BinaryIO) -> Tuple[List[Tuple[int, int]], List[dict]]:
+    """Read class_id,student_id rows from a CSV upload; returns (pairs, errors)."""
+    pairs, errors = [], []
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    for record in reader:
+        try:
+            pairs.append((int(record["class_id"]), int(record["student_id"])))
+        except (KeyError, TypeError, ValueError):
+            errors.append({"line": reader.line_num, "error": "class_id and student_id must be integers"})
+    return pairs, errors
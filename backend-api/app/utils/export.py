@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Optional, Sequence
+from fastapi.responses import StreamingResponse
+
+from app.database import stream_rows
+
+EXPORT_BATCH_SIZE = 2000
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+async def _csv_chunks(statement, params, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # The header goes out before the query runs so clients see bytes immediately
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    async for rows in stream_rows(statement, params, EXPORT_BATCH_SIZE):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+async def _ndjson_chunks(statement, params, columns):
+    async for rows in stream_rows(statement, params, EXPORT_BATCH_SIZE):
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows
+        )
+
+
+def export_response(statement, params: Optional[dict], columns: Sequence[str], fmt: str, filename: str):
+    """Stream a query as CSV or NDJSON without materializing the result.
+
+    `columns` must match the statement's select list, in order.
+    """
+    chunks = _csv_chunks if fmt == "csv" else _ndjson_chunks
+    return StreamingResponse(
+        chunks(statement, params, list(columns)),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,178 @@
+import os
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy import text
+
+from app.database import DBSession
+from app.queries import statements
+from app.utils.cache import LRUCache
+from app.utils.pagination import keyset_condition
+
+STUDENT_ACCESS_CACHE_SIZE = int(os.getenv("STUDENT_ACCESS_CACHE_SIZE", "50000"))
+# Upper bound on staleness when another worker changed an enrollment and the
+# invalidation listener is down (app.utils.invalidation)
+STUDENT_ACCESS_TTL_SECONDS = float(os.getenv("STUDENT_ACCESS_TTL_SECONDS", "60"))
+
+ACCESS_QUERY = text("""
+    SELECT class_id, FALSE AS is_ta FROM enrollments WHERE student_id = :student_id AND status <> 'dropped'
+    UNION ALL
+    SELECT class_id, TRUE AS is_ta FROM ta_assignments WHERE ta_id = :student_id
+""")
+
+
+class AccessSet(NamedTuple):
+    """Classes a student can see beyond public content."""
+    enrolled: FrozenSet[int]
+    ta: FrozenSet[int]
+
+    def can_view(self, class_id: int, visibility: str) -> bool:
+        if visibility == "public":
+            return True
+        if visibility == "enrolled":
+            return class_id in self.enrolled or class_id in self.ta
+        return class_id in self.ta
+
+    def visible_pairs(self) -> List[Tuple[int, str]]:
+        """(class_id, visibility) pairs the feed reads besides public content."""
+        pairs = [(class_id, "enrolled") for class_id in sorted(self.enrolled | self.ta)]
+        pairs += [(class_id, "private") for class_id in sorted(self.ta)]
+        return pairs
+
+
+class StudentAccessCache:
+    """Per-student access sets, cached in-process.
+
+    Enrollment and TA endpoints invalidate the affected students right away;
+    changes made through other workers arrive over the invalidation bus, and
+    the TTL covers whatever the bus misses.
+
+    An invalidation can land while a load is waiting on the database, after
+    its snapshot was taken; that load is returned but not cached. Loads in
+    flight carry a per-student generation, and clear() bumps a global one.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._generation = 0
+        # student_id -> [loads in flight, invalidations since the first began]
+        self._loads: Dict[int, List[int]] = {}
+        self.discarded_loads = 0
+
+    async def get(self, db: DBSession, student_id: int) -> AccessSet:
+        access = self._cache.get(student_id)
+        if access is None:
+            load = self._loads.setdefault(student_id, [0, 0])
+            load[0] += 1
+            started = (self._generation, load[1])
+            try:
+                rows = (await db.execute(ACCESS_QUERY, {"student_id": student_id})).fetchall()
+            finally:
+                load[0] -= 1
+                if load[0] == 0:
+                    del self._loads[student_id]
+            access = AccessSet(
+                enrolled=frozenset(row.class_id for row in rows if not row.is_ta),
+                ta=frozenset(row.class_id for row in rows if row.is_ta),
+            )
+            if (self._generation, load[1]) == started:
+                self._cache.set(student_id, access)
+            else:
+                self.discarded_loads += 1
+        return access
+
+    def invalidate(self, student_ids: Iterable[int]) -> int:
+        """Drop the students' access sets; returns how many were cached."""
+        evicted = 0
+        for student_id in student_ids:
+            load = self._loads.get(student_id)
+            if load is not None:
+                load[1] += 1
+            evicted += self._cache.pop(student_id)
+        return evicted
+
+    def clear(self):
+        self._generation += 1
+        self._cache.clear()
+
+    def set_ttl(self, ttl: float):
+        """Lifetime of entries cached from now on."""
+        self._cache.ttl = ttl
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "discarded_loads": self.discarded_loads}
+
+
+student_access = StudentAccessCache(STUDENT_ACCESS_CACHE_SIZE, STUDENT_ACCESS_TTL_SECONDS)
+
+
+def feed_query(
+    access: AccessSet,
+    limit: int,
+    after: Optional[str] = None,
+    class_id: Optional[int] = None,
+    content_type: Optional[str] = None,
+    visibility: Optional[str] = None,
+):
+    """Build the page query for a student's content feed.
+
+    Every branch is an ordered seek that stops after `limit` rows: public
+    content through (visibility, created_at), and each visible
+    (class_id, visibility) pair through (class_id, visibility, created_at).
+    At most (pairs + 1) * limit keys are merged before joining the page's
+    rows. Returns (statement, params).
+    """
+    params = {"limit": limit + 1}
+    filters = []
+    if class_id:
+        filters.append("cc.class_id = :class_id")
+        params["class_id"] = class_id
+    if content_type:
+        filters.append("cc.content_type = :content_type")
+        params["content_type"] = content_type
+    cursor_condition = keyset_condition("cc.created_at", "cc.id", after, params)
+    if cursor_condition:
+        filters.append(cursor_condition)
+    extra = "".join(f" AND {condition}" for condition in filters)
+
+    pairs = [
+        (pair_class, pair_visibility) for pair_class, pair_visibility in access.visible_pairs()
+        if (not class_id or pair_class == class_id) and (not visibility or pair_visibility == visibility)
+    ]
+
+    branches = []
+    if not visibility or visibility == "public":
+        branches.append(f"""
+            (SELECT cc.id, cc.created_at
+             FROM course_content cc
+             WHERE cc.visibility = 'public'{extra}
+             ORDER BY cc.created_at DESC, cc.id DESC
+             LIMIT :limit)
+        """)
+    if pairs:
+        params["class_ids"] = [pair_class for pair_class, _ in pairs]
+        params["visibilities"] = [pair_visibility for _, pair_visibility in pairs]
+        branches.append(f"""
+            (SELECT m.id, m.created_at
+             FROM unnest(CAST(:class_ids AS INTEGER[]), CAST(:visibilities AS VARCHAR[])) AS a(class_id, visibility)
+             CROSS JOIN LATERAL (
+                 SELECT cc.id, cc.created_at
+                 FROM course_content cc
+                 WHERE cc.class_id = a.class_id AND cc.visibility = a.visibility{extra}
+                 ORDER BY cc.created_at DESC, cc.id DESC
+                 LIMIT :limit
+             ) m)
+        """)
+    if not branches:
+        return None, params
+
+    statement = statements.text(f"""
+        WITH feed AS ({" UNION ALL ".join(branches)})
+        SELECT cc.id, cc.class_id, cc.title, cc.content_type, cc.description, cc.visibility,
+               cc.created_at, cc.due_date, c.title AS class_title, c.class_code, u.name AS professor_name
+        FROM feed f
+        JOIN course_content cc ON cc.id = f.id
+        JOIN classes c ON cc.class_id = c.id
+        JOIN users u ON cc.created_by = u.id
+        ORDER BY f.created_at DESC, f.id DESC
+        LIMIT :limit
+    """)
+    return statement, params
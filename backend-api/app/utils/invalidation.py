@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+from app.utils.auth import REVOCATION_REFRESH_SECONDS, revocations, verified_tokens
+from app.utils.feed import STUDENT_ACCESS_TTL_SECONDS, student_access
+from app.utils.notifications import PostgresListener, Subscriber
+from app.utils.stats import STATS_CACHE_TTL_SECONDS, dashboard_stats
+
+logger = logging.getLogger(__name__)
+
+CACHE_INVALIDATION = os.getenv("CACHE_INVALIDATION", "true").lower() in ("1", "true", "yes")
+# How long cached entries live while notifications are arriving; the caches'
+# own TTLs apply again whenever the listener is disconnected
+INVALIDATION_CACHE_TTL_SECONDS = float(os.getenv("INVALIDATION_CACHE_TTL_SECONDS", "600"))
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+
+
+class CacheInvalidation(Subscriber):
+    """Evicts what other writers made stale from this worker's caches.
+
+    Triggers on enrollments, ta_assignments, system_stats and revoked_tokens
+    NOTIFY cache_invalidation with the users and classes a statement touched.
+    Each message evicts the matching student access sets, drops the dashboard
+    snapshot or adds to the token deny-list.
+
+    Notifications are only delivered while connected, so every (re)connect
+    and disconnect clears the caches and reloads the deny-list. While
+    connected, entries may live for `connected_ttl`; while not, each cache
+    falls back to its own TTL and reload interval.
+    """
+
+    channels = (INVALIDATION_CHANNEL,)
+
+    def __init__(self, connected_ttl: float):
+        self.connected_ttl = connected_ttl
+        self.listener: Optional[PostgresListener] = None
+        self.counters = {"notifications": 0, "evicted": 0, "full_flushes": 0, "bad_payloads": 0}
+        self.by_entity: Dict[str, int] = {}
+
+    def install(self, listener: PostgresListener):
+        self.listener = listener
+        listener.subscribe(self)
+
+    def on_notify(self, channel: str, payload: str):
+        """Apply one notification payload to this worker's caches."""
+        try:
+            message = json.loads(payload)
+            entity = message["entity"]
+        except (ValueError, KeyError, TypeError):
+            self.counters["bad_payloads"] += 1
+            logger.warning("Ignoring malformed cache invalidation: %.200s", payload)
+            return
+        self.counters["notifications"] += 1
+        self.by_entity[entity] = self.by_entity.get(entity, 0) + 1
+
+        if entity in ("enrollments", "ta_assignments"):
+            if message.get("all"):
+                self.counters["full_flushes"] += 1
+                student_access.clear()
+            else:
+                self.counters["evicted"] += student_access.invalidate(message.get("users", ()))
+        elif entity == "system_stats":
+            dashboard_stats.invalidate()
+        elif entity == "revoked_tokens":
+            if message.get("all"):
+                self.counters["full_flushes"] += 1
+                revocations.reload_soon()
+            else:
+                cutoffs = {int(user_id): cutoff for user_id, cutoff in message.get("cutoffs", {}).items()}
+                revocations.apply(message.get("jtis", ()), cutoffs)
+
+    def _set_ttls(self, connected: bool):
+        student_access.set_ttl(
+            max(self.connected_ttl, STUDENT_ACCESS_TTL_SECONDS) if connected else STUDENT_ACCESS_TTL_SECONDS
+        )
+        dashboard_stats.ttl_seconds = (
+            max(self.connected_ttl, STATS_CACHE_TTL_SECONDS) if connected else STATS_CACHE_TTL_SECONDS
+        )
+        revocations.refresh_seconds = (
+            max(self.connected_ttl, REVOCATION_REFRESH_SECONDS) if connected else REVOCATION_REFRESH_SECONDS
+        )
+
+    def _resync(self, connected: bool):
+        # Whatever was cached may have missed notifications sent while no one
+        # was listening; start over under the TTLs for the new state
+        self._set_ttls(connected)
+        student_access.clear()
+        dashboard_stats.invalidate()
+        revocations.reload_soon()
+
+    def on_connect(self):
+        self._resync(True)
+
+    def on_disconnect(self):
+        self._resync(False)
+
+    def stats(self) -> dict:
+        listening = self.listener.stats() if self.listener is not None else {"connected": False}
+        return {
+            "enabled": self.listener is not None,
+            **listening,
+            **self.counters,
+            "by_entity": dict(self.by_entity),
+            "caches": {
+                "student_access": student_access.stats(),
+                "verified_tokens": verified_tokens.stats(),
+                "token_deny_list": revocations.stats(),
+                "dashboard_stats": dashboard_stats.stats(),
+            },
+        }
+
+
+cache_invalidation = CacheInvalidation(INVALIDATION_CACHE_TTL_SECONDS)
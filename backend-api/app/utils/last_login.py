@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+from sqlalchemy import text
+
+from app.database import db_session
+
+logger = logging.getLogger(__name__)
+
+LAST_LOGIN_FLUSH_SECONDS = float(os.getenv("LAST_LOGIN_FLUSH_SECONDS", "5"))
+LAST_LOGIN_FLUSH_SIZE = int(os.getenv("LAST_LOGIN_FLUSH_SIZE", "500"))
+# Distinct users held in memory at most; logins past this are dropped and counted
+LAST_LOGIN_MAX_PENDING = int(os.getenv("LAST_LOGIN_MAX_PENDING", "50000"))
+
+# Ages are sent instead of timestamps so last_login stays on the database
+# clock, as CURRENT_TIMESTAMP was. A newer value already in the row wins.
+FLUSH_QUERY = text("""
+    UPDATE users u
+    SET last_login = CURRENT_TIMESTAMP - v.age * INTERVAL '1 second'
+    FROM unnest(CAST(:ids AS INTEGER[]), CAST(:ages AS DOUBLE PRECISION[])) AS v(id, age)
+    WHERE u.id = v.id
+      AND (u.last_login IS NULL OR u.last_login < CURRENT_TIMESTAMP - v.age * INTERVAL '1 second')
+""")
+
+
+class LastLoginBuffer:
+    """Write-behind buffer for users.last_login.
+
+    Logins record (user id, time) in memory; repeat logins by the same user
+    collapse into one entry. A background task writes everything with a single
+    UPDATE every flush_seconds, or sooner once flush_size users are waiting.
+    A failed flush puts its entries back for the next attempt.
+    """
+
+    def __init__(self, flush_seconds: float, flush_size: int, max_pending: int):
+        self.flush_seconds = flush_seconds
+        self.flush_size = flush_size
+        self.max_pending = max_pending
+        self.counters = {
+            "recorded": 0,
+            "coalesced": 0,
+            "written": 0,
+            "dropped": 0,
+            "delayed": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+        }
+        self.max_delay_seconds = 0.0
+        self._pending: Dict[int, float] = {}
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, user_id: int):
+        self.counters["recorded"] += 1
+        if user_id in self._pending:
+            self.counters["coalesced"] += 1
+        elif len(self._pending) >= self.max_pending:
+            self.counters["dropped"] += 1
+            return
+        self._pending[user_id] = time.monotonic()
+        if len(self._pending) >= self.flush_size:
+            self._wake.set()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        now = time.monotonic()
+        self.max_delay_seconds = max(self.max_delay_seconds, now - min(batch.values()))
+        try:
+            async with db_session() as db:
+                await db.execute(FLUSH_QUERY, {
+                    "ids": list(batch),
+                    "ages": [now - seen for seen in batch.values()],
+                })
+                await db.commit()
+        except Exception:
+            logger.exception("Flushing %d last_login updates failed; retrying next cycle", len(batch))
+            self.counters["failed_flushes"] += 1
+            self.counters["delayed"] += len(batch)
+            self._requeue(batch)
+            return
+        self.counters["flushes"] += 1
+        self.counters["written"] += len(batch)
+
+    def _requeue(self, batch: Dict[int, float]):
+        for user_id, seen in batch.items():
+            if user_id in self._pending:
+                continue  # a newer login arrived meanwhile
+            if len(self._pending) >= self.max_pending:
+                self.counters["dropped"] += 1
+                continue
+            self._pending[user_id] = seen
+
+    def stats(self) -> dict:
+        oldest = min(self._pending.values(), default=None)
+        return {
+            **self.counters,
+            "pending": len(self._pending),
+            "oldest_pending_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+            "max_delay_seconds": round(self.max_delay_seconds, 3),
+        }
+
+    async def _flush_forever(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._flush_forever())
+
+    async def stop(self):
+        """Write whatever is still buffered and stop the background task.
+
+        The task is woken rather than cancelled so an in-progress flush is
+        never interrupted after taking its batch.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+last_logins = LastLoginBuffer(LAST_LOGIN_FLUSH_SECONDS, LAST_LOGIN_FLUSH_SIZE, LAST_LOGIN_MAX_PENDING)
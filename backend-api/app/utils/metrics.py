@@ -0,0 +1,253 @@
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Upper bounds in seconds (the +Inf bucket is implicit)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Requests that matched no route share one label, so scanners can't grow the series set
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestDB:
+    """Database time and statement count of the request being served."""
+    __slots__ = ("seconds", "queries", "scope")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.seconds = 0.0
+        self.queries = 0
+        self.scope = scope
+
+
+# Set by the middleware for each request. It holds a mutable object rather than
+# the totals themselves: the engine hooks run in copies of the request context
+# (threadpool calls, SQLAlchemy's greenlets) and must add to the same one.
+_request_db: ContextVar[Optional[RequestDB]] = ContextVar("request_db", default=None)
+
+
+class Histogram:
+    """Prometheus histogram keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, key: Tuple[str, ...], value: float):
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            labels = _labels(self.labels, key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, key: Tuple[str, ...], amount: float = 1):
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{{{_labels(self.labels, key)}}} {value:g}")
+        return lines
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class RequestMetrics:
+    """Per-route latency, status codes, in-flight requests and database time.
+
+    Everything lives in the worker process; each worker serves its own
+    /metrics, and Prometheus sums them.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.requests = Counter(
+            "http_requests_total", "Requests served, by route, method and status code.",
+            ("route", "method", "status"),
+        )
+        self.latency = Histogram(
+            "http_request_duration_seconds", "Time from request start to the last body byte sent.",
+            ("route", "method"), LATENCY_BUCKETS,
+        )
+        self.db_time = Histogram(
+            "http_request_db_seconds", "Time spent executing SQL per request.",
+            ("route", "method"), LATENCY_BUCKETS,
+        )
+        self.db_queries = Histogram(
+            "http_request_db_queries", "SQL statements executed per request.",
+            ("route", "method"), QUERY_COUNT_BUCKETS,
+        )
+
+    def install(self, engine: Engine):
+        """Attribute `engine`'s statement time to the request executing them."""
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    def record(self, route: str, method: str, status: int, seconds: float, db: RequestDB):
+        key = (route, method)
+        self.requests.inc((route, method, str(status)))
+        self.latency.observe(key, seconds)
+        self.db_time.observe(key, db.seconds)
+        self.db_queries.observe(key, db.queries)
+
+    def render(self, extra: Sequence[str] = ()) -> str:
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+        for metric in (self.requests, self.latency, self.db_time, self.db_queries):
+            lines.extend(metric.render())
+        lines.extend(extra)
+        return "\n".join(lines) + "\n"
+
+
+# The start time rides on the statement's execution context: cheaper than a
+# stack in conn.info, and always paired with its own after event
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _request_db.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    db = _request_db.get()
+    if db is not None and context is not None:
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            db.seconds += time.perf_counter() - started
+            db.queries += 1
+
+
+def current_route() -> Optional[str]:
+    """Route template of the request executing right now, if any."""
+    db = _request_db.get()
+    if db is None or db.scope is None:
+        return None
+    route = db.scope.get("route")
+    return route.path if route is not None else UNMATCHED_ROUTE
+
+
+def pool_lines(stats: dict) -> list:
+    """Connection pool gauges and counters from database.pool_stats()."""
+    return [
+        "# HELP db_pool_checked_out Connections currently checked out of the pool.",
+        "# TYPE db_pool_checked_out gauge",
+        f"db_pool_checked_out {stats['checked_out']}",
+        "# HELP db_pool_idle Connections idle in the pool.",
+        "# TYPE db_pool_idle gauge",
+        f"db_pool_idle {stats['idle']}",
+        "# HELP db_pool_overflow_events_total Connections opened beyond the pool size.",
+        "# TYPE db_pool_overflow_events_total counter",
+        f"db_pool_overflow_events_total {stats['overflow_events']}",
+        "# HELP db_pool_timeouts_total Checkouts that gave up waiting for a connection.",
+        "# TYPE db_pool_timeouts_total counter",
+        f"db_pool_timeouts_total {stats['timeouts']}",
+    ]
+
+
+def cache_lines(stats: dict) -> list:
+    """Per-cache hit/miss counters and the invalidation listener's state."""
+    caches = sorted(stats["caches"].items())
+    lines = [
+        "# HELP cache_hits_total Lookups answered from an in-process cache.",
+        "# TYPE cache_hits_total counter",
+        *(f'cache_hits_total{{cache="{name}"}} {cache["hits"]}' for name, cache in caches if "hits" in cache),
+        "# HELP cache_misses_total Lookups that had to go to the database.",
+        "# TYPE cache_misses_total counter",
+        *(f'cache_misses_total{{cache="{name}"}} {cache["misses"]}' for name, cache in caches if "misses" in cache),
+        "# HELP cache_entries Entries held by an in-process cache.",
+        "# TYPE cache_entries gauge",
+        *(f'cache_entries{{cache="{name}"}} {cache["size"]}' for name, cache in caches),
+        "# HELP cache_invalidation_listener_up Whether this worker is receiving invalidation notifications.",
+        "# TYPE cache_invalidation_listener_up gauge",
+        f"cache_invalidation_listener_up {int(stats['connected'])}",
+        "# HELP cache_invalidations_total Invalidation notifications received, by entity.",
+        "# TYPE cache_invalidations_total counter",
+    ]
+    lines.extend(
+        f'cache_invalidations_total{{entity="{_escape(entity)}"}} {count}'
+        for entity, count in sorted(stats["by_entity"].items())
+    )
+    return lines
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """Time every HTTP request and attribute it to its route template."""
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        db = RequestDB(scope)
+        token = _request_db.set(db)
+        status = 500  # if the app raises before starting a response
+        started = time.perf_counter()
+        metrics.in_flight += 1
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.in_flight -= 1
+            _request_db.reset(token)
+            # FastAPI records the matched route in the scope
+            route = scope.get("route")
+            metrics.record(
+                route.path if route is not None else UNMATCHED_ROUTE,
+                scope["method"], status, elapsed, db,
+            )
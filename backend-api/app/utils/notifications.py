@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.database import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+# LISTEN holds a session, which PgBouncer in transaction mode can't give:
+# point this straight at Postgres when DATABASE_URL goes through it
+LISTEN_DATABASE_URL = os.getenv("LISTEN_DATABASE_URL") or DATABASE_URL
+
+# An idle LISTEN connection is pinged this often so a dead one is noticed
+PING_SECONDS = 15
+RECONNECT_MAX_SECONDS = 30
+
+
+def listen_dsn(url: str) -> str:
+    """Plain postgresql:// DSN for asyncpg, whatever driver the URL names."""
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class Subscriber:
+    """What a component wants to hear from the listener.
+
+    `on_notify(channel, payload)` runs on the event loop for every message on
+    one of `channels`. Notifications sent while the listener is disconnected
+    are lost, so `on_connect` / `on_disconnect` let it resynchronize.
+    """
+
+    channels: tuple = ()
+
+    def on_notify(self, channel: str, payload: str):
+        raise NotImplementedError
+
+    def on_connect(self):
+        pass
+
+    def on_disconnect(self):
+        pass
+
+
+class PostgresListener:
+    """The worker's one LISTEN connection, shared by every subscriber.
+
+    Reconnects with exponential backoff and pings the connection while idle.
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self.connected = False
+        self.connected_since: Optional[float] = None
+        self.counters = {"connects": 0, "disconnects": 0, "connect_failures": 0}
+        self._subscribers: List[Subscriber] = []
+        self._handlers: Dict[str, List[Callable[[str, str], None]]] = {}
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, subscriber: Subscriber):
+        self._subscribers.append(subscriber)
+        for channel in subscriber.channels:
+            self._handlers.setdefault(channel, []).append(subscriber.on_notify)
+
+    def _on_notification(self, connection, pid, channel, payload):
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(channel, payload)
+            except Exception:
+                logger.exception("Handling a notification on %s failed", channel)
+
+    def _set_connected(self, connected: bool):
+        self.connected = connected
+        self.connected_since = time.time() if connected else None
+        for subscriber in self._subscribers:
+            try:
+                if connected:
+                    subscriber.on_connect()
+                else:
+                    subscriber.on_disconnect()
+            except Exception:
+                logger.exception("Resynchronizing %s failed", type(subscriber).__name__)
+
+    async def _listen_once(self):
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda _: closed.set())
+            for channel in self._handlers:
+                await connection.add_listener(channel, self._on_notification)
+            self.counters["connects"] += 1
+            self._set_connected(True)
+            while not closed.is_set():
+                try:
+                    await asyncio.wait_for(closed.wait(), timeout=PING_SECONDS)
+                except asyncio.TimeoutError:
+                    await asyncio.wait_for(connection.execute("SELECT 1"), timeout=PING_SECONDS)
+        finally:
+            if self.connected:
+                self.counters["disconnects"] += 1
+                self._set_connected(False)
+            if not connection.is_closed():
+                connection.terminate()
+
+    async def _listen_forever(self):
+        delay = 1.0
+        while not self._stopping:
+            connects = self.counters["connects"]
+            try:
+                await self._listen_once()
+                logger.warning("Notification listener was disconnected; reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Notification listener failed (%s); retrying in %.0fs", e, delay)
+            if self.counters["connects"] > connects:
+                delay = 1.0
+            else:
+                self.counters["connect_failures"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "listening": sorted(self._handlers),
+            "connected": self.connected,
+            "connected_seconds": round(time.time() - self.connected_since, 1) if self.connected_since else None,
+            **self.counters,
+        }
+
+    def start(self):
+        if self._task is None and self._handlers:
+            self._stopping = False
+            self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            # wait_for() can swallow a cancel that lands as the connection
+            # closes, so the flag ends the loop in that case
+            self._stopping = True
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+pg_listener = PostgresListener(listen_dsn(LISTEN_DATABASE_URL))
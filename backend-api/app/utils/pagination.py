@@ -0,0 +1,56 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Tuple, Union
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort_value: Union[datetime, float], row_id: int, *extra: int) -> str:
+    """Build an opaque next-page token from the last row's sort key.
+
+    `extra` integers ride along for queries that must pin more than the
+    position (e.g. the candidate window of a search).
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id, *extra], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort_type: type = datetime, extra: int = 0) -> Tuple:
+    """Return (sort_value, row_id) followed by `extra` integers."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != 2 + extra:
+            raise ValueError("wrong cursor length")
+        sort_value, row_id, *rest = values
+        sort_value = datetime.fromisoformat(sort_value) if sort_type is datetime else sort_type(sort_value)
+        return (sort_value, int(row_id), *(int(value) for value in rest))
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def keyset_condition(sort_column: str, id_column: str, after: Optional[str], params: dict) -> Optional[str]:
+    """Return the WHERE condition that seeks past `after` in DESC order.
+
+    The row comparison lets Postgres start the index scan at the cursor
+    instead of walking and discarding earlier rows like OFFSET does.
+    """
+    if not after:
+        return None
+    params["after_sort"], params["after_id"] = decode_cursor(after)
+    return f"({sort_column}, {id_column}) < (:after_sort, :after_id)"
+
+
+def split_page(rows, limit: int, sort_attr: str = "created_at", extra_attrs: Tuple[str, ...] = ()):
+    """Trim the extra lookahead row and return (page, next_cursor)."""
+    page = rows[:limit]
+    if len(rows) <= limit:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor(getattr(last, sort_attr), last.id, *(getattr(last, attr) for attr in extra_attrs))
@@ -0,0 +1,98 @@
+import asyncio
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Hash jobs allowed in flight (running + queued) before logins are turned away
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "2"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+def is_hashed(stored: str) -> bool:
+    return pwd_context.identify(stored, required=False) is not None
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def check_password(password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """Return (matches, replacement_hash).
+
+    Rows created before hashing was introduced still hold the plaintext; a
+    correct password for one of those returns a bcrypt hash to store in its
+    place. A replacement is also returned when the stored hash uses outdated
+    settings (e.g. fewer rounds). With no stored value a dummy hash is checked
+    so unknown accounts take as long as known ones.
+    """
+    if stored is None:
+        pwd_context.dummy_verify()
+        return False, None
+    if not is_hashed(stored):
+        if secrets.compare_digest(password.encode(), stored.encode()):
+            return True, pwd_context.hash(password)
+        return False, None
+    return pwd_context.verify_and_update(password, stored)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded process pool, off the event loop.
+
+    Each hash costs hundreds of milliseconds of CPU, so the work goes to worker
+    processes (not threads, which would still contend for the GIL with the
+    event loop). Requests beyond max_pending in-flight jobs get a 503 with
+    Retry-After instead of queueing without bound.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: workers import only this module, never a copy of the
+            # parent's event loop or database connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins in progress, please retry shortly",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def verify(self, password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+        return await self._run(check_password, password, stored)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    def start(self):
+        self._pool()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
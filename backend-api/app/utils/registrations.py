@@ -0,0 +1,161 @@
+import os
+from collections import Counter
+from typing import List, Optional
+from sqlalchemy import text
+
+from app.database import DBSession
+from app.queries import statements
+
+# Most registrations one review request may name or pick
+REVIEW_BATCH_MAX = int(os.getenv("REGISTRATION_REVIEW_BATCH_MAX", "5000"))
+
+OUTCOMES = ("approved", "rejected", "conflict", "locked", "already_processed", "not_found")
+
+# Recorded on approvals refused because the account already exists
+CONFLICT_NOTE = "account already exists"
+
+# Closes an approved batch: requests whose account was created are approved,
+# the rest rejected with `note`, so a conflict can't stay pending and be
+# picked again by every later review
+RECORD_APPROVALS = text("""
+    UPDATE pending_registrations
+    SET status = CASE WHEN id = ANY(CAST(:approved AS INTEGER[])) THEN 'approved' ELSE 'rejected' END,
+        review_note = CASE WHEN id = ANY(CAST(:approved AS INTEGER[])) THEN NULL ELSE :note END,
+        reviewed_by = :reviewed_by,
+        reviewed_at = CURRENT_TIMESTAMP
+    WHERE id = ANY(CAST(:ids AS INTEGER[]))
+""")
+
+
+def _review_sql(approve: bool, by_ids: bool, by_role: bool) -> str:
+    """Lock a batch of pending registrations and act on it in one statement.
+
+    The batch is picked oldest first FOR UPDATE SKIP LOCKED, so a request
+    another admin is reviewing is skipped instead of waited on and no
+    registration is processed twice. Approval copies the batch into users
+    with one INSERT ... SELECT, skipping rows whose university_id or
+    username is taken (ON CONFLICT) or whose email an account already uses
+    (users.email has no unique constraint, so that is checked); rejection updates it in place. Returns the picked
+    rows and the users created, which the caller matches up itself: the
+    planner can only guess how many rows a CTE holds, and a guess of one
+    turns any join between them quadratic. By id, it also returns the
+    status of every id as the statement's snapshot saw it.
+    """
+    conditions = ["p.status = 'pending'"]
+    if by_ids:
+        conditions.append("p.id = ANY(CAST(:ids AS INTEGER[]))")
+    if by_role:
+        conditions.append("p.requested_role = :requested_role")
+    if approve:
+        action = """
+        created AS (
+            INSERT INTO users (university_id, username, password, name, email, role, created_by)
+            SELECT university_id, username, password, name, email, requested_role, :reviewed_by
+            FROM picked
+            WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.email = picked.email)
+            ORDER BY requested_at, id
+            ON CONFLICT DO NOTHING
+            RETURNING id, university_id, username, email
+        )"""
+        created = """
+        UNION ALL
+        SELECT 'created', id, university_id, username, email, NULL, NULL FROM created"""
+    else:
+        action = """
+        rejected AS (
+            UPDATE pending_registrations
+            SET status = 'rejected', reviewed_by = :reviewed_by, reviewed_at = CURRENT_TIMESTAMP
+            WHERE id = ANY(ARRAY(SELECT id FROM picked))
+        )"""
+        created = ""
+    current = """
+        UNION ALL
+        SELECT 'current', id, NULL, NULL, NULL, status, NULL
+        FROM pending_registrations
+        WHERE id = ANY(CAST(:ids AS INTEGER[]))""" if by_ids else ""
+    return f"""
+        WITH picked AS MATERIALIZED (
+            SELECT p.id, p.university_id, p.username, p.password, p.name, p.email, p.requested_role,
+                   p.requested_at
+            FROM pending_registrations p
+            WHERE {" AND ".join(conditions)}
+            ORDER BY p.requested_at, p.id
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        ),{action}
+        SELECT 'picked' AS source, id, university_id, username, email,
+               CAST(NULL AS VARCHAR) AS status, requested_at
+        FROM picked{created}{current}
+    """
+
+
+async def review_registrations(
+    db: DBSession,
+    reviewer_id: int,
+    approve: bool,
+    ids: Optional[List[int]] = None,
+    requested_role: Optional[str] = None,
+    limit: int = 500,
+) -> dict:
+    """Approve or reject pending registrations and summarize, per id.
+
+    Reviews the given `ids`, or else up to `limit` of the oldest pending
+    requests (only those for `requested_role`, if given). Takes one
+    statement to reject and two to approve, whatever the batch size. Repeats
+    in `ids` are reviewed once. An approval that conflicts with an existing
+    account rejects the request (outcome "conflict", noted as
+    CONFLICT_NOTE). The caller commits.
+    """
+    params = {"reviewed_by": reviewer_id}
+    if ids is not None:
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {"requested": 0, **{outcome: 0 for outcome in OUTCOMES}, "results": []}
+        params.update(ids=ids, limit=len(ids))
+    else:
+        params["limit"] = limit
+        if requested_role is not None:
+            params["requested_role"] = requested_role
+    statement = statements.text(_review_sql(approve, ids is not None, "requested_role" in params))
+    rows = (await db.execute(statement, params)).fetchall()
+
+    picked = sorted((row for row in rows if row.source == "picked"), key=lambda row: (row.requested_at, row.id))
+    created = {(row.university_id, row.username, row.email): row.id for row in rows if row.source == "created"}
+    current = {row.id: row.status for row in rows if row.source == "current"}
+
+    reviewed = {}
+    for row in picked:
+        if not approve:
+            reviewed[row.id] = ("rejected", None)
+            continue
+        # At most one pending request per university_id, so the key is unique
+        user_id = created.get((row.university_id, row.username, row.email))
+        reviewed[row.id] = ("approved", user_id) if user_id is not None else ("conflict", None)
+    if approve and reviewed:
+        await db.execute(RECORD_APPROVALS, {
+            "reviewed_by": reviewer_id,
+            "ids": list(reviewed),
+            "approved": [registration_id for registration_id, (outcome, _) in reviewed.items() if outcome == "approved"],
+            "note": CONFLICT_NOTE,
+        })
+
+    results = []
+    for registration_id in (ids if ids is not None else [row.id for row in picked]):
+        if registration_id in reviewed:
+            outcome, user_id = reviewed[registration_id]
+        elif registration_id not in current:
+            outcome, user_id = "not_found", None
+        elif current[registration_id] == "pending":
+            # Pending as of the statement's snapshot but not picked: another
+            # reviewer holds the row
+            outcome, user_id = "locked", None
+        else:
+            outcome, user_id = "already_processed", None
+        results.append({
+            "registration_id": registration_id,
+            "outcome": outcome,
+            **({"user_id": user_id} if user_id is not None else {}),
+        })
+
+    counts = Counter(result["outcome"] for result in results)
+    return {"requested": len(results), **{outcome: counts[outcome] for outcome in OUTCOMES}, "results": results}
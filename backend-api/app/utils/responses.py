@@ -0,0 +1,37 @@
+import os
+from typing import List, Optional, Tuple
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+# Opt-in: encode list responses with orjson, skipping FastAPI's
+# jsonable_encoder walk over every value
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+
+def records(rows, exclude: Tuple[str, ...] = ()) -> List[dict]:
+    """Result rows as dicts keyed by their select-list names, minus `exclude`.
+
+    Datetimes stay datetimes; both encoders write them as ISO 8601, the same
+    text the endpoints used to build with .isoformat().
+    """
+    if not rows:
+        return []
+    # Every row shares the statement's keys; Row._asdict() would rebuild them per row
+    keys = rows[0]._fields
+    if exclude:
+        kept = [index for index, key in enumerate(keys) if key not in exclude]
+        keys = [keys[index] for index in kept]
+        return [dict(zip(keys, [row[index] for index in kept])) for row in rows]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def json_response(content, response: Optional[Response] = None):
+    """Return `content` through orjson when FAST_JSON is on.
+
+    Otherwise `content` is returned unchanged for FastAPI's default encoder.
+    `response` is the endpoint's injected Response: a returned Response
+    bypasses it, so any headers set on it (ETag, ...) are copied over.
+    """
+    if not FAST_JSON:
+        return content
+    return ORJSONResponse(content, headers=dict(response.headers) if response is not None else None)
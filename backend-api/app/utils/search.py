@@ -0,0 +1,107 @@
+import os
+from typing import Optional
+
+from app.queries import statements
+from app.utils.feed import AccessSet
+from app.utils.pagination import decode_cursor
+
+# Ranking reads every match's tsvector, so a term found in most rows would
+# cost a pass over the table; only the newest this many matches are ranked
+SEARCH_RANK_CANDIDATES = int(os.getenv("SEARCH_RANK_CANDIDATES", "5000"))
+# Cursor columns besides (rank, id): the id range of the ranked window
+WINDOW_ATTRS = ("window_floor", "window_top")
+# Inlined rather than computed once in a CTE: with the query text visible the
+# planner uses the term's frequency, and walks the table instead of the GIN
+# index when a term is so common that the first matches come quickly
+TSQUERY = "websearch_to_tsquery('english', :q)"
+HIGHLIGHT = "StartSel=<mark>, StopSel=</mark>"
+HEADLINE_OPTIONS = f"{HIGHLIGHT}, MaxWords=30, MinWords=10, MaxFragments=2"
+# Only this much of a body is scanned when building its snippet
+SNIPPET_SOURCE_CHARS = 20000
+
+
+def search_query(
+    q: str,
+    limit: int,
+    after: Optional[str] = None,
+    access: Optional[AccessSet] = None,
+    class_id: Optional[int] = None,
+    content_type: Optional[str] = None,
+):
+    """Build the ranked full-text search over course_content.
+
+    Matches come from the GIN index on search_vector. `access` limits students
+    to what the feed would show them; None means no visibility restriction.
+    Terms matching more than SEARCH_RANK_CANDIDATES rows are ranked within the
+    newest that many matches. The first page fixes that window's id range and
+    the cursor carries it, so later pages rank the same rows even as content
+    is added. ts_headline re-parses the source text, so it only runs for the
+    rows of the returned page. Returns (statement, params); pass
+    WINDOW_ATTRS to split_page.
+    """
+    params = {"q": q, "limit": limit + 1, "candidates": SEARCH_RANK_CANDIDATES}
+    conditions = [f"cc.search_vector @@ {TSQUERY}"]
+    if access is not None:
+        params["member_class_ids"] = sorted(access.enrolled | access.ta)
+        params["ta_class_ids"] = sorted(access.ta)
+        # A CASE, not ORs: the planner would otherwise AND the GIN bitmap with
+        # bitmaps over the (large) visibility indexes; this is a cheap filter
+        conditions.append("""CASE cc.visibility
+            WHEN 'public' THEN TRUE
+            WHEN 'enrolled' THEN cc.class_id = ANY(CAST(:member_class_ids AS INTEGER[]))
+            ELSE cc.class_id = ANY(CAST(:ta_class_ids AS INTEGER[]))
+        END""")
+    if class_id:
+        conditions.append("cc.class_id = :class_id")
+        params["class_id"] = class_id
+    if content_type:
+        conditions.append("cc.content_type = :content_type")
+        params["content_type"] = content_type
+
+    cursor_condition = "TRUE"
+    window = "(SELECT MIN(id) FROM candidates) AS window_floor, (SELECT MAX(id) FROM candidates) AS window_top"
+    if after:
+        (params["after_rank"], params["after_id"],
+         params["window_floor"], params["window_top"]) = decode_cursor(after, float, extra=len(WINDOW_ATTRS))
+        conditions.append("cc.id BETWEEN :window_floor AND :window_top")
+        cursor_condition = "(m.rank, m.id) < (CAST(:after_rank AS REAL), :after_id)"
+        window = "CAST(:window_floor AS INTEGER) AS window_floor, CAST(:window_top AS INTEGER) AS window_top"
+
+    # Candidates are picked by id alone, so only they pay for ts_rank
+    statement = statements.text(f"""
+        WITH candidates AS MATERIALIZED (
+            SELECT cc.id
+            FROM course_content cc
+            WHERE {" AND ".join(conditions)}
+            ORDER BY cc.id DESC
+            LIMIT :candidates
+        ),
+        matches AS (
+            SELECT cc.id, ts_rank(cc.search_vector, {TSQUERY}) AS rank
+            FROM candidates m
+            JOIN course_content cc ON cc.id = m.id
+        ),
+        page AS (
+            SELECT m.id, m.rank
+            FROM matches m
+            WHERE {cursor_condition}
+            ORDER BY m.rank DESC, m.id DESC
+            LIMIT :limit
+        )
+        SELECT cc.id, cc.class_id, cc.title, cc.content_type, cc.visibility, cc.created_at, cc.due_date,
+               c.title AS class_title, c.class_code, u.name AS professor_name, p.rank, {window},
+               ts_headline('english', cc.title, {TSQUERY}, '{HIGHLIGHT}, HighlightAll=true') AS title_highlight,
+               ts_headline(
+                   'english',
+                   coalesce(cc.description, '') || ' ' || left(coalesce(cc.content, ''), {SNIPPET_SOURCE_CHARS}),
+                   {TSQUERY},
+                   '{HEADLINE_OPTIONS}'
+               ) AS snippet
+        FROM page p
+        JOIN course_content cc ON cc.id = p.id
+        JOIN classes c ON cc.class_id = c.id
+        JOIN users u ON cc.created_by = u.id
+        ORDER BY p.rank DESC, p.id DESC
+    """)
+    return statement, params
+
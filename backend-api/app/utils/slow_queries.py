@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from app.database import async_engine, engine
+from app.utils.metrics import current_route
+
+logger = logging.getLogger(__name__)
+
+# Statements at or over this many milliseconds are logged (0 turns the log off)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Slow statements kept for /api/admin/slow-queries
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "200"))
+# Fraction of slow SELECTs re-run under EXPLAIN (ANALYZE, BUFFERS); 0 disables it
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", "0"))
+# An EXPLAIN ANALYZE runs the statement again, so it gets a hard limit
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "5000"))
+
+# Captures waiting for the background task; beyond this they are skipped
+EXPLAIN_QUEUE_SIZE = 8
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r"(?:\?|\$\d+|%\(\w+\)s)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_LOCKING_CLAUSE = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE)\b", re.IGNORECASE)
+
+# Set while a plan is captured, so the capture's own statements aren't logged
+_capturing: ContextVar[bool] = ContextVar("slow_query_capturing", default=False)
+
+
+@lru_cache(maxsize=512)
+def normalize_sql(statement: str) -> str:
+    """One line of SQL with literals replaced by ? and IN lists folded.
+
+    Statements that differ only in inlined values or list lengths then read
+    the same in the log.
+    """
+    sql = " ".join(statement.split())
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _PLACEHOLDER_LIST.sub("(...)", sql)
+
+
+def _value_shape(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (list, tuple)):
+        kinds = sorted({type(item).__name__ for item in value}) or ["empty"]
+        return f"{'|'.join(kinds)}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """Types and list lengths of the bound values, never the values themselves."""
+    if executemany:
+        rows = list(parameters or ())
+        return {"rows": len(rows), "each": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: _value_shape(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_value_shape(value) for value in parameters]
+    return None
+
+
+def _explainable(statement: str) -> bool:
+    # Only plain reads: EXPLAIN ANALYZE executes what it explains
+    head = statement.lstrip()[:6].upper()
+    return head == "SELECT" and not _LOCKING_CLAUSE.search(statement)
+
+
+class SlowQueryLog:
+    """Engine hook that logs statements slower than a threshold.
+
+    Each slow statement is logged with its normalized SQL, the shape of its
+    parameters, its duration and the route that ran it, and kept in a ring
+    buffer. A sample of slow SELECTs is handed to a background task that
+    re-runs them under EXPLAIN (ANALYZE, BUFFERS) on its own connection,
+    inside a transaction it rolls back, and attaches the plan to the entry.
+    """
+
+    def __init__(self, threshold_ms: float, buffer_size: int, explain_sample: float):
+        self.threshold = threshold_ms / 1000
+        self.explain_sample = explain_sample
+        self.counters = {"logged": 0, "explained": 0, "explain_failed": 0, "explain_skipped": 0}
+        self._entries = deque(maxlen=buffer_size)
+        # Hooks fire on threadpool threads in sync mode
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def install(self, bound: Engine):
+        event.listen(bound, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(bound, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and not _capturing.get():
+            context._slow_query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed >= self.threshold:
+            self.record(statement, parameters, elapsed, executemany)
+
+    def record(self, statement: str, parameters, elapsed: float, executemany: bool = False):
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(elapsed * 1000, 2),
+            "route": current_route(),
+            "sql": normalize_sql(statement),
+            "params": parameter_shape(parameters, executemany),
+            "plan": None,
+        }
+        logger.warning(
+            "Slow query (%.1f ms) on %s: %s params=%s",
+            entry["duration_ms"], entry["route"] or "-", entry["sql"], entry["params"],
+        )
+        with self._lock:
+            self.counters["logged"] += 1
+            self._entries.append(entry)
+        if (
+            self._loop is not None
+            and not executemany
+            and _explainable(statement)
+            and random.random() < self.explain_sample
+        ):
+            entry["plan"] = "pending"
+            # The raw statement and values go to the capture only, never into the buffer
+            self._loop.call_soon_threadsafe(self._enqueue, entry, statement, parameters)
+
+    def _enqueue(self, entry: dict, statement: str, parameters):
+        try:
+            self._queue.put_nowait((entry, statement, parameters))
+        except asyncio.QueueFull:
+            entry["plan"] = None
+            self.counters["explain_skipped"] += 1
+
+    async def _explain(self, statement: str, parameters) -> str:
+        sql = f"EXPLAIN (ANALYZE, BUFFERS) {statement}"
+        timeout = f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}"
+        if async_engine is not None:
+            async with async_engine.connect() as conn:
+                await conn.exec_driver_sql(timeout)
+                rows = (await conn.exec_driver_sql(sql, parameters)).fetchall()
+                await conn.rollback()
+        else:
+            rows = await run_in_threadpool(self._explain_sync, timeout, sql, parameters)
+        return "\n".join(row[0] for row in rows)
+
+    @staticmethod
+    def _explain_sync(timeout: str, sql: str, parameters):
+        with engine.connect() as conn:
+            conn.exec_driver_sql(timeout)
+            rows = conn.exec_driver_sql(sql, parameters).fetchall()
+            conn.rollback()
+        return rows
+
+    async def _capture_forever(self):
+        _capturing.set(True)
+        while True:
+            entry, statement, parameters = await self._queue.get()
+            try:
+                entry["plan"] = await self._explain(statement, parameters)
+                self.counters["explained"] += 1
+            except Exception as e:
+                entry["plan"] = f"EXPLAIN failed: {e}"
+                self.counters["explain_failed"] += 1
+
+    def entries(self, limit: int) -> list:
+        """Most recent slow statements first."""
+        with self._lock:
+            recent = list(self._entries)
+        return recent[::-1][:limit]
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "threshold_ms": self.threshold * 1000,
+            "explain_sample": self.explain_sample,
+            "buffered": len(self._entries),
+        }
+
+    def start(self):
+        if self._task is None and self.explain_sample > 0:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+            self._task = asyncio.create_task(self._capture_forever())
+
+    async def stop(self):
+        """Stop capturing plans; captures still queued are abandoned."""
+        if self._task is not None:
+            self._loop = None
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+slow_queries = SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_BUFFER, SLOW_QUERY_EXPLAIN_SAMPLE)
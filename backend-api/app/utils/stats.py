@@ -0,0 +1,73 @@
+import asyncio
+import os
+import time
+from sqlalchemy import text
+
+from app.database import DBSession, db_session
+from app.utils.cache import cache_stats
+
+STATS_CACHE_TTL_SECONDS = float(os.getenv("STATS_CACHE_TTL_SECONDS", "5"))
+
+STATS_QUERY = text("SELECT stat_key, CAST(SUM(value) AS BIGINT) AS value FROM system_stats GROUP BY stat_key")
+RECONCILE_QUERY = text("SELECT reconcile_system_stats()")
+
+
+class StatsSnapshot:
+    """In-process copy of the system_stats counters (shards summed) with a short TTL.
+
+    Concurrent dashboard requests that miss the cache share a single refresh
+    instead of each reading the counter table. A refresh that an invalidation
+    overtakes is returned but left expired.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._values = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    async def get(self, db: DBSession) -> dict:
+        if self._values is not None and time.monotonic() < self._expires_at:
+            self.hits += 1
+            return self._values
+        self.misses += 1
+        async with self._lock:
+            if self._values is None or time.monotonic() >= self._expires_at:
+                generation = self._generation
+                rows = (await db.execute(STATS_QUERY)).fetchall()
+                self._values = {row.stat_key: row.value for row in rows}
+                if generation == self._generation:
+                    self._expires_at = time.monotonic() + self.ttl_seconds
+        return self._values
+
+    def invalidate(self):
+        self._generation += 1
+        self._expires_at = 0.0
+
+    def stats(self) -> dict:
+        return cache_stats(int(self._values is not None), self.hits, self.misses, ttl=self.ttl_seconds)
+
+
+dashboard_stats = StatsSnapshot(STATS_CACHE_TTL_SECONDS)
+
+
+async def reconcile_stats(db: DBSession) -> dict:
+    """Recount every table and overwrite the counters."""
+    await db.execute(RECONCILE_QUERY)
+    await db.commit()
+    dashboard_stats.invalidate()
+    return await dashboard_stats.get(db)
+
+
+async def _reconcile_job():
+    async with db_session() as db:
+        for key, value in sorted((await reconcile_stats(db)).items()):
+            print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    # Nightly reconciliation: python -m app.utils.stats
+    asyncio.run(_reconcile_job())
@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+from typing import BinaryIO, List, Optional, Tuple
+from sqlalchemy import text
+
+from app.database import DBSession, copy_rows
+from app.utils.passwords import is_hashed
+
+IMPORT_FIELDS = ("university_id", "username", "password", "name", "email", "role")
+IMPORT_ROLES = ("professor", "student")
+# Column widths from the users table; longer values would abort the whole COPY
+FIELD_LIMITS = {"university_id": 20, "username": 100, "password": 255, "name": 255, "email": 255}
+
+CREATE_STAGING = text("""
+    CREATE TEMP TABLE user_import (
+        line INTEGER NOT NULL,
+        university_id VARCHAR(20) NOT NULL,
+        username VARCHAR(100) NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL,
+        role VARCHAR(20) NOT NULL
+    ) ON COMMIT DROP
+""")
+
+# Rows that collide with existing users are reported, everything else is
+# inserted in one statement; ON CONFLICT covers users created concurrently
+MERGE_STAGING = text("""
+    WITH conflicts AS (
+        SELECT s.line,
+               CASE WHEN EXISTS (SELECT 1 FROM users u WHERE u.university_id = s.university_id)
+                    THEN 'duplicate university_id'
+                    ELSE 'duplicate username'
+               END AS error
+        FROM user_import s
+        WHERE EXISTS (SELECT 1 FROM users u WHERE u.university_id = s.university_id)
+           OR EXISTS (SELECT 1 FROM users u WHERE u.username = s.username)
+    ),
+    inserted AS (
+        INSERT INTO users (university_id, username, password, name, email, role, created_by)
+        SELECT s.university_id, s.username, s.password, s.name, s.email, s.role, :created_by
+        FROM user_import s
+        WHERE NOT EXISTS (SELECT 1 FROM conflicts c WHERE c.line = s.line)
+        ORDER BY s.line
+        ON CONFLICT DO NOTHING
+        RETURNING university_id
+    )
+    SELECT s.line, s.university_id, COALESCE(c.error, 'conflicts with a user created concurrently') AS error
+    FROM user_import s
+    LEFT JOIN conflicts c ON c.line = s.line
+    WHERE NOT EXISTS (SELECT 1 FROM inserted i WHERE i.university_id = s.university_id)
+    ORDER BY s.line
+""")
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in (content_type or ""):
+        return "ndjson"
+    return "csv"
+
+
+def _iter_records(stream: BinaryIO, fmt: str):
+    """Yield (line_number, record_or_None, parse_error) from an upload."""
+    reader_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(reader_stream)
+        for record in reader:
+            yield reader.line_num, record, None
+    else:
+        for line_number, line in enumerate(reader_stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_number, None, "invalid JSON"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "expected a JSON object"
+                continue
+            yield line_number, record, None
+
+
+def parse_upload(stream: BinaryIO, fmt: str) -> Tuple[List[tuple], List[dict], int]:
+    """Validate every record and return (valid_rows, errors, received).
+
+    Runs synchronously; callers push it to the threadpool.
+    """
+    rows, errors = [], []
+    seen_ids, seen_usernames = set(), set()
+    received = 0
+
+    for line, record, parse_error in _iter_records(stream, fmt):
+        received += 1
+        if parse_error:
+            errors.append({"line": line, "university_id": None, "error": parse_error})
+            continue
+
+        values = {field: str(record.get(field) or "").strip() for field in IMPORT_FIELDS}
+        error = None
+        missing = [field for field in IMPORT_FIELDS if not values[field]]
+        if missing:
+            error = f"missing {', '.join(missing)}"
+        elif values["role"] not in IMPORT_ROLES:
+            error = f"bad role {values['role']!r}"
+        else:
+            too_long = [field for field, limit in FIELD_LIMITS.items() if len(values[field]) > limit]
+            if too_long:
+                error = f"too long: {', '.join(too_long)}"
+            elif not is_hashed(values["password"]):
+                error = "password must be a bcrypt hash"
+            elif values["university_id"] in seen_ids:
+                error = "duplicate university_id in upload"
+            elif values["username"] in seen_usernames:
+                error = "duplicate username in upload"
+
+        if error:
+            errors.append({"line": line, "university_id": values["university_id"] or None, "error": error})
+            continue
+
+        seen_ids.add(values["university_id"])
+        seen_usernames.add(values["username"])
+        rows.append((line,) + tuple(values[field] for field in IMPORT_FIELDS))
+
+    return rows, errors, received
+
+
+async def import_users(db: DBSession, rows: List[tuple], created_by: int) -> List[dict]:
+    """COPY validated rows into a staging table and merge them into users.
+
+    Passwords arrive already bcrypt-hashed (parse_upload rejects anything
+    else), so nothing here competes with logins for the hashing pool.
+    Returns the rows that could not be inserted; the caller commits.
+    """
+    await db.execute(CREATE_STAGING)
+    await copy_rows(db, "user_import", ("line",) + IMPORT_FIELDS, rows)
+    await db.execute(text("ANALYZE user_import"))
+    rejected = (await db.execute(MERGE_STAGING, {"created_by": created_by})).fetchall()
+    return [{"line": r.line, "university_id": r.university_id, "error": r.error} for r in rejected]
@@ -0,0 +1,65 @@
+"""Per-request authentication cost: user lookup vs signed token verification.
+
+Times the three ways a request can be authenticated:
+
+  * a primary-key user lookup per request (what the old DB-backed
+    get_current_user did), when --database-url is given
+  * full JWT signature + claims verification (token cache miss)
+  * a verified-token cache hit plus the deny-list check
+
+Run from backend-api so the app package is importable:
+
+    PYTHONPATH=. python benchmarks/auth_cost.py --database-url postgresql://localhost/university_db
+"""
+import argparse
+import os
+import statistics
+import time
+
+from app.utils.auth import create_access_token, decode_token, verified_tokens
+
+
+def time_calls(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return statistics.median(samples) * 1e6, samples[int(len(samples) * 0.99) - 1] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--runs", type=int, default=20_000)
+    args = parser.parse_args()
+
+    token = create_access_token(1, "admin")
+    results = {}
+
+    if args.database_url:
+        import psycopg2
+
+        conn = psycopg2.connect(args.database_url)
+        try:
+            with conn.cursor() as cursor:
+                def lookup():
+                    cursor.execute("SELECT id, role, is_active FROM users WHERE id = %s", (1,))
+                    cursor.fetchone()
+                results["user lookup per request"] = time_calls(lookup, min(args.runs, 5_000))
+        finally:
+            conn.close()
+
+    def verify_uncached():
+        verified_tokens.clear()
+        decode_token(token)
+    results["JWT verify, cache miss"] = time_calls(verify_uncached, args.runs)
+    results["JWT verify, cache hit"] = time_calls(lambda: decode_token(token), args.runs)
+
+    for label, (p50, p99) in results.items():
+        print(f"{label:>26}: p50 {p50:8.1f} us   p99 {p99:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
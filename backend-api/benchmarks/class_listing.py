@@ -0,0 +1,116 @@
+"""Class listing benchmark: correlated COUNT subqueries vs denormalized counts.
+
+Seeds 20k classes and 1M enrollments inside a single transaction, times the
+old per-row COUNT(*) listing against the trigger-maintained columns, then
+rolls everything back. Point it at a database created from database/schema.sql:
+
+    python benchmarks/class_listing.py --database-url postgresql://localhost/university_db
+"""
+import argparse
+import os
+import statistics
+import time
+
+import psycopg2
+
+SEED_SQL = """
+INSERT INTO users (university_id, username, password, name, email, role)
+SELECT 'BPROF' || g, 'bprof' || g, 'x', 'Professor ' || g, 'bprof' || g || '@bench.edu', 'professor'
+FROM generate_series(1, 500) g;
+
+INSERT INTO users (university_id, username, password, name, email, role)
+SELECT 'BSTU' || g, 'bstu' || g, 'x', 'Student ' || g, 'bstu' || g || '@bench.edu', 'student'
+FROM generate_series(1, %(students)s) g;
+
+INSERT INTO classes (class_code, title, professor_id, max_students)
+SELECT 'BENCH' || g, 'Benchmark class ' || g,
+       (SELECT min(id) FROM users WHERE university_id LIKE 'BPROF%%') + g %% 500, 500
+FROM generate_series(1, %(classes)s) g;
+
+-- Every student takes %(per_student)s distinct classes
+INSERT INTO enrollments (class_id, student_id)
+SELECT c.first_id + (s.n * 7919 + k * 4729) %% %(classes)s, s.id
+FROM (SELECT id, row_number() OVER (ORDER BY id) AS n FROM users WHERE university_id LIKE 'BSTU%%') s
+CROSS JOIN generate_series(0, %(per_student)s - 1) k
+CROSS JOIN (SELECT min(id) AS first_id FROM classes WHERE class_code LIKE 'BENCH%%') c;
+
+ANALYZE users;
+ANALYZE classes;
+ANALYZE enrollments;
+"""
+
+QUERIES = {
+    "admin list, correlated COUNT": """
+        SELECT c.*, u.name as professor_name,
+               (SELECT COUNT(*) FROM enrollments WHERE class_id = c.id) as live_enrollment_count
+        FROM classes c
+        LEFT JOIN users u ON c.professor_id = u.id
+        ORDER BY c.created_at DESC, c.id DESC
+    """,
+    "admin list, denormalized": """
+        SELECT c.*, u.name as professor_name
+        FROM classes c
+        LEFT JOIN users u ON c.professor_id = u.id
+        ORDER BY c.created_at DESC, c.id DESC
+    """,
+    "professor list, correlated COUNT x2": """
+        SELECT c.*,
+               (SELECT COUNT(*) FROM enrollments WHERE class_id = c.id) as live_enrollment_count,
+               (SELECT COUNT(*) FROM course_content WHERE class_id = c.id) as live_content_count
+        FROM classes c
+        ORDER BY c.created_at DESC
+    """,
+    "professor list, denormalized": """
+        SELECT c.*
+        FROM classes c
+        ORDER BY c.created_at DESC
+    """,
+}
+
+
+def time_query(cursor, sql, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        cursor.execute(sql)
+        cursor.fetchall()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--classes", type=int, default=20_000)
+    parser.add_argument("--students", type=int, default=50_000)
+    parser.add_argument("--per-student", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.database_url)
+    try:
+        with conn.cursor() as cursor:
+            started = time.perf_counter()
+            cursor.execute(SEED_SQL, {
+                "students": args.students,
+                "classes": args.classes,
+                "per_student": args.per_student,
+            })
+            print(f"seeded {args.classes} classes / {args.students * args.per_student} enrollments "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+            cursor.execute("""
+                SELECT COUNT(*) FROM classes c
+                WHERE enrollment_count <> (SELECT COUNT(*) FROM enrollments WHERE class_id = c.id)
+            """)
+            print(f"classes with drifted enrollment_count: {cursor.fetchone()[0]}")
+
+            for label, sql in QUERIES.items():
+                print(f"{label:>38}: {time_query(cursor, sql, args.runs):9.1f} ms (median of {args.runs})")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
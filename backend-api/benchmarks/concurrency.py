@@ -0,0 +1,76 @@
+"""Concurrency benchmark for the LMS API.
+
+Fires a fixed number of GET requests at one endpoint from N concurrent clients
+and reports throughput and latency percentiles. Run it once per execution mode
+against the same database to compare the async and threadpool-sync paths:
+
+    DB_EXECUTION_MODE=sync  uvicorn app.main:app --port 8000
+    python benchmarks/concurrency.py --path /api/admin/classes --concurrency 200
+
+    DB_EXECUTION_MODE=async uvicorn app.main:app --port 8000
+    python benchmarks/concurrency.py --path /api/admin/classes --concurrency 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run(base_url, path, concurrency, total, token=None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/api/admin/classes")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--token", default=None, help="Bearer token sent with every request")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.path, args.concurrency, args.requests, args.token))
+    for key, value in result.items():
+        print(f"{key:>15}: {value}")
+
+
+if __name__ == "__main__":
+    main()
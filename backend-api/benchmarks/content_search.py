@@ -0,0 +1,113 @@
+"""Full-text search benchmark over course_content.
+
+Seeds 1M content rows whose text is drawn from a skewed synthetic vocabulary
+(a few very common words, a long tail of rare ones), inside a single
+transaction. Times the search statement built by app.utils.search for rare,
+mid-frequency and common terms, for staff and for a student, then rolls
+everything back. Run from backend-api so the app package is importable:
+
+    PYTHONPATH=. python benchmarks/content_search.py --database-url postgresql://localhost/university_db
+"""
+import argparse
+import os
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.utils.feed import AccessSet
+from app.utils.pagination import split_page
+from app.utils.search import WINDOW_ATTRS, search_query
+
+# Word i of the vocabulary is 'w<i>'; power(random(), 4) makes low ids common
+SEED_SQL = """
+INSERT INTO users (university_id, username, password, name, email, role)
+VALUES ('SPROF1', 'sprof1', 'x', 'Search Professor', 'sprof1@bench.edu', 'professor');
+
+INSERT INTO classes (class_code, title, professor_id)
+SELECT 'SRCH' || g, 'Search class ' || g, (SELECT id FROM users WHERE university_id = 'SPROF1')
+FROM generate_series(1, :classes) g;
+
+-- Correlated on g so every row draws its own words
+INSERT INTO course_content (class_id, title, content_type, description, content, visibility, created_by)
+SELECT c.first_id + g % :classes,
+       (SELECT string_agg('w' || (1 + floor(power(random(), 4) * :vocabulary))::int, ' ')
+        FROM generate_series(1, 4 + 0 * g)),
+       'lecture',
+       (SELECT string_agg('w' || (1 + floor(power(random(), 4) * :vocabulary))::int, ' ')
+        FROM generate_series(1, 15 + 0 * g)),
+       (SELECT string_agg('w' || (1 + floor(power(random(), 4) * :vocabulary))::int, ' ')
+        FROM generate_series(1, :body_words + 0 * g)),
+       CASE WHEN g % 5 = 0 THEN 'public' WHEN g % 2 = 0 THEN 'enrolled' ELSE 'private' END,
+       c.professor_id
+FROM generate_series(1, :rows) g
+CROSS JOIN (SELECT min(id) AS first_id, min(professor_id) AS professor_id FROM classes WHERE class_code LIKE 'SRCH%') c;
+
+ANALYZE course_content;
+"""
+
+FREQUENCY_SQL = text("""
+    SELECT word, ndoc FROM ts_stat('SELECT search_vector FROM course_content')
+    ORDER BY ndoc DESC
+""")
+
+
+def time_search(conn, statement, params, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows = conn.execute(statement, params).fetchall()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--classes", type=int, default=20_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--body-words", type=int, default=60)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            started = time.perf_counter()
+            conn.execute(text(SEED_SQL), {
+                "rows": args.rows,
+                "classes": args.classes,
+                "vocabulary": args.vocabulary,
+                "body_words": args.body_words,
+            })
+            print(f"seeded {args.rows} content rows in {time.perf_counter() - started:.1f}s")
+
+            frequencies = conn.execute(FREQUENCY_SQL).fetchall()
+            picks = {
+                "common": frequencies[0],
+                "mid": frequencies[len(frequencies) // 50],
+                "rare": frequencies[len(frequencies) // 2],
+            }
+            first_class = conn.execute(text("SELECT min(id) FROM classes WHERE class_code LIKE 'SRCH%'")).scalar()
+            student = AccessSet(enrolled=frozenset(range(first_class, first_class + 6)), ta=frozenset())
+
+            for label, (word, ndoc) in picks.items():
+                for who, access in (("staff", None), ("student", student)):
+                    statement, params = search_query(word, args.limit, access=access)
+                    first_ms, rows = time_search(conn, statement, params, args.runs)
+                    _, after = split_page(rows, args.limit, sort_attr="rank", extra_attrs=WINDOW_ATTRS)
+                    line = f"{label:>6} '{word}' ({ndoc} docs), {who:>7}: page 1 {first_ms:8.2f} ms"
+                    if after:
+                        statement, params = search_query(word, args.limit, after=after, access=access)
+                        next_ms, _ = time_search(conn, statement, params, args.runs)
+                        line += f", page 2 {next_ms:8.2f} ms"
+                    print(line)
+        finally:
+            transaction.rollback()
+
+
+if __name__ == "__main__":
+    main()
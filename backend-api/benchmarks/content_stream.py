@@ -0,0 +1,207 @@
+"""Idle-connection footprint and fan-out latency of the content stream.
+
+Seeds the load-suite fixtures, boots one uvicorn worker (--boot) or targets a
+running one (--url, with --pid for memory figures), and opens --connections
+event streams spread over --students signed-in students. It reports the
+worker's resident memory before and after, per connection, then has a
+professor publish a public announcement and times how long every stream
+takes to receive it. Finally one stream resumes from the id it was opened at
+with Last-Event-ID and must get that event replayed. Run from backend-api:
+
+    PYTHONPATH=. python benchmarks/content_stream.py --boot \\
+        --database-url postgresql://localhost/university_db --connections 10000
+
+Each connection is a socket on both sides, so the open-file limit (ulimit -n)
+must exceed --connections in this process and the server's.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from concurrency import percentile
+from load_suite import LOAD_PASSWORD, RUN_CONTENT_TITLE, boot_server, cleanup, login, seed
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"no VmRSS for pid {pid}")
+
+
+class Stream:
+    """One raw SSE connection; records when each event id first arrives."""
+
+    def __init__(self, host: str, port: int, token: str):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.received = {}
+        # The id the stream was opened at, which a resume can start from
+        self.start_id = None
+        self.opened = asyncio.Event()
+        self.reader = self.writer = None
+
+    async def open(self, last_event_id=None):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        headers = [
+            "GET /api/student/content/stream HTTP/1.1",
+            f"Host: {self.host}",
+            f"Authorization: Bearer {self.token}",
+            "Accept: text/event-stream",
+        ]
+        if last_event_id is not None:
+            headers.append(f"Last-Event-ID: {last_event_id}")
+        self.writer.write(("\r\n".join(headers) + "\r\n\r\n").encode())
+        await self.writer.drain()
+
+    async def read(self):
+        event_id = kind = None
+        async for raw in self.reader:
+            line = raw.decode().rstrip("\r\n")
+            if line.startswith("retry:"):
+                self.opened.set()
+            elif line.startswith("id:"):
+                event_id = int(line[3:])
+                if self.start_id is None:
+                    self.start_id = event_id
+            elif line.startswith("event:"):
+                kind = line[6:].strip()
+            elif line.startswith("data:") and kind is not None:
+                self.received.setdefault(event_id, (kind, time.perf_counter()))
+                kind = None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def open_streams(host, port, tokens, count, rate):
+    streams = [Stream(host, port, tokens[n % len(tokens)]) for n in range(count)]
+    readers = []
+    gate = asyncio.Semaphore(rate)
+
+    async def start(stream):
+        async with gate:
+            await stream.open()
+            readers.append(asyncio.create_task(stream.read()))
+            await asyncio.wait_for(stream.opened.wait(), timeout=60)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(start(stream) for stream in streams))
+    return streams, readers, time.perf_counter() - started
+
+
+async def run(args):
+    classes = await seed(args.database_url, args)
+    server = None
+    url, pid = args.url, args.pid
+    if args.boot:
+        server, url = boot_server(args)
+        pid = server.pid
+    parts = urlsplit(url)
+    try:
+        async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+            professor = sorted(classes)[0]
+            professor_headers = {"Authorization": f"Bearer {await login(client, professor, LOAD_PASSWORD)}"}
+            admin_headers = {"Authorization": f"Bearer {await login(client, args.admin_id, args.admin_password)}"}
+            tokens = []
+            for n in range(1, min(args.students, args.signed_in_students) + 1):
+                tokens.append(await login(client, f"LOADS{n}", LOAD_PASSWORD))
+
+            before = rss_mb(pid) if pid else None
+            streams, readers, took = await open_streams(parts.hostname, parts.port, tokens, args.connections, args.rate)
+            print(f"opened {len(streams)} streams for {len(tokens)} students in {took:.1f} s")
+            await asyncio.sleep(args.hold)
+            if pid:
+                after = rss_mb(pid)
+                print(f"worker RSS: {before:.1f} MB before, {after:.1f} MB with {len(streams)} idle streams "
+                      f"({(after - before) * 1024 / len(streams):.1f} KB per stream)")
+            hub = (await client.get("/api/admin/content-stream", headers=admin_headers)).json()
+            print(f"hub: {hub['connections']} connections, {hub['readers']} readers, "
+                  f"last event {hub['last_event_id']}")
+
+            published = time.perf_counter()
+            response = await client.post("/api/professor/content/create", headers=professor_headers, json={
+                "class_id": classes[professor][0],
+                "title": f"{RUN_CONTENT_TITLE} stream announcement",
+                "content_type": "announcement",
+                "visibility": "public",
+            })
+            response.raise_for_status()
+            content_id = response.json()["id"]
+
+            deadline = time.monotonic() + args.timeout
+            event_id = None
+            while time.monotonic() < deadline:
+                arrived = [
+                    (eid, at) for stream in streams
+                    for eid, (kind, at) in stream.received.items() if kind == "created"
+                ]
+                event_id = arrived[0][0] if arrived else None
+                if len(arrived) >= len(streams):
+                    break
+                await asyncio.sleep(0.05)
+            delays = sorted(
+                (stream.received[event_id][1] - published) * 1000
+                for stream in streams if event_id in stream.received
+            )
+            print(f"fan-out: {len(delays)}/{len(streams)} streams got event {event_id}; "
+                  f"p50 {statistics.median(delays):.0f} ms, p99 {percentile(delays, 99):.0f} ms, "
+                  f"max {delays[-1]:.0f} ms" if delays else "fan-out: no stream received the event")
+
+            for stream in streams:
+                stream.close()
+            for reader in readers:
+                reader.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+
+            if event_id is not None:
+                resumed = Stream(parts.hostname, parts.port, tokens[0])
+                start_id = streams[0].start_id
+                await resumed.open(last_event_id=start_id)
+                reader = asyncio.create_task(resumed.read())
+                await asyncio.sleep(1)
+                resumed.close()
+                reader.cancel()
+                replayed = resumed.received.get(event_id)
+                print(f"resume after {start_id}: {'replayed ' + replayed[0] if replayed else 'NOT replayed'}")
+
+            await client.delete(f"/api/professor/content/{content_id}", headers=professor_headers)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        await cleanup(args.database_url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "postgresql://localhost/university_db"))
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--pid", type=int, help="worker pid, for memory figures when not booting")
+    parser.add_argument("--boot", action="store_true", help="start uvicorn on a free port")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--rate", type=int, default=200, help="streams being opened at once")
+    parser.add_argument("--hold", type=float, default=5, help="seconds idle before measuring memory")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds to wait for the fan-out")
+    parser.add_argument("--professors", type=int, default=10)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--signed-in-students", type=int, default=200)
+    parser.add_argument("--classes", type=int, default=40)
+    parser.add_argument("--content-per-class", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=412)
+    parser.add_argument("--admin-id", default="ADMIN001")
+    parser.add_argument("--admin-password", default="admin123")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""List projection benchmark: cc.* vs the columns the list endpoints return.
+
+Seeds content-heavy classes (every row carries an incompressible body of
+--body-kb kilobytes, so it lives in the TOAST table) inside a single
+transaction. For a content list page and for a content detail read, compares
+selecting cc.* with the projected query: buffers the server touches to produce
+the rows, bytes sent to the client, and client-side time. Then rolls
+everything back. Run from backend-api:
+
+    python benchmarks/list_projection.py --database-url postgresql://localhost/university_db
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+SEED_SQL = """
+INSERT INTO users (university_id, username, password, name, email, role)
+VALUES ('LPROF1', 'lprof1', 'x', 'Projection Professor', 'lprof1@bench.edu', 'professor');
+
+INSERT INTO classes (class_code, title, professor_id)
+SELECT 'PROJ' || g, 'Projection class ' || g, (SELECT id FROM users WHERE university_id = 'LPROF1')
+FROM generate_series(1, :classes) g;
+
+-- md5 output does not compress, so every body is stored out of line
+INSERT INTO course_content (class_id, title, content_type, description, content, visibility, created_by)
+SELECT c.id, 'Item ' || k, 'lecture', 'Description ' || k,
+       (SELECT string_agg(md5(random()::text), '') FROM generate_series(1, :body_chunks + 0 * k)),
+       'enrolled', c.professor_id
+FROM classes c
+CROSS JOIN generate_series(1, :per_class) k
+WHERE c.class_code LIKE 'PROJ%';
+
+ANALYZE course_content;
+"""
+
+# The list query as it read before projection, and as the endpoint reads now
+LIST_QUERIES = {
+    "cc.*": """
+        SELECT cc.*, c.title as class_title, u.name as professor_name
+        FROM course_content cc
+        JOIN classes c ON cc.class_id = c.id
+        JOIN users u ON cc.created_by = u.id
+        WHERE cc.class_id = :class_id
+        ORDER BY cc.created_at DESC, cc.id DESC
+        LIMIT :limit
+    """,
+    "projected": """
+        SELECT cc.id, cc.class_id, cc.title, cc.content_type, cc.visibility, cc.created_by, cc.created_at,
+               c.title as class_title, u.name as professor_name
+        FROM course_content cc
+        JOIN classes c ON cc.class_id = c.id
+        JOIN users u ON cc.created_by = u.id
+        WHERE cc.class_id = :class_id
+        ORDER BY cc.created_at DESC, cc.id DESC
+        LIMIT :limit
+    """,
+}
+
+DETAIL_QUERY = """
+    SELECT cc.id, cc.class_id, cc.title, cc.content_type, cc.description, {body} AS content,
+           cc.visibility, cc.created_at, cc.due_date,
+           c.title as class_title, c.class_code, u.name as professor_name
+    FROM course_content cc
+    JOIN classes c ON cc.class_id = c.id
+    JOIN users u ON cc.created_by = u.id
+    WHERE cc.id = :content_id
+"""
+DETAIL_QUERIES = {
+    "full body": DETAIL_QUERY.format(body="cc.content"),
+    "preview": DETAIL_QUERY.format(body="left(cc.content, :preview + 1)"),
+}
+
+
+def buffers_touched(conn, query, params):
+    """Shared buffers (hit + read) needed to build the rows as they go out.
+
+    EXPLAIN ANALYZE never detoasts its output, so the rows are rendered to
+    text the way sending them would render them.
+    """
+    plan = conn.execute(
+        text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT length(CAST(q.* AS TEXT)) FROM ({query}) q"),
+        params,
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    top = plan[0]["Plan"]
+    return top["Shared Hit Blocks"] + top["Shared Read Blocks"]
+
+
+def fetch(conn, query, params, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows = conn.execute(text(query), params).fetchall()
+        samples.append(time.perf_counter() - started)
+    sent = sum(len(str(value)) for row in rows for value in row if value is not None)
+    return statistics.median(samples) * 1000, sent
+
+
+def report(conn, label, queries, params, runs):
+    for name, query in queries.items():
+        blocks = buffers_touched(conn, query, params)
+        elapsed_ms, sent = fetch(conn, query, params, runs)
+        print(f"{label:>14} {name:>10}: {blocks:7d} buffers ({blocks * 8 / 1024:8.1f} MiB), "
+              f"{sent / 1024:9.1f} KiB to client, {elapsed_ms:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--per-class", type=int, default=200)
+    parser.add_argument("--body-kb", type=int, default=32)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--preview", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            started = time.perf_counter()
+            conn.execute(text(SEED_SQL), {
+                "classes": args.classes,
+                "per_class": args.per_class,
+                "body_chunks": args.body_kb * 1024 // 32,
+            })
+            print(f"seeded {args.classes * args.per_class} content rows with {args.body_kb} KiB bodies "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+            class_id, content_id = conn.execute(text("""
+                SELECT cc.class_id, cc.id FROM course_content cc
+                JOIN classes c ON c.id = cc.class_id
+                WHERE c.class_code LIKE 'PROJ%' ORDER BY cc.id LIMIT 1
+            """)).first()
+            report(conn, "content page", LIST_QUERIES, {"class_id": class_id, "limit": args.limit + 1}, args.runs)
+            report(conn, "content detail", DETAIL_QUERIES,
+                   {"content_id": content_id, "preview": args.preview}, args.runs)
+        finally:
+            transaction.rollback()
+
+
+if __name__ == "__main__":
+    main()
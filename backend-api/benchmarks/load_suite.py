@@ -0,0 +1,469 @@
+"""Load-test suite: replays traffic mixes against the API and saves JSON baselines.
+
+`run` seeds a fixed set of load-test users, classes, enrollments and content
+(prefixed LOAD, reused across runs), optionally boots uvicorn against the
+same database, logs the virtual users in, and drives each traffic mix for
+--duration seconds from --concurrency clients:
+
+  login-storm          students logging in
+  student-polling      students polling their content feed (half of them
+                       revalidating with If-None-Match) and class list
+  professor-authoring  professors creating content and listing their own
+  admin-listing        admins paging users, classes and content
+  mixed                all of the above, weighted like a weekday
+
+It prints throughput and p50/p95/p99 per endpoint and can save everything
+as JSON. `diff` compares two saved runs endpoint by endpoint. Run from
+backend-api:
+
+    PYTHONPATH=. python benchmarks/load_suite.py run --boot \\
+        --database-url postgresql://localhost/university_db --save baseline.json
+    PYTHONPATH=. python benchmarks/load_suite.py run --url http://localhost:8000 \\
+        --database-url postgresql://localhost/university_db --save candidate.json
+    python benchmarks/load_suite.py diff baseline.json candidate.json
+
+Content created during a run is deleted at the end, so runs start from the
+same data.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import asyncpg
+import httpx
+
+from concurrency import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOAD_PASSWORD = "loadtest"
+RUN_CONTENT_TITLE = "Load run"
+
+# Settings recorded with every run, so baselines say what they measured
+RECORDED_ENV = (
+    "DB_EXECUTION_MODE", "FAST_JSON", "RESPONSE_COMPRESSION", "METRICS_ENABLED",
+    "DB_POOL_SIZE", "DB_MAX_OVERFLOW", "BCRYPT_ROUNDS", "PASSWORD_HASH_WORKERS",
+)
+
+SEED_SQL = [
+    """
+    INSERT INTO users (university_id, username, password, name, email, role)
+    SELECT 'LOADP' || g, 'loadp' || g, $2, 'Load Professor ' || g, 'loadp' || g || '@load.edu', 'professor'
+    FROM generate_series(1, $1::int) g
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO users (university_id, username, password, name, email, role)
+    SELECT 'LOADS' || g, 'loads' || g, $2, 'Load Student ' || g, 'loads' || g || '@load.edu', 'student'
+    FROM generate_series(1, $1::int) g
+    ON CONFLICT DO NOTHING
+    """,
+]
+SEED_CLASSES = """
+    INSERT INTO classes (class_code, title, professor_id)
+    SELECT 'LOAD' || g, 'Load class ' || g, p.id
+    FROM generate_series(1, $1::int) g
+    JOIN users p ON p.university_id = 'LOADP' || (1 + (g - 1) % $2::int)
+    ON CONFLICT DO NOTHING
+"""
+SEED_ENROLLMENTS = """
+    INSERT INTO enrollments (student_id, class_id)
+    SELECT s.id, c.id
+    FROM unnest($1::text[], $2::text[]) AS e(university_id, class_code)
+    JOIN users s ON s.university_id = e.university_id
+    JOIN classes c ON c.class_code = e.class_code
+    ON CONFLICT DO NOTHING
+"""
+SEED_CONTENT = """
+    INSERT INTO course_content (class_id, title, content_type, description, content, visibility, created_by)
+    SELECT c.id, 'Load item ' || g, (ARRAY['lecture', 'assignment', 'material', 'announcement'])[1 + g % 4],
+           'Seeded for the load suite', repeat('Lecture notes. ', 40),
+           (ARRAY['public', 'enrolled', 'enrolled', 'private'])[1 + g % 4], c.professor_id
+    FROM classes c
+    CROSS JOIN generate_series(1, $1::int) g
+    WHERE c.class_code LIKE 'LOAD%'
+      AND NOT EXISTS (SELECT 1 FROM course_content cc WHERE cc.class_id = c.id AND cc.title LIKE 'Load item %')
+"""
+CLEANUP_SQL = """
+    DELETE FROM course_content
+    WHERE title LIKE $1 || '%'
+      AND created_by IN (SELECT id FROM users WHERE university_id LIKE 'LOADP%')
+"""
+
+
+# ---------------------------------------------------------------- fixtures
+
+async def seed(database_url, args):
+    """Create the LOAD fixtures if missing; return class ids per professor."""
+    from app.utils.passwords import hash_password
+
+    password = hash_password(LOAD_PASSWORD)
+    rng = random.Random(args.seed)
+    conn = await asyncpg.connect(database_url.replace("postgresql+asyncpg://", "postgresql://"))
+    try:
+        async with conn.transaction():
+            await conn.execute(SEED_SQL[0], args.professors, password)
+            await conn.execute(SEED_SQL[1], args.students, password)
+            await conn.execute(SEED_CLASSES, args.classes, args.professors)
+            pairs = [
+                (f"LOADS{student}", f"LOAD{class_number}")
+                for student in range(1, args.students + 1)
+                for class_number in rng.sample(range(1, args.classes + 1), min(4, args.classes))
+            ]
+            await conn.execute(SEED_ENROLLMENTS, [s for s, _ in pairs], [c for _, c in pairs])
+            await conn.execute(SEED_CONTENT, args.content_per_class)
+        rows = await conn.fetch(
+            "SELECT u.university_id, c.id FROM classes c JOIN users u ON u.id = c.professor_id "
+            "WHERE c.class_code LIKE 'LOAD%' ORDER BY c.id"
+        )
+    finally:
+        await conn.close()
+    classes = defaultdict(list)
+    for row in rows:
+        classes[row["university_id"]].append(row["id"])
+    return classes
+
+
+async def cleanup(database_url):
+    conn = await asyncpg.connect(database_url.replace("postgresql+asyncpg://", "postgresql://"))
+    try:
+        deleted = await conn.execute(CLEANUP_SQL, RUN_CONTENT_TITLE)
+    finally:
+        await conn.close()
+    return deleted
+
+
+def boot_server(args):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = {**os.environ, "DATABASE_URL": args.database_url}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+        try:
+            if httpx.get(f"{url}/api/health", timeout=1).status_code == 200:
+                return server, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn did not become healthy within 60 s")
+
+
+async def login(client, university_id, password):
+    # Admission control answers 503 while the hash pool is saturated
+    while True:
+        response = await client.post("/api/auth/login", json={"university_id": university_id, "password": password})
+        if response.status_code != 503:
+            response.raise_for_status()
+            return response.json()["access_token"]
+        await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+
+
+async def sign_in(client, args, classes):
+    """Log in every virtual user once, a few at a time."""
+    gate = asyncio.Semaphore(8)
+
+    async def token(university_id, password):
+        async with gate:
+            return await login(client, university_id, password)
+
+    students = [f"LOADS{n}" for n in range(1, min(args.students, args.signed_in_students) + 1)]
+    professors = sorted(classes)
+    tokens = await asyncio.gather(
+        token(args.admin_id, args.admin_password),
+        *(token(university_id, LOAD_PASSWORD) for university_id in professors + students),
+    )
+    return {
+        "admin": [{"Authorization": f"Bearer {tokens[0]}"}],
+        "professor": [
+            {"headers": {"Authorization": f"Bearer {t}"}, "classes": classes[p]}
+            for p, t in zip(professors, tokens[1:1 + len(professors)])
+        ],
+        "student": [{"Authorization": f"Bearer {t}"} for t in tokens[1 + len(professors):]],
+        "student_ids": [f"LOADS{n}" for n in range(1, args.students + 1)],
+    }
+
+
+# ---------------------------------------------------------------- traffic
+
+async def op_login(client, users, rng, state):
+    response = await client.post(
+        "/api/auth/login", json={"university_id": rng.choice(users["student_ids"]), "password": LOAD_PASSWORD}
+    )
+    return "POST /api/auth/login", response
+
+
+async def op_student_feed(client, users, rng, state):
+    response = await client.get("/api/student/content", headers=rng.choice(users["student"]))
+    return "GET /api/student/content", response
+
+
+async def op_student_feed_conditional(client, users, rng, state):
+    index = rng.randrange(len(users["student"]))
+    headers = dict(users["student"][index])
+    etag = state["etags"].get(index)
+    if etag:
+        headers["If-None-Match"] = etag
+    response = await client.get("/api/student/content", headers=headers)
+    if "etag" in response.headers:
+        state["etags"][index] = response.headers["etag"]
+    return "GET /api/student/content (If-None-Match)", response
+
+
+async def op_student_classes(client, users, rng, state):
+    response = await client.get("/api/student/my-classes", headers=rng.choice(users["student"]))
+    return "GET /api/student/my-classes", response
+
+
+async def op_create_content(client, users, rng, state):
+    professor = rng.choice(users["professor"])
+    response = await client.post("/api/professor/content/create", headers=professor["headers"], json={
+        "class_id": rng.choice(professor["classes"]),
+        "title": f"{RUN_CONTENT_TITLE} {rng.randrange(10 ** 9)}",
+        "content_type": rng.choice(["lecture", "assignment", "material", "announcement"]),
+        "description": "Created by the load suite",
+        "content": "Body text. " * rng.randrange(10, 200),
+        "visibility": rng.choice(["public", "enrolled", "private"]),
+    })
+    return "POST /api/professor/content/create", response
+
+
+async def op_professor_content(client, users, rng, state):
+    response = await client.get("/api/professor/content", headers=rng.choice(users["professor"])["headers"])
+    return "GET /api/professor/content", response
+
+
+async def op_professor_classes(client, users, rng, state):
+    response = await client.get("/api/professor/my-classes", headers=rng.choice(users["professor"])["headers"])
+    return "GET /api/professor/my-classes", response
+
+
+async def op_admin_users(client, users, rng, state):
+    response = await client.get("/api/admin/users", headers=users["admin"][0])
+    return "GET /api/admin/users", response
+
+
+async def op_admin_classes(client, users, rng, state):
+    response = await client.get("/api/admin/classes", headers=users["admin"][0])
+    return "GET /api/admin/classes", response
+
+
+async def op_admin_content(client, users, rng, state):
+    response = await client.get("/api/admin/content", headers=users["admin"][0])
+    return "GET /api/admin/content", response
+
+
+# (weight, operation) per mix
+MIXES = {
+    "login-storm": [(1, op_login)],
+    "student-polling": [(5, op_student_feed), (4, op_student_feed_conditional), (1, op_student_classes)],
+    "professor-authoring": [(3, op_create_content), (5, op_professor_content), (2, op_professor_classes)],
+    "admin-listing": [(4, op_admin_users), (3, op_admin_classes), (3, op_admin_content)],
+    "mixed": [
+        (2, op_login),
+        (35, op_student_feed), (25, op_student_feed_conditional), (10, op_student_classes),
+        (4, op_create_content), (8, op_professor_content), (4, op_professor_classes),
+        (4, op_admin_users), (4, op_admin_classes), (4, op_admin_content),
+    ],
+}
+
+
+async def run_mix(client, users, mix, args, seed):
+    weights = [weight for weight, _ in mix]
+    operations = [operation for _, operation in mix]
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    state = {"etags": {}}
+    deadline = time.monotonic() + args.duration
+
+    async def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        while time.monotonic() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            started = time.perf_counter()
+            try:
+                label, response = await operation(client, users, rng, state)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                label, status = operation.__name__, type(e).__name__
+            latencies[label].append(time.perf_counter() - started)
+            statuses[label][status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(seed * 1000 + n) for n in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for label, samples in sorted(latencies.items()):
+        counts = dict(statuses[label])
+        endpoints[label] = {
+            "requests": len(samples),
+            "errors": sum(n for status, n in counts.items() if not status.isdigit() or int(status) >= 400),
+            "statuses": counts,
+            "throughput_rps": round(len(samples) / elapsed, 1),
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        }
+    total = sum(len(samples) for samples in latencies.values())
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1),
+        "endpoints": endpoints,
+    }
+
+
+def print_mix(name, result):
+    print(f"\n{name}: {result['requests']} requests, {result['throughput_rps']} req/s")
+    print(f"  {'endpoint':<44} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for label, stats in result["endpoints"].items():
+        print(f"  {label:<44} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>8} "
+              f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    classes = await seed(args.database_url, args)
+    server = None
+    url = args.url
+    if args.boot:
+        server, url = boot_server(args)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+            users = await sign_in(client, args, classes)
+            mixes = {}
+            for number, name in enumerate(args.mix or MIXES):
+                mixes[name] = await run_mix(client, users, MIXES[name], args, args.seed + number)
+                print_mix(name, mixes[name])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        await cleanup(args.database_url)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "url": url if not args.boot else f"uvicorn --workers {args.workers}",
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "seed": args.seed,
+            "fixtures": {
+                "students": args.students, "professors": args.professors,
+                "classes": args.classes, "content_per_class": args.content_per_class,
+            },
+            "env": {name: os.environ[name] for name in RECORDED_ENV if name in os.environ},
+        },
+        "mixes": mixes,
+    }
+
+
+# ---------------------------------------------------------------- diff
+
+def change(old, new):
+    return (new - old) / old * 100 if old else 0.0
+
+
+def diff(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    print(f"baseline {baseline['meta'].get('commit')} -> candidate {candidate['meta'].get('commit')}")
+
+    regressions = 0
+    for name, mix in candidate["mixes"].items():
+        old_mix = baseline["mixes"].get(name)
+        if old_mix is None:
+            print(f"\n{name}: not in baseline")
+            continue
+        print(f"\n{name}: {old_mix['throughput_rps']} -> {mix['throughput_rps']} req/s "
+              f"({change(old_mix['throughput_rps'], mix['throughput_rps']):+.1f}%)")
+        for label, stats in mix["endpoints"].items():
+            old = old_mix["endpoints"].get(label)
+            if old is None:
+                print(f"  {label:<44} new endpoint")
+                continue
+            cells = []
+            flagged = False
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                delta = change(old[key], stats[key])
+                cells.append(f"{key[:3]} {old[key]:>7} -> {stats[key]:>7} ({delta:+6.1f}%)")
+                flagged |= key == "p95_ms" and delta > args.threshold
+            rps_delta = change(old["throughput_rps"], stats["throughput_rps"])
+            flagged |= rps_delta < -args.threshold
+            regressions += flagged
+            print(f"  {label:<44} {'  '.join(cells)}  req/s {rps_delta:+6.1f}%{'  REGRESSION' if flagged else ''}")
+
+    print(f"\n{regressions} endpoint(s) regressed by more than {args.threshold}% (p95 or throughput)")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="seed fixtures, drive the traffic mixes, report")
+    run_parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    run_parser.add_argument("--url", default="http://localhost:8000", help="server to test (ignored with --boot)")
+    run_parser.add_argument("--boot", action="store_true", help="start uvicorn against --database-url")
+    run_parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --boot")
+    run_parser.add_argument("--mix", action="append", choices=sorted(MIXES), help="repeatable; default all")
+    run_parser.add_argument("--duration", type=float, default=15, help="seconds per mix")
+    run_parser.add_argument("--concurrency", type=int, default=50)
+    run_parser.add_argument("--seed", type=int, default=412)
+    run_parser.add_argument("--students", type=int, default=500)
+    run_parser.add_argument("--signed-in-students", type=int, default=100)
+    run_parser.add_argument("--professors", type=int, default=20)
+    run_parser.add_argument("--classes", type=int, default=60)
+    run_parser.add_argument("--content-per-class", type=int, default=30)
+    run_parser.add_argument("--admin-id", default="ADMIN001")
+    run_parser.add_argument("--admin-password", default="admin123")
+    run_parser.add_argument("--save", help="write the results as JSON")
+
+    diff_parser = commands.add_parser("diff", help="compare two saved runs")
+    diff_parser.add_argument("baseline")
+    diff_parser.add_argument("candidate")
+    diff_parser.add_argument("--threshold", type=float, default=10, help="percent change flagged as a regression")
+    diff_parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if anything regressed")
+
+    args = parser.parse_args()
+    if args.command == "diff":
+        sys.exit(diff(args))
+
+    results = asyncio.run(run(args))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nsaved {args.save}")
+
+
+if __name__ == "__main__":
+    main()
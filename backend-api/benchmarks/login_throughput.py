@@ -0,0 +1,87 @@
+"""Login storm benchmark.
+
+Fires logins for one account from N concurrent clients while a separate
+client keeps polling a cheap endpoint, and reports login throughput, how many
+logins were turned away by admission control (503), and the probe endpoint's
+latency during the storm. The probe shows whether hashing starves the rest of
+the API:
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/login_throughput.py --university-id ADMIN001 --password admin123
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from concurrency import percentile
+
+
+async def run(base_url, credentials, concurrency, total, probe_path):
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    outcomes = {"ok": 0, "rejected": 0, "failed": 0}
+    login_latencies, probe_latencies = [], []
+    remaining = iter(range(total))
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def login_worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/api/auth/login", json=credentials)
+                    if response.status_code == 200:
+                        outcomes["ok"] += 1
+                    elif response.status_code == 503:
+                        outcomes["rejected"] += 1
+                    else:
+                        outcomes["failed"] += 1
+                except httpx.HTTPError:
+                    outcomes["failed"] += 1
+                login_latencies.append(time.perf_counter() - started)
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get(probe_path)
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return {
+        **outcomes,
+        "elapsed_s": round(elapsed, 2),
+        "logins_per_s": round(outcomes["ok"] / elapsed, 1),
+        "login_p50_ms": round(statistics.median(login_latencies) * 1000, 1),
+        "login_p99_ms": round(percentile(login_latencies, 99) * 1000, 1),
+        "probe_p50_ms": round(statistics.median(probe_latencies) * 1000, 2),
+        "probe_p99_ms": round(percentile(probe_latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--university-id", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--probe-path", default="/api/health")
+    args = parser.parse_args()
+
+    credentials = {"university_id": args.university_id, "password": args.password}
+    result = asyncio.run(run(args.url, credentials, args.concurrency, args.requests, args.probe_path))
+    for key, value in result.items():
+        print(f"{key:>14}: {value}")
+
+
+if __name__ == "__main__":
+    main()
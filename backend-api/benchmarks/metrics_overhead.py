@@ -0,0 +1,105 @@
+"""Per-request cost of MetricsMiddleware and the statement-timing hooks.
+
+No database or server needed. Drives a minimal ASGI app directly, with and
+without MetricsMiddleware, to time the middleware alone. Then times
+--queries statements per request against an in-memory SQLite engine, with
+and without request_metrics' cursor hooks installed. Both engines carry the
+StatementStats listener the app already installs, since the first cursor
+listener on an engine is what moves SQLAlchemy off its no-events path. The
+difference is what instrumentation adds to one request. Run from backend-api:
+
+    PYTHONPATH=. python benchmarks/metrics_overhead.py
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.database import StatementStats
+from app.utils.metrics import MetricsMiddleware, RequestMetrics, RequestDB, _request_db
+
+SCOPE = {"type": "http", "method": "GET", "path": "/api/health", "headers": []}
+START = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+BODY = {"type": "http.response.body", "body": b'{"status":"healthy"}'}
+
+
+async def bare_app(scope, receive, send):
+    await send(START)
+    await send(BODY)
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def per_request_us(app, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def per_batch_us(connection, queries: int, batches: int) -> float:
+    statement = text("SELECT 1")
+    started = time.perf_counter()
+    for _ in range(batches):
+        token = _request_db.set(RequestDB())
+        for _ in range(queries):
+            connection.execute(statement)
+        _request_db.reset(token)
+    return (time.perf_counter() - started) / batches * 1e6
+
+
+def paired_medians(baseline, measured, rounds: int):
+    # Alternate the two so clock drift and warm-up hit both alike
+    first, second = [], []
+    for _ in range(rounds):
+        first.append(baseline())
+        second.append(measured())
+    return statistics.median(first), statistics.median(second)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=3, help="statements per simulated request")
+    parser.add_argument("--rounds", type=int, default=7)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    wrapped = MetricsMiddleware(bare_app, RequestMetrics())
+    bare, metered = paired_medians(
+        lambda: loop.run_until_complete(per_request_us(bare_app, args.requests)),
+        lambda: loop.run_until_complete(per_request_us(wrapped, args.requests)),
+        args.rounds,
+    )
+    middleware = metered - bare
+    print(f"{'middleware':>22}: {bare:7.2f} us bare / {metered:7.2f} us metered, +{middleware:.2f} us per request")
+
+    batches = args.requests // args.queries
+    plain_engine = create_engine("sqlite://")
+    hooked_engine = create_engine("sqlite://")
+    for engine in (plain_engine, hooked_engine):
+        StatementStats().install(engine)
+    RequestMetrics().install(hooked_engine)
+    with plain_engine.connect() as plain, hooked_engine.connect() as hooked:
+        without, with_hooks = paired_medians(
+            lambda: per_batch_us(plain, args.queries, batches),
+            lambda: per_batch_us(hooked, args.queries, batches),
+            args.rounds,
+        )
+    hooks = with_hooks - without
+    print(f"{f'{args.queries} statements':>22}: {without:7.2f} us plain / {with_hooks:7.2f} us hooked, "
+          f"+{hooks:.2f} us per request")
+
+    print(f"{'total':>22}: +{middleware + hooks:.2f} us per request (budget 50 us)")
+
+
+if __name__ == "__main__":
+    main()
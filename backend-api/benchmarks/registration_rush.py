@@ -0,0 +1,196 @@
+"""Registration rush: thousands of simultaneous sign-ups, duplicates included.
+
+Fires --registrations requests at POST /api/auth/register from --concurrency
+clients at once. A share of applicants (--duplicate-rate) also send a second
+request reusing their university ID or their email, and a few requests clash
+with the seeded admin account, so the partial unique indexes are raced for
+real. Afterwards it checks that every request either created exactly one
+pending row or was refused with one of the registration conflict messages,
+that no university ID or email has two pending rows, and that nothing failed
+otherwise; it reports throughput and latency. Run from backend-api:
+
+    PYTHONPATH=. python benchmarks/registration_rush.py --boot \\
+        --database-url postgresql://localhost/university_db --registrations 5000
+
+--boot starts uvicorn with BCRYPT_ROUNDS=4 and PASSWORD_HASH_MAX_PENDING at
+--concurrency unless they are set, so the run measures the database path
+rather than password hashing and its admission control. Requests refused with
+503 are retried after Retry-After and counted. The client's connections are
+opened before the rush, a few at a time, so it measures requests rather than
+a connect storm against the listen backlog.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from collections import Counter
+
+import asyncpg
+import httpx
+
+from concurrency import percentile
+from load_suite import boot_server
+
+RUSH_PREFIX = "RUSH"
+
+# The messages app.main.REGISTRATION_CONFLICTS may answer with
+CONFLICT_MESSAGES = {
+    "An account with this university ID already exists",
+    "This username is already taken",
+    "An account with this email already exists",
+    "A pending registration with this university ID already exists",
+    "A pending registration with this email already exists",
+    "A pending registration with this university ID or email already exists",
+}
+
+
+def applications(count, duplicate_rate, seed):
+    rng = random.Random(seed)
+    requests = []
+    n = 0
+    while len(requests) < count:
+        n += 1
+        base = {
+            "university_id": f"{RUSH_PREFIX}{n}",
+            "username": f"rush{n}",
+            "password": "rushpass",
+            "name": f"Rush Applicant {n}",
+            "email": f"rush{n}@rush.edu",
+            "requested_role": rng.choice(["student", "student", "student", "ta", "professor"]),
+        }
+        requests.append(base)
+        if rng.random() < duplicate_rate:
+            if rng.random() < 0.5:
+                requests.append({**base, "username": f"rush{n}b", "email": f"rush{n}b@rush.edu"})
+            else:
+                requests.append({**base, "university_id": f"{RUSH_PREFIX}{n}B", "username": f"rush{n}b"})
+    # Clashes with the seeded admin account
+    requests[:3] = [
+        {**requests[0], "university_id": "ADMIN001"},
+        {**requests[1], "username": "admin"},
+        {**requests[2], "email": "admin@university.edu"},
+    ]
+    rng.shuffle(requests)
+    return requests[:count]
+
+
+async def register(client, payload, retries):
+    # Admission control answers 503 while the hash pool is saturated
+    while True:
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/auth/register", json=payload)
+        except httpx.HTTPError as e:
+            # The request may or may not have reached the database
+            return e, time.perf_counter() - started
+        if response.status_code != 503:
+            return response, time.perf_counter() - started
+        retries[0] += 1
+        await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+
+
+async def warm_up(client, connections, batch=50):
+    for opened in range(0, connections, batch):
+        await asyncio.gather(*(client.get("/api/health") for _ in range(min(batch, connections - opened))))
+
+
+async def cleanup(conn):
+    await conn.execute(
+        "DELETE FROM pending_registrations WHERE university_id LIKE $1 || '%' OR username LIKE 'rush%'",
+        RUSH_PREFIX,
+    )
+
+
+async def run(args):
+    dsn = args.database_url.replace("postgresql+asyncpg://", "postgresql://")
+    conn = await asyncpg.connect(dsn)
+    await cleanup(conn)
+    server = None
+    url = args.url
+    if args.boot:
+        os.environ.setdefault("BCRYPT_ROUNDS", "4")
+        os.environ.setdefault("PASSWORD_HASH_MAX_PENDING", str(args.concurrency))
+        server, url = boot_server(args)
+    try:
+        requests = applications(args.registrations, args.duplicate_rate, args.seed)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        gate = asyncio.Semaphore(args.concurrency)
+        retries = [0]
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+            await warm_up(client, args.concurrency)
+
+            async def send(payload):
+                async with gate:
+                    return await register(client, payload, retries)
+
+            started = time.perf_counter()
+            outcomes = await asyncio.gather(*(send(payload) for payload in requests))
+            elapsed = time.perf_counter() - started
+
+        latencies = sorted(took * 1000 for _, took in outcomes)
+        transport_errors = Counter(
+            type(response).__name__ for response, _ in outcomes if isinstance(response, Exception)
+        )
+        responses = [response for response, _ in outcomes if not isinstance(response, Exception)]
+        accepted = [response for response in responses if response.status_code == 200]
+        refused = Counter(response.json().get("detail") for response in responses if response.status_code == 400)
+        unexpected = Counter(
+            (response.status_code, response.text[:120]) for response in responses
+            if response.status_code not in (200, 400)
+            or (response.status_code == 400 and response.json().get("detail") not in CONFLICT_MESSAGES)
+        )
+        stored = await conn.fetchval(
+            "SELECT COUNT(*) FROM pending_registrations WHERE university_id LIKE $1 || '%' OR username LIKE 'rush%'",
+            RUSH_PREFIX,
+        )
+        doubled = await conn.fetchval("""
+            SELECT COUNT(*) FROM (
+                SELECT university_id FROM pending_registrations WHERE status = 'pending'
+                GROUP BY university_id HAVING COUNT(*) > 1
+                UNION ALL
+                SELECT email FROM pending_registrations WHERE status = 'pending'
+                GROUP BY email HAVING COUNT(*) > 1
+            ) d
+        """)
+
+        print(f"{len(requests)} registrations from {args.concurrency} clients in {elapsed:.2f} s "
+              f"({len(requests) / elapsed:.0f}/s); p50 {statistics.median(latencies):.0f} ms, "
+              f"p99 {percentile(latencies, 99):.0f} ms; {retries[0]} retried after 503")
+        print(f"accepted {len(accepted)}, stored {stored}, refused {sum(refused.values())}")
+        for name, count in transport_errors.items():
+            print(f"  {count:6d}  client-side {name} (outcome unknown)")
+        for message, count in refused.most_common():
+            print(f"  {count:6d}  {message}")
+        print(f"university IDs or emails with two pending rows: {doubled}")
+        for (status_code, body), count in unexpected.most_common():
+            print(f"  UNEXPECTED {count} x {status_code}: {body}")
+        lost = sum(transport_errors.values())
+        ok = len(accepted) <= stored <= len(accepted) + lost and doubled == 0 and not unexpected
+        print("OK" if ok else "FAILED")
+        return ok
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        await cleanup(conn)
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "postgresql://localhost/university_db"))
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--boot", action="store_true", help="start uvicorn on a free port")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--registrations", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2,
+                        help="share of applicants who also send a clashing second request")
+    parser.add_argument("--seed", type=int, default=412)
+    raise SystemExit(0 if asyncio.run(run(parser.parse_args())) else 1)
+
+
+if __name__ == "__main__":
+    main()
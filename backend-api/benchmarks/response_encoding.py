@@ -0,0 +1,128 @@
+"""Response encoding benchmark for a 10k-row get_all_content page.
+
+Seeds --rows content rows inside a single transaction and fetches them with
+the admin content list query, then rolls everything back. Times turning the
+rows into a response body three ways: building dicts with .isoformat() and
+encoding through FastAPI's default path (how the endpoint used to work),
+app.utils.responses.records() through the default path, and records()
+through orjson (FAST_JSON). Then reports the body size raw, gzipped and
+brotli-compressed, with compression time. Run from backend-api:
+
+    PYTHONPATH=. python benchmarks/response_encoding.py --database-url postgresql://localhost/university_db
+"""
+import argparse
+import gzip
+import os
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import create_engine, text
+
+from app.utils.compression import BROTLI_QUALITY, GZIP_LEVEL, brotli
+from app.utils.responses import records
+
+SEED_SQL = """
+INSERT INTO users (university_id, username, password, name, email, role)
+VALUES ('EPROF1', 'eprof1', 'x', 'Encoding Professor', 'eprof1@bench.edu', 'professor');
+
+INSERT INTO classes (class_code, title, professor_id)
+SELECT 'ENC' || g, 'Encoding class ' || g, (SELECT id FROM users WHERE university_id = 'EPROF1')
+FROM generate_series(1, 100) g;
+
+INSERT INTO course_content (class_id, title, content_type, visibility, created_by, created_at)
+SELECT c.first_id + g % 100, 'Lecture ' || g || ': notes and worked examples', 'lecture',
+       CASE WHEN g % 3 = 0 THEN 'public' ELSE 'enrolled' END, c.professor_id,
+       now() - g * INTERVAL '1 minute'
+FROM generate_series(1, :rows) g
+CROSS JOIN (SELECT min(id) AS first_id, min(professor_id) AS professor_id FROM classes WHERE class_code LIKE 'ENC%') c;
+"""
+
+# get_all_content's query, with the page size raised to the whole table
+CONTENT_QUERY = text("""
+    SELECT cc.id, cc.class_id, cc.title, cc.content_type, cc.visibility, cc.created_by, cc.created_at,
+           c.title as class_title, u.name as professor_name
+    FROM course_content cc
+    JOIN classes c ON cc.class_id = c.id
+    JOIN users u ON cc.created_by = u.id
+    WHERE c.class_code LIKE 'ENC%'
+    ORDER BY cc.created_at DESC, cc.id DESC
+    LIMIT :limit
+""")
+
+
+def hand_built(rows):
+    return {
+        "content": [
+            {
+                "id": item.id,
+                "class_id": item.class_id,
+                "class_title": item.class_title,
+                "title": item.title,
+                "content_type": item.content_type,
+                "visibility": item.visibility,
+                "created_by": item.created_by,
+                "professor_name": item.professor_name,
+                "created_at": item.created_at.isoformat() if item.created_at else None
+            }
+            for item in rows
+        ],
+        "next_cursor": None
+    }
+
+
+# What FastAPI does with a returned dict vs a returned ORJSONResponse
+def default_path(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def orjson_path(content):
+    return ORJSONResponse(content).body
+
+
+def median_ms(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            conn.execute(text(SEED_SQL), {"rows": args.rows})
+            rows = conn.execute(CONTENT_QUERY, {"limit": args.rows}).fetchall()
+        finally:
+            transaction.rollback()
+    print(f"{len(rows)} rows")
+
+    paths = {
+        "dicts + .isoformat(), default encoder": lambda: default_path(hand_built(rows)),
+        "records(), default encoder": lambda: default_path({"content": records(rows), "next_cursor": None}),
+        "records(), orjson": lambda: orjson_path({"content": records(rows), "next_cursor": None}),
+    }
+    for label, fn in paths.items():
+        elapsed_ms, body = median_ms(fn, args.runs)
+        print(f"{label:>40}: {elapsed_ms:8.2f} ms, {len(body) / 1024:8.1f} KiB")
+
+    print(f"{'identity':>40}: {len(body) / 1024:8.1f} KiB")
+    elapsed_ms, compressed = median_ms(lambda: gzip.compress(body, GZIP_LEVEL), args.runs)
+    print(f"{f'gzip -{GZIP_LEVEL}':>40}: {len(compressed) / 1024:8.1f} KiB in {elapsed_ms:6.2f} ms")
+    if brotli is not None:
+        elapsed_ms, compressed = median_ms(lambda: brotli.compress(body, quality=BROTLI_QUALITY), args.runs)
+        print(f"{f'brotli q{BROTLI_QUALITY}':>40}: {len(compressed) / 1024:8.1f} KiB in {elapsed_ms:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
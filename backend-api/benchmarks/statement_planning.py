@@ -0,0 +1,141 @@
+"""Planning cost of the login and content-detail queries, unprepared vs prepared.
+
+Seeds users, classes and content inside a single transaction, then for each
+statement from app.queries measures:
+
+  - planning time Postgres reports (EXPLAIN ANALYZE) when the SQL arrives
+    fresh, against EXECUTE of a prepared statement that has settled on its
+    generic plan;
+  - client round-trip time through asyncpg with its statement cache off (a
+    Parse/Describe before every execution) and with a reused prepared
+    statement.
+
+Everything is rolled back. Run from backend-api:
+
+    PYTHONPATH=. python benchmarks/statement_planning.py --database-url postgresql://localhost/university_db
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import asyncpg
+from sqlalchemy.dialects.postgresql import asyncpg as asyncpg_dialect
+
+from app import queries
+
+SEED_SQL = """
+INSERT INTO users (university_id, username, password, name, email, role)
+SELECT 'PLAN' || g, 'plan' || g, 'x', 'Planner ' || g, 'plan' || g || '@bench.edu',
+       CASE WHEN g % 50 = 0 THEN 'professor' ELSE 'student' END
+FROM generate_series(1, $1::int) g;
+
+INSERT INTO classes (class_code, title, professor_id)
+SELECT 'PLN' || g, 'Planning class ' || g, (SELECT min(id) FROM users WHERE university_id LIKE 'PLAN%' AND role = 'professor')
+FROM generate_series(1, 200) g;
+
+INSERT INTO course_content (class_id, title, content_type, description, content, visibility, created_by)
+SELECT c.first_id + g % 200, 'Item ' || g, 'lecture', 'Description ' || g, repeat('body ', 100), 'public', c.professor_id
+FROM generate_series(1, $1::int) g
+CROSS JOIN (SELECT min(id) AS first_id, min(professor_id) AS professor_id FROM classes WHERE class_code LIKE 'PLN%') c;
+"""
+
+# Prepared statements switch to a generic plan after five custom ones
+WARMUP_EXECUTIONS = 10
+
+
+def to_asyncpg(statement, params: dict):
+    """Compile a TextClause to asyncpg's $n SQL and its positional arguments."""
+    compiled = statement.compile(dialect=asyncpg_dialect.dialect())
+    return compiled.string, [params[name] for name in compiled.positiontup]
+
+
+def literal(value) -> str:
+    # EXECUTE takes no bind parameters, so its arguments are spelled out
+    if isinstance(value, int):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+async def planning_ms(conn, sql, args=()):
+    plan = await conn.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", *args)
+    return json.loads(plan)[0]["Planning Time"]
+
+
+async def measure(conn, label, sql, args, runs):
+    # Planning time, SQL sent as-is each time
+    fresh = statistics.median([await planning_ms(conn, sql, args) for _ in range(runs)])
+
+    # Planning time, EXECUTE of a server-side prepared statement
+    await conn.execute(f"PREPARE bench_stmt AS {sql}")
+    execute_sql = f"EXECUTE bench_stmt({', '.join(literal(value) for value in args)})"
+    for _ in range(WARMUP_EXECUTIONS):
+        await conn.fetch(execute_sql)
+    prepared = statistics.median([await planning_ms(conn, execute_sql) for _ in range(runs)])
+    await conn.execute("DEALLOCATE bench_stmt")
+
+    # Round trips
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await conn.fetch(sql, *args)
+        samples.append(time.perf_counter() - started)
+    unprepared_rt = statistics.median(samples) * 1000
+
+    statement = await conn.prepare(sql)
+    for _ in range(WARMUP_EXECUTIONS):
+        await statement.fetch(*args)
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await statement.fetch(*args)
+        samples.append(time.perf_counter() - started)
+    prepared_rt = statistics.median(samples) * 1000
+
+    print(f"{label:>16}: planning {fresh:6.3f} ms fresh / {prepared:6.3f} ms prepared; "
+          f"round trip {unprepared_rt:6.3f} ms unprepared / {prepared_rt:6.3f} ms prepared")
+
+
+async def run(args):
+    # With asyncpg's own statement cache off, fetch() re-parses the SQL on
+    # every call; prepare() still creates a reusable server-side statement
+    conn = await asyncpg.connect(args.database_url.replace("postgresql+asyncpg://", "postgresql://"),
+                                 statement_cache_size=0)
+    transaction = conn.transaction()
+    await transaction.start()
+    try:
+        for statement in SEED_SQL.split(";"):
+            if statement.strip():
+                await conn.execute(statement, *([args.rows] if "$1" in statement else []))
+        university_id = "PLAN7"
+        content_id = await conn.fetchval(
+            "SELECT min(id) FROM course_content WHERE class_id IN (SELECT id FROM classes WHERE class_code LIKE 'PLN%')"
+        )
+
+        cases = [
+            ("login", queries.LOGIN_USER, {"university_id": university_id}),
+            ("content probe", queries.CONTENT_VERSION, {"content_id": content_id}),
+            ("content detail", queries.CONTENT_DETAIL, {"content_id": content_id}),
+            ("content preview", queries.CONTENT_PREVIEW, {"content_id": content_id, "preview": 200}),
+        ]
+        for label, statement, params in cases:
+            sql, positional = to_asyncpg(statement, params)
+            await measure(conn, label, sql, positional, args.runs)
+    finally:
+        await transaction.rollback()
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Student feed benchmark: per-request joins vs the cached access set.
+
+Seeds 20k classes with 50 content rows each (1M rows, mixed visibility) and a
+student enrolled in 6 classes and TA of one more, inside a single transaction.
+Times the first and last page (up to --pages deep) of the feed built by
+app.utils.feed against the straightforward enrollments/ta_assignments join,
+for the whole feed and for class-only content, then rolls everything back. Run from backend-api so the app package is importable:
+
+    PYTHONPATH=. python benchmarks/student_feed.py --database-url postgresql://localhost/university_db
+"""
+import argparse
+import os
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.utils.feed import AccessSet, feed_query
+from app.utils.pagination import split_page
+
+SEED_SQL = """
+INSERT INTO users (university_id, username, password, name, email, role)
+SELECT 'FPROF' || g, 'fprof' || g, 'x', 'Professor ' || g, 'fprof' || g || '@bench.edu', 'professor'
+FROM generate_series(1, 500) g;
+
+INSERT INTO users (university_id, username, password, name, email, role)
+VALUES ('FSTU1', 'fstu1', 'x', 'Feed Student', 'fstu1@bench.edu', 'student');
+
+INSERT INTO classes (class_code, title, professor_id)
+SELECT 'FEED' || g, 'Feed class ' || g,
+       (SELECT min(id) FROM users WHERE university_id LIKE 'FPROF%') + g % 500
+FROM generate_series(1, :classes) g;
+
+-- Spread over a year; a fifth public, the rest split between enrolled and private
+INSERT INTO course_content (class_id, title, content_type, description, content, visibility, created_by, created_at)
+SELECT c.id, 'Item ' || k, 'lecture', 'Description ' || k, repeat('body ', 200),
+       CASE WHEN (c.id + k) % 5 = 0 THEN 'public' WHEN (c.id + k) % 2 = 0 THEN 'enrolled' ELSE 'private' END,
+       c.professor_id, now() - ((c.id * 7919 + k * 104729) % 31536000) * INTERVAL '1 second'
+FROM classes c
+CROSS JOIN generate_series(1, :per_class) k
+WHERE c.class_code LIKE 'FEED%';
+
+INSERT INTO enrollments (class_id, student_id)
+SELECT c.id, u.id
+FROM (SELECT id FROM classes WHERE class_code LIKE 'FEED%' ORDER BY id LIMIT 6) c,
+     (SELECT id FROM users WHERE university_id = 'FSTU1') u;
+
+INSERT INTO ta_assignments (class_id, ta_id)
+SELECT (SELECT max(id) FROM classes), id FROM users WHERE university_id = 'FSTU1';
+
+ANALYZE classes;
+ANALYZE course_content;
+ANALYZE enrollments;
+ANALYZE ta_assignments;
+"""
+
+JOIN_QUERY = """
+    SELECT cc.id, cc.class_id, cc.title, cc.content_type, cc.description, cc.visibility,
+           cc.created_at, cc.due_date, c.title AS class_title, c.class_code, u.name AS professor_name
+    FROM course_content cc
+    JOIN classes c ON cc.class_id = c.id
+    JOIN users u ON cc.created_by = u.id
+    WHERE {public}
+       OR (cc.visibility = 'enrolled' AND (
+               cc.class_id IN (SELECT class_id FROM enrollments WHERE student_id = :student_id)
+            OR cc.class_id IN (SELECT class_id FROM ta_assignments WHERE ta_id = :student_id)))
+       OR (cc.visibility = 'private'
+            AND cc.class_id IN (SELECT class_id FROM ta_assignments WHERE ta_id = :student_id))
+    ORDER BY cc.created_at DESC, cc.id DESC
+    LIMIT :limit
+"""
+
+ACCESS_SQL = text("""
+    SELECT class_id, FALSE AS is_ta FROM enrollments WHERE student_id = :student_id
+    UNION ALL
+    SELECT class_id, TRUE AS is_ta FROM ta_assignments WHERE ta_id = :student_id
+""")
+
+
+def time_query(conn, statement, params, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows = conn.execute(statement, params).fetchall()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--classes", type=int, default=20_000)
+    parser.add_argument("--per-class", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=20, help="depth of the deep-page measurement")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            started = time.perf_counter()
+            conn.execute(text(SEED_SQL), {"classes": args.classes, "per_class": args.per_class})
+            print(f"seeded {args.classes} classes / {args.classes * args.per_class} content rows "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+            student_id = conn.execute(text("SELECT id FROM users WHERE university_id = 'FSTU1'")).scalar()
+            rows = conn.execute(ACCESS_SQL, {"student_id": student_id}).fetchall()
+            access = AccessSet(
+                enrolled=frozenset(r.class_id for r in rows if not r.is_ta),
+                ta=frozenset(r.class_id for r in rows if r.is_ta),
+            )
+
+            # Full feed, and class-only content (visibility=enrolled), where
+            # matching rows are sparse and the join has to walk most of the table
+            for label, public, visibility in (("all", "cc.visibility = 'public'", None),
+                                              ("enrolled", "FALSE", "enrolled")):
+                join_params = {"student_id": student_id, "limit": args.limit + 1}
+                join_ms, _ = time_query(conn, text(JOIN_QUERY.format(public=public)), join_params, args.runs)
+                print(f"{f'{label}: join per request, page 1':>40}: {join_ms:8.2f} ms")
+
+                after, timings = None, []
+                for _ in range(args.pages):
+                    statement, params = feed_query(access, args.limit, after, visibility=visibility)
+                    feed_ms, rows = time_query(conn, statement, params, args.runs)
+                    timings.append(feed_ms)
+                    _, after = split_page(rows, args.limit)
+                    if after is None:
+                        break
+                for page in sorted({1, len(timings)}):
+                    print(f"{f'{label}: access-set feed, page {page}':>40}: {timings[page - 1]:8.2f} ms")
+        finally:
+            transaction.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Fixtures for tests that run against Postgres.
+
+Those tests use TEST_DATABASE_URL and are skipped when it is unset. Its public
+schema is dropped and rebuilt from database/schema.sql before each test, so
+point it at a database kept for the purpose.
+"""
+import asyncio
+import os
+from pathlib import Path
+
+import asyncpg
+import pytest
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.database import to_async_url
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+SCHEMA = Path(__file__).resolve().parents[2] / "database" / "schema.sql"
+
+
+async def _load_schema(dsn: str):
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute("SET client_min_messages = warning")
+        await conn.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+        await conn.execute(SCHEMA.read_text())
+    finally:
+        await conn.close()
+
+
+@pytest.fixture
+def database() -> str:
+    """A plain postgresql:// DSN for a database holding a fresh schema."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    dsn = make_url(TEST_DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+    asyncio.run(_load_schema(dsn))
+    return dsn
+
+
+@pytest.fixture
+def sessions(database):
+    """Makes AsyncSessions on the test database, each on its own connection.
+
+    No connections are pooled, so the factory works from any event loop.
+    """
+    return async_sessionmaker(create_async_engine(to_async_url(database), poolclass=NullPool))
@@ -0,0 +1,145 @@
+"""Invalidations that arrive while a cache is loading from the database.
+
+The database is a stand-in whose execute() blocks until the test lets it
+finish, so an eviction can be delivered between the read and the store.
+"""
+import asyncio
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from app.utils.auth import RevocationList, TokenUser
+from app.utils.feed import StudentAccessCache
+from app.utils.stats import StatsSnapshot
+
+AccessRow = namedtuple("AccessRow", "class_id is_ta")
+StatRow = namedtuple("StatRow", "stat_key value")
+RevokedRow = namedtuple("RevokedRow", "jti user_id revoked_at")
+
+
+class Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class GatedDB:
+    """Answers each query with `rows` as they were when it started (its
+    snapshot), each call waiting for release()."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+        self.started = asyncio.Event()
+        self._gate = asyncio.Event()
+
+    async def execute(self, statement, params=None):
+        self.queries += 1
+        snapshot = self.rows
+        self.started.set()
+        await self._gate.wait()
+        return Result(snapshot)
+
+    def release(self):
+        self._gate.set()
+
+
+def test_access_set_is_cached_without_interference():
+    async def scenario():
+        cache = StudentAccessCache(maxsize=10, ttl=600)
+        db = GatedDB([AccessRow(1, False)])
+        db.release()
+        await cache.get(db, 7)
+        await cache.get(db, 7)
+        return db.queries
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_eviction_during_load_is_not_lost():
+    async def scenario():
+        cache = StudentAccessCache(maxsize=10, ttl=600)
+        db = GatedDB([AccessRow(1, False)])
+        load = asyncio.create_task(cache.get(db, 7))
+        await db.started.wait()
+        # The student was dropped from class 1 after the load's snapshot
+        cache.invalidate([7])
+        db.rows = []
+        db.release()
+        stale = await load
+        fresh = await cache.get(db, 7)
+        return stale, fresh, db.queries, cache.discarded_loads
+
+    stale, fresh, queries, discarded = asyncio.run(scenario())
+    assert stale.enrolled == {1}
+    assert fresh.enrolled == frozenset()
+    assert queries == 2
+    assert discarded == 1
+
+
+def test_eviction_of_another_student_keeps_the_load():
+    async def scenario():
+        cache = StudentAccessCache(maxsize=10, ttl=600)
+        db = GatedDB([AccessRow(1, False)])
+        load = asyncio.create_task(cache.get(db, 7))
+        await db.started.wait()
+        cache.invalidate([8])
+        db.release()
+        await load
+        await cache.get(db, 7)
+        return db.queries
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_clear_during_load_is_not_lost():
+    async def scenario():
+        cache = StudentAccessCache(maxsize=10, ttl=600)
+        db = GatedDB([AccessRow(1, True)])
+        load = asyncio.create_task(cache.get(db, 7))
+        await db.started.wait()
+        cache.clear()
+        db.release()
+        await load
+        await cache.get(db, 7)
+        return db.queries
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_dashboard_invalidation_during_refresh_leaves_it_expired():
+    async def scenario():
+        stats = StatsSnapshot(ttl_seconds=600)
+        db = GatedDB([StatRow("total_users", 1)])
+        refresh = asyncio.create_task(stats.get(db))
+        await db.started.wait()
+        stats.invalidate()
+        db.rows = [StatRow("total_users", 2)]
+        db.release()
+        stale = await refresh
+        fresh = await stats.get(db)
+        return stale, fresh
+
+    stale, fresh = asyncio.run(scenario())
+    assert stale == {"total_users": 1}
+    assert fresh == {"total_users": 2}
+
+
+def test_revocation_applied_during_reload_is_kept():
+    async def scenario():
+        revocations = RevocationList(refresh_seconds=600)
+        db = GatedDB([RevokedRow("old", 1, datetime.utcnow())])
+        reload = asyncio.create_task(revocations.refresh(db))
+        await db.started.wait()
+        # Committed and notified after the reload read the table
+        revocations.apply(["new"], {2: 100.0})
+        db.release()
+        await reload
+        return revocations
+
+    revocations = asyncio.run(scenario())
+    expires = int((datetime.utcnow() + timedelta(hours=1)).timestamp())
+    assert revocations.is_revoked(TokenUser(id=3, role="student", jti="new", issued_at=0, expires_at=expires))
+    assert revocations.is_revoked(TokenUser(id=3, role="student", jti="old", issued_at=0, expires_at=expires))
+    assert revocations.is_revoked(TokenUser(id=2, role="student", jti="x", issued_at=50.0, expires_at=expires))
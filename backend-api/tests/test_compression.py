@@ -0,0 +1,70 @@
+"""Vary and Content-Encoding on responses through CompressionMiddleware."""
+import asyncio
+import gzip
+
+from app.utils.compression import CompressionMiddleware
+
+
+def respond(body: bytes, content_type: bytes = b"application/json", extra_headers=()):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode()),
+                        *extra_headers],
+        })
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+
+def call(app, accept_encoding=None):
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = CompressionMiddleware(app, minimum_size=100)
+    asyncio.run(middleware({"type": "http", "headers": headers}, receive, send))
+    return sent[0]["headers"], b"".join(message.get("body", b"") for message in sent[1:])
+
+
+def values(headers, name):
+    return [value for key, value in headers if key == name]
+
+
+def test_compressed_response_varies_on_accept_encoding():
+    headers, body = call(respond(b"x" * 500), "gzip")
+    assert values(headers, b"content-encoding") == [b"gzip"]
+    assert values(headers, b"vary") == [b"Accept-Encoding"]
+    assert gzip.decompress(body) == b"x" * 500
+
+
+def test_small_response_still_varies():
+    headers, body = call(respond(b"{}"), "gzip")
+    assert values(headers, b"content-encoding") == []
+    assert values(headers, b"vary") == [b"Accept-Encoding"]
+    assert body == b"{}"
+
+
+def test_response_to_client_without_accept_encoding_varies():
+    headers, body = call(respond(b"x" * 500))
+    assert values(headers, b"content-encoding") == []
+    assert values(headers, b"vary") == [b"Accept-Encoding"]
+    assert body == b"x" * 500
+
+
+def test_existing_vary_is_merged_not_repeated():
+    headers, _ = call(respond(b"x" * 500, extra_headers=[(b"vary", b"Authorization")]), "gzip")
+    assert values(headers, b"vary") == [b"Authorization, Accept-Encoding"]
+    headers, _ = call(respond(b"{}", extra_headers=[(b"vary", b"accept-encoding")]), "gzip")
+    assert values(headers, b"vary") == [b"accept-encoding"]
+
+
+def test_event_stream_is_left_alone():
+    headers, _ = call(respond(b"x" * 500, content_type=b"text/event-stream"), "gzip")
+    assert values(headers, b"content-encoding") == []
+    assert values(headers, b"vary") == []
@@ -0,0 +1,151 @@
+"""Content streams: a hub that can't read the event log, and many idle
+streams against Postgres (see conftest.py)."""
+import asyncio
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+
+from sqlalchemy import event, text
+
+from app.utils import content_stream
+from app.utils.content_stream import ACCESS_LOADS, ContentStreamHub
+from app.utils.feed import student_access
+from app.utils.notifications import PostgresListener
+
+# Scaled down from benchmarks/content_stream.py's 10,000
+STREAMS = 1000
+STUDENTS = 10
+# Generous: a subscription is a suspended generator, an Event and a deque
+MAX_BYTES_PER_STREAM = 8 * 1024
+MAX_FAN_OUT_SECONDS = 5
+
+SETUP = text("""
+    WITH people AS (
+        INSERT INTO users (university_id, username, password, name, email, role)
+        SELECT 'S' || n, 'student' || n, 'hash', 'Student ' || n, 'student' || n || '@uni.edu', 'student'
+        FROM generate_series(1, :students) n
+        UNION ALL
+        SELECT 'P1', 'prof', 'hash', 'Prof', 'prof@uni.edu', 'professor'
+        RETURNING id, role
+    ),
+    taught AS (
+        INSERT INTO classes (class_code, title, professor_id)
+        SELECT 'C1', 'C1', id FROM people WHERE role = 'professor'
+        RETURNING id
+    )
+    INSERT INTO enrollments (student_id, class_id)
+    SELECT people.id, taught.id FROM people, taught WHERE role = 'student'
+""")
+STUDENT_IDS = text("SELECT id FROM users WHERE role = 'student' ORDER BY id")
+PUBLISH = text("""
+    INSERT INTO course_content (class_id, title, content_type, visibility, created_by)
+    SELECT id, 'Announcement', 'announcement', 'public', professor_id FROM classes
+    RETURNING id
+""")
+
+
+async def next_event(stream) -> str:
+    """The stream's next frame that isn't a heartbeat."""
+    while True:
+        frame = await stream.__anext__()
+        if not frame.startswith(": ping"):
+            return frame
+
+
+def test_stream_gives_up_when_the_log_is_never_read(monkeypatch):
+    monkeypatch.setattr(content_stream, "READY_SECONDS", 0.05)
+
+    async def scenario():
+        # Never started, as if every read of the log had failed
+        hub = ContentStreamHub(queue_size=8, ping_seconds=60, replay_limit=100, retention_hours=24)
+        frames = [frame async for frame in hub.stream(user_id=1)]
+        return frames, hub.stats()
+
+    frames, stats = asyncio.run(scenario())
+    assert len(frames) == 1
+    assert frames[0].startswith(f"retry: {content_stream.RETRY_MS}\n")
+    assert "event: unavailable\n" in frames[0]
+    assert stats["unavailable"] == 1
+    assert stats["connections"] == 0
+
+
+def test_idle_streams_hold_no_connections_and_share_one_read(database, sessions, monkeypatch):
+    engine = sessions.kw["bind"].sync_engine
+    connections = {"open": 0, "peak": 0, "checkouts": 0}
+
+    def checked_out(*args):
+        connections["open"] += 1
+        connections["checkouts"] += 1
+        connections["peak"] = max(connections["peak"], connections["open"])
+
+    def checked_in(*args):
+        connections["open"] -= 1
+
+    event.listen(engine, "checkout", checked_out)
+    event.listen(engine, "checkin", checked_in)
+
+    @asynccontextmanager
+    async def test_session():
+        async with sessions() as db:
+            yield db
+
+    monkeypatch.setattr(content_stream, "db_session", test_session)
+    # Ids restart with each fresh schema; don't reuse another test's access sets
+    student_access.clear()
+
+    async def scenario():
+        async with sessions() as db:
+            await db.execute(SETUP, {"students": STUDENTS})
+            await db.commit()
+            student_ids = (await db.execute(STUDENT_IDS)).scalars().all()
+
+        listener = PostgresListener(database)
+        hub = ContentStreamHub(queue_size=8, ping_seconds=60, replay_limit=100, retention_hours=24)
+        hub.install(listener)
+        listener.start()
+        hub.start()
+        streams = []
+        try:
+            while not listener.connected:
+                await asyncio.sleep(0.01)
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            for n in range(STREAMS):
+                stream = hub.stream(student_ids[n % STUDENTS])
+                await stream.__anext__()  # the opening retry/id frame
+                streams.append(stream)
+            after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+            opened = {**connections, **hub.stats()}
+
+            checkouts = connections["checkouts"]
+            async with sessions() as db:
+                await db.execute(PUBLISH)
+                await db.commit()
+            published = time.perf_counter()
+            frames = await asyncio.wait_for(
+                asyncio.gather(*(next_event(stream) for stream in streams)), timeout=MAX_FAN_OUT_SECONDS,
+            )
+            fan_out = time.perf_counter() - published
+            # The publish itself took one connection
+            reads = connections["checkouts"] - checkouts - 1
+            return grown, opened, frames, fan_out, reads, dict(connections), hub.stats()
+        finally:
+            await hub.stop()
+            await listener.stop()
+            for stream in streams:
+                await stream.aclose()
+
+    grown, opened, frames, fan_out, reads, idle, stats = asyncio.run(scenario())
+    assert opened["connections"] == STREAMS
+    assert grown / STREAMS < MAX_BYTES_PER_STREAM
+    # Access sets load a few at a time, then idle streams hold no connection
+    assert opened["peak"] <= ACCESS_LOADS + 1
+    assert opened["open"] == 0
+    assert all("event: created\n" in frame for frame in frames)
+    assert fan_out < MAX_FAN_OUT_SECONDS
+    # One read of the log serves every stream
+    assert reads <= 2
+    assert idle["open"] == 0
+    assert stats["listener_connected"] and stats["dropped_slow"] == 0
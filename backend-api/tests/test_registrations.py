@@ -0,0 +1,187 @@
+"""Registration requests and their review, against Postgres (see conftest.py)."""
+import asyncio
+
+from sqlalchemy import text
+
+from app.queries import SUBMIT_REGISTRATION
+from app.utils.registrations import CONFLICT_NOTE, review_registrations
+
+SUBMIT = text("""
+    INSERT INTO pending_registrations (university_id, username, password, name, email, requested_role, requested_at)
+    VALUES (:university_id, :username, 'hash', :username, :email, 'student',
+            CURRENT_TIMESTAMP + CAST(:order AS INTEGER) * INTERVAL '1 second')
+    RETURNING id
+""")
+STATUSES = text("SELECT id, status, review_note FROM pending_registrations ORDER BY id")
+ADMIN_ID = text("SELECT id FROM users WHERE username = 'admin'")
+PENDING = text("""
+    SELECT university_id, email FROM pending_registrations WHERE status = 'pending' ORDER BY university_id
+""")
+LOCK_WAITERS = text("""
+    SELECT COUNT(*) FROM pg_stat_activity
+    WHERE datname = current_database() AND wait_event_type = 'Lock'
+""")
+
+
+def application(university_id, username, email):
+    return {
+        "university_id": university_id,
+        "username": username,
+        "password": "hash",
+        "name": username,
+        "email": email,
+        "requested_role": "student",
+        "reason": None,
+    }
+
+
+async def submit(sessions, params):
+    async with sessions() as db:
+        row = (await db.execute(SUBMIT_REGISTRATION, params)).first()
+        await db.commit()
+    return row
+
+
+async def lock_waiters(sessions) -> int:
+    # A fresh transaction each time: pg_stat_activity is read once per transaction
+    async with sessions() as db:
+        return (await db.execute(LOCK_WAITERS)).scalar()
+
+
+def test_concurrent_submissions_leave_one_pending_request(sessions):
+    async def scenario():
+        same_id = [application("DUP1", f"by-id-{n}", f"by-id-{n}@uni.edu") for n in range(12)]
+        same_email = [application(f"E{n}", f"by-email-{n}", "dup@uni.edu") for n in range(12)]
+        results = await asyncio.gather(*(submit(sessions, params) for params in same_id + same_email))
+        async with sessions() as db:
+            pending = (await db.execute(PENDING)).fetchall()
+        return results[:12], results[12:], pending
+
+    by_id, by_email, pending = asyncio.run(scenario())
+    assert sum(row.conflict is None for row in by_id) == 1
+    assert {row.conflict for row in by_id} <= {None, "pending_university_id", "pending"}
+    assert sum(row.conflict is None for row in by_email) == 1
+    assert {row.conflict for row in by_email} <= {None, "pending_email", "pending"}
+    assert all((row.id is None) == (row.conflict is not None) for row in by_id + by_email)
+    assert [row.university_id for row in pending if row.university_id == "DUP1"] == ["DUP1"]
+    assert [row.email for row in pending].count("dup@uni.edu") == 1
+    assert len(pending) == 2
+
+
+def test_submission_racing_an_uncommitted_request_reports_pending(sessions):
+    async def scenario():
+        async with sessions() as first:
+            await first.execute(SUBMIT_REGISTRATION, application("RACE1", "racer", "racer@uni.edu"))
+            # Blocks on the unique index until the first request commits, by
+            # which time its own snapshot is too old to see that row
+            second = asyncio.create_task(submit(sessions, application("RACE1", "racer2", "racer2@uni.edu")))
+            while not await lock_waiters(sessions):
+                await asyncio.sleep(0.01)
+            await first.commit()
+            result = await second
+            third = await submit(sessions, application("RACE1", "racer3", "racer3@uni.edu"))
+        return result, third
+
+    result, third = asyncio.run(scenario())
+    assert (result.id, result.conflict) == (None, "pending")
+    # Once committed, the clash is named
+    assert (third.id, third.conflict) == (None, "pending_university_id")
+
+
+def test_submission_clashing_with_an_account_names_it(sessions):
+    async def scenario():
+        return [
+            await submit(sessions, application("ADMIN001", "someone", "someone@uni.edu")),
+            await submit(sessions, application("NEW1", "admin", "someone@uni.edu")),
+            await submit(sessions, application("NEW1", "someone", "admin@university.edu")),
+        ]
+
+    assert [row.conflict for row in asyncio.run(scenario())] == ["university_id", "username", "email"]
+
+
+def test_conflicting_approvals_are_rejected_and_leave_the_queue(sessions):
+    async def scenario():
+        async with sessions() as db:
+            admin_id = (await db.execute(ADMIN_ID)).scalar()
+            applicants = [
+                ("U1", "first", "first@uni.edu"),
+                # Same username as the request before it, in the same batch
+                ("U2", "first", "second@uni.edu"),
+                ("U3", "third", "third@uni.edu"),
+                ("U4", "fourth", "fourth@uni.edu"),
+            ]
+            ids = []
+            for order, (university_id, username, email) in enumerate(applicants):
+                ids.append((await db.execute(SUBMIT, {
+                    "university_id": university_id, "username": username, "email": email, "order": order,
+                })).scalar())
+            # An account for U3 created by hand after U3 applied
+            await db.execute(text("""
+                INSERT INTO users (university_id, username, password, name, email, role)
+                VALUES ('U3', 'made-by-hand', 'hash', 'By Hand', 'hand@uni.edu', 'student')
+            """))
+            await db.commit()
+
+            summary = await review_registrations(db, admin_id, approve=True, limit=10)
+            await db.commit()
+            again = await review_registrations(db, admin_id, approve=True, limit=10)
+            await db.commit()
+            statuses = (await db.execute(STATUSES)).fetchall()
+        return ids, summary, again, statuses
+
+    ids, summary, again, statuses = asyncio.run(scenario())
+    outcomes = {result["registration_id"]: result["outcome"] for result in summary["results"]}
+    assert outcomes == {ids[0]: "approved", ids[1]: "conflict", ids[2]: "conflict", ids[3]: "approved"}
+    assert (summary["approved"], summary["conflict"]) == (2, 2)
+    assert [(row.id, row.status, row.review_note) for row in statuses] == [
+        (ids[0], "approved", None),
+        (ids[1], "rejected", CONFLICT_NOTE),
+        (ids[2], "rejected", CONFLICT_NOTE),
+        (ids[3], "approved", None),
+    ]
+    # Nothing is left pending for the next review to pick up again
+    assert again["requested"] == 0
+
+
+def test_conflicting_approval_by_id_is_rejected(sessions):
+    async def scenario():
+        async with sessions() as db:
+            admin_id = (await db.execute(ADMIN_ID)).scalar()
+            registration_id = (await db.execute(SUBMIT, {
+                "university_id": "ADMIN001", "username": "second-admin", "email": "other@uni.edu", "order": 0,
+            })).scalar()
+            await db.commit()
+            first = await review_registrations(db, admin_id, approve=True, ids=[registration_id])
+            await db.commit()
+            second = await review_registrations(db, admin_id, approve=True, ids=[registration_id])
+            await db.commit()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["results"][0]["outcome"] == "conflict"
+    assert second["results"][0]["outcome"] == "already_processed"
+
+
+def test_approval_whose_email_was_taken_since_is_rejected(sessions):
+    async def scenario():
+        async with sessions() as db:
+            admin_id = (await db.execute(ADMIN_ID)).scalar()
+            registration_id = (await db.execute(SUBMIT, {
+                "university_id": "U9", "username": "ninth", "email": "taken@uni.edu", "order": 0,
+            })).scalar()
+            # An account with the same email, created after the request
+            await db.execute(text("""
+                INSERT INTO users (university_id, username, password, name, email, role)
+                VALUES ('OTHER9', 'other-ninth', 'hash', 'Other', 'taken@uni.edu', 'student')
+            """))
+            await db.commit()
+            summary = await review_registrations(db, admin_id, approve=True, ids=[registration_id])
+            await db.commit()
+            accounts = (await db.execute(text("SELECT COUNT(*) FROM users WHERE email = 'taken@uni.edu'"))).scalar()
+            statuses = (await db.execute(STATUSES)).fetchall()
+        return summary, accounts, statuses
+
+    summary, accounts, statuses = asyncio.run(scenario())
+    assert summary["results"][0]["outcome"] == "conflict"
+    assert accounts == 1
+    assert [(row.status, row.review_note) for row in statuses] == [("rejected", CONFLICT_NOTE)]
@@ -0,0 +1,55 @@
+"""Content search visibility, against Postgres (see conftest.py)."""
+import asyncio
+import json
+
+from sqlalchemy import text
+from starlette.responses import Response
+
+from app.main import search_content
+from app.utils.auth import TokenUser
+from app.utils.feed import student_access
+
+SETUP = text("""
+    WITH people AS (
+        INSERT INTO users (university_id, username, password, name, email, role) VALUES
+            ('P1', 'prof', 'hash', 'Prof', 'prof@uni.edu', 'professor'),
+            ('T1', 'ta', 'hash', 'TA', 'ta@uni.edu', 'ta')
+        RETURNING id, role
+    ),
+    taught AS (
+        INSERT INTO classes (class_code, title, professor_id)
+        SELECT code, code, id FROM people, (VALUES ('MINE'), ('OTHER')) v(code) WHERE role = 'professor'
+        RETURNING id, class_code, professor_id
+    ),
+    assigned AS (
+        INSERT INTO ta_assignments (class_id, ta_id)
+        SELECT taught.id, people.id FROM taught, people WHERE class_code = 'MINE' AND role = 'ta'
+    )
+    INSERT INTO course_content (class_id, title, content_type, visibility, created_by)
+    SELECT taught.id, v.title, 'announcement', v.visibility, taught.professor_id
+    FROM taught JOIN (VALUES
+        ('MINE', 'Midterm quiz key', 'private'),
+        ('OTHER', 'Final quiz key', 'private'),
+        ('OTHER', 'Enrolled quiz notes', 'enrolled'),
+        ('OTHER', 'Public quiz schedule', 'public')
+    ) AS v(class_code, title, visibility) ON v.class_code = taught.class_code
+""")
+TA_ID = text("SELECT id FROM users WHERE username = 'ta'")
+
+
+def test_ta_cannot_find_another_class_s_hidden_content(sessions):
+    async def scenario():
+        # Ids restart with each fresh schema; don't reuse another test's access sets
+        student_access.clear()
+        async with sessions() as db:
+            await db.execute(SETUP)
+            await db.commit()
+            ta = TokenUser(id=(await db.execute(TA_ID)).scalar(), role="ta", jti="t", issued_at=0, expires_at=0)
+            return await search_content(
+                q="quiz", class_id=None, content_type=None, limit=20, after=None, current_user=ta, db=db,
+            )
+
+    page = asyncio.run(scenario())
+    if isinstance(page, Response):
+        page = json.loads(page.body)
+    assert sorted(result["title"] for result in page["results"]) == ["Midterm quiz key", "Public quiz schedule"]
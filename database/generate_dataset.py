@@ -0,0 +1,449 @@
+"""Synthetic university dataset generator for scale testing.
+
+Fills users, classes, enrollments, ta_assignments, course_content,
+pending_registrations and student_doubts with roughly --rows rows in total
+(1k to 10M), deterministically from --seed:
+
+  - class sizes follow a Zipf distribution: a few huge intro courses, a long
+    tail of small seminars;
+  - content arrives in bursts (a batch of uploads before a lecture or a
+    deadline), with lognormal body sizes plus a fraction of very large ones;
+  - classes belong to terms, and assignment due dates fall inside their term.
+
+Rows are written to temporary CSV files and loaded with COPY in a single
+transaction. Secondary indexes are dropped before the load and rebuilt after
+it. The counter triggers are paused for the load, and the counters are then
+rebuilt with reconcile_system_stats(). All generated accounts share one
+password (--password). Timestamps derive from --epoch, not the clock, so the
+same seed, size and starting database give the same rows (only the bcrypt
+salt of that shared password differs).
+
+    python database/generate_dataset.py --database-url postgresql://localhost/university_db \\
+        --rows 1000000 --seed 7 --truncate
+"""
+import argparse
+import bisect
+import csv
+import itertools
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import bcrypt
+import psycopg2
+
+TABLES = (
+    "users", "classes", "enrollments", "ta_assignments",
+    "course_content", "student_doubts", "pending_registrations",
+)
+
+# Share of --rows per table. Enrollments dominate, as in a real registrar.
+SHARES = {
+    "students": 0.08,
+    "professors": 0.002,
+    "classes": 0.005,
+    "enrollments": 0.45,
+    "course_content": 0.25,
+    "student_doubts": 0.15,
+    "pending_registrations": 0.05,
+}
+
+TERM_WEEKS = 16
+TERMS = ("Spring", "Summer", "Fall")
+TERM_START_MONTH = {"Spring": 1, "Summer": 5, "Fall": 8}
+
+CONTENT_TYPES = ("lecture", "assignment", "material", "announcement")
+CONTENT_TYPE_WEIGHTS = (40, 25, 25, 10)
+VISIBILITIES = ("enrolled", "public", "private")
+VISIBILITY_WEIGHTS = (60, 25, 15)
+
+SUBJECTS = (
+    "Algorithms", "Databases", "Operating Systems", "Linear Algebra", "Statistics", "Organic Chemistry",
+    "Microeconomics", "World History", "Genetics", "Compilers", "Machine Learning", "Thermodynamics",
+    "Discrete Mathematics", "Computer Networks", "Philosophy of Mind", "Cell Biology", "Calculus",
+)
+WORDS = (
+    "the", "of", "and", "query", "index", "proof", "lemma", "matrix", "vector", "theorem", "example",
+    "exercise", "chapter", "reading", "solution", "function", "model", "data", "analysis", "system",
+    "process", "energy", "market", "cell", "graph", "tree", "table", "join", "plan", "cost", "week",
+    "lecture", "notes", "review", "problem", "set", "due", "submit", "grade", "office", "hours",
+    "definition", "result", "method", "sample", "error", "variance", "kernel", "memory", "thread",
+)
+FIRST_NAMES = (
+    "Alex", "Sam", "Jordan", "Taylor", "Priya", "Wei", "Maria", "Omar", "Lena", "Diego", "Aisha", "Kenji",
+    "Noah", "Emma", "Liam", "Olivia", "Ravi", "Chloe", "Mateo", "Fatima", "Ivan", "Zoe", "Hiro", "Nia",
+)
+LAST_NAMES = (
+    "Smith", "Patel", "Chen", "Garcia", "Kim", "Nguyen", "Johnson", "Okafor", "Müller", "Rossi", "Silva",
+    "Cohen", "Tanaka", "Haddad", "Novak", "Brown", "Lopez", "Singh", "Ivanova", "Dubois", "Walker",
+)
+QUESTIONS = (
+    "Could you explain step {n} of the worked example again?",
+    "Is problem {n} asking for the average or the worst case?",
+    "I get a different answer for exercise {n}; where does the extra term come from?",
+    "Will question {n} be on the midterm?",
+    "Can we use the library function in part {n} or must we implement it?",
+)
+
+
+class CsvSpool:
+    """A table's rows as CSV in a temporary file, ready for COPY."""
+
+    def __init__(self, table, columns):
+        self.table = table
+        self.columns = columns
+        self.rows = 0
+        self.file = tempfile.TemporaryFile(mode="w+", newline="", encoding="utf-8")
+        self._writer = csv.writer(self.file)
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self.rows += 1
+
+    def copy_into(self, cursor):
+        self.file.seek(0)
+        cursor.copy_expert(
+            f"COPY {self.table} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv)",
+            self.file, size=1 << 20,
+        )
+        self.file.close()
+
+
+def zipf_weights(n, exponent):
+    return [1 / (rank ** exponent) for rank in range(1, n + 1)]
+
+
+def term_start(index, first_year):
+    """Start date of the index-th term counting from Spring of first_year."""
+    year = first_year + index // len(TERMS)
+    season = TERMS[index % len(TERMS)]
+    return season, date(year, TERM_START_MONTH[season], 8)
+
+
+def ts(value):
+    return value.isoformat(sep=" ")
+
+
+class Generator:
+    def __init__(self, args, offsets, admin_id, password_hash):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.offsets = offsets
+        self.admin_id = admin_id
+        self.password_hash = password_hash
+        self.epoch = datetime.combine(args.epoch, datetime.min.time())
+        rows = args.rows
+        self.n_students = max(20, int(rows * SHARES["students"]))
+        self.n_professors = max(2, int(rows * SHARES["professors"]))
+        self.n_classes = max(3, int(rows * SHARES["classes"]))
+        self.n_enrollments = max(self.n_classes * 3, int(rows * SHARES["enrollments"]))
+        self.n_content = max(self.n_classes, int(rows * SHARES["course_content"]))
+        self.n_doubts = int(rows * SHARES["student_doubts"])
+        self.n_pending = int(rows * SHARES["pending_registrations"])
+        # One long stretch of generated prose; bodies are slices of it
+        corpus = " ".join(self.rng.choices(WORDS, k=(args.max_body_kb * 1024) // 5 + 1024))
+        while len(corpus) <= args.max_body_kb * 1024:
+            corpus += " " + corpus
+        self.corpus = corpus
+        self.spools = {}
+
+    def spool(self, table, columns):
+        self.spools[table] = CsvSpool(table, columns)
+        return self.spools[table]
+
+    def body(self):
+        rng = self.rng
+        if rng.random() < self.args.large_body_fraction:
+            length = rng.randint(32 * 1024, self.args.max_body_kb * 1024)
+        else:
+            length = min(int(rng.lognormvariate(math.log(self.args.median_body_bytes), 1.0)), 32 * 1024)
+        start = rng.randrange(0, len(self.corpus) - length)
+        return self.corpus[start:start + length]
+
+    def person(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    # ---- users ----
+
+    def users(self):
+        out = self.spool("users", (
+            "id", "university_id", "username", "password", "name", "email", "role",
+            "office_hours", "created_by", "created_at", "last_login", "is_active",
+        ))
+        rng = self.rng
+        next_id = self.offsets["users"] + 1
+        self.professor_ids = list(range(next_id, next_id + self.n_professors))
+        self.student_ids = list(range(next_id + self.n_professors, next_id + self.n_professors + self.n_students))
+        for user_id in self.professor_ids + self.student_ids:
+            professor = user_id < self.student_ids[0]
+            prefix = "P" if professor else "S"
+            created = self.epoch - timedelta(days=rng.uniform(30, 4 * 365))
+            last_login = created + timedelta(days=rng.uniform(0, (self.epoch - created).days)) \
+                if rng.random() < 0.8 else None
+            out.write((
+                user_id, f"{prefix}{user_id:08d}", f"{prefix.lower()}{user_id}", self.password_hash,
+                self.person(), f"{prefix.lower()}{user_id}@university.edu",
+                "professor" if professor else "student",
+                f"{rng.choice(('Mon', 'Tue', 'Wed', 'Thu', 'Fri'))} {rng.randint(9, 16)}:00" if professor else None,
+                self.admin_id, ts(created), ts(last_login) if last_login else None,
+                "t" if rng.random() < 0.98 else "f",
+            ))
+
+    # ---- classes and everything hanging off them ----
+
+    def classes(self):
+        rng = self.rng
+        args = self.args
+        classes = self.spool("classes", (
+            "id", "class_code", "title", "description", "professor_id", "term", "schedule", "location",
+            "max_students", "is_active", "created_at",
+        ))
+        enrollments = self.spool("enrollments", ("class_id", "student_id", "enrolled_at", "status", "grade"))
+        tas = self.spool("ta_assignments", ("class_id", "ta_id", "assigned_by", "assigned_at"))
+        content = self.spool("course_content", (
+            "id", "class_id", "title", "content_type", "description", "content", "visibility",
+            "created_by", "created_at", "updated_at", "due_date",
+        ))
+        doubts = self.spool("student_doubts", (
+            "class_id", "student_id", "ta_id", "question", "answer", "status", "created_at", "answered_at",
+        ))
+
+        # Zipf over a shuffled order, so size doesn't track class id
+        weights = zipf_weights(self.n_classes, args.zipf_exponent)
+        rng.shuffle(weights)
+        total_weight = sum(weights)
+        # Content and questions grow sublinearly with class size
+        activity = [w ** 0.5 for w in weights]
+        activity_cumulative = list(itertools.accumulate(activity))
+        content_per_class = [0] * self.n_classes
+        doubts_per_class = [0] * self.n_classes
+        for _ in range(self.n_content):
+            content_per_class[bisect.bisect(activity_cumulative, rng.random() * activity_cumulative[-1])] += 1
+        for _ in range(self.n_doubts):
+            doubts_per_class[bisect.bisect(activity_cumulative, rng.random() * activity_cumulative[-1])] += 1
+
+        current_term = (args.epoch.year - args.first_year) * len(TERMS) + \
+            max(i for i, s in enumerate(TERMS) if TERM_START_MONTH[s] <= args.epoch.month)
+        content_id = self.offsets["course_content"]
+        class_id = self.offsets["classes"]
+        for index in range(self.n_classes):
+            class_id += 1
+            size = min(self.n_students, max(3, round(self.n_enrollments * weights[index] / total_weight)))
+            term_index = rng.randint(max(0, current_term - args.terms + 1), current_term)
+            season, start = term_start(term_index, args.first_year)
+            start = datetime.combine(start, datetime.min.time())
+            finished = term_index < current_term
+            subject = rng.choice(SUBJECTS)
+            professor_id = rng.choice(self.professor_ids)
+            classes.write((
+                class_id, f"C{class_id:07d}", f"{subject} {100 + index % 400}",
+                f"{subject} for {season.lower()} {start.year}", professor_id,
+                f"{season} {start.year}",
+                f"{rng.choice(('MWF', 'TTh', 'MW'))} {rng.randint(8, 17)}:{rng.choice(('00', '30'))}",
+                f"Building {rng.randint(1, 40)}, Room {rng.randint(100, 450)}",
+                max(size, 30), "f" if finished else "t", ts(start - timedelta(days=rng.uniform(30, 90))),
+            ))
+
+            roster = rng.sample(self.student_ids, size)
+            for student_id in roster:
+                status = "completed" if finished else ("dropped" if rng.random() < 0.05 else "active")
+                enrollments.write((
+                    class_id, student_id, ts(start - timedelta(days=rng.uniform(0, 60))), status,
+                    rng.choice(("A", "A-", "B+", "B", "B-", "C+", "C", "D", "F")) if status == "completed" else None,
+                ))
+
+            # Larger classes get more TAs, drawn from their own students
+            ta_ids = roster[:min(len(roster) // 40 + (1 if size >= 20 else 0), 6)]
+            for ta_id in ta_ids:
+                tas.write((class_id, ta_id, professor_id, ts(start + timedelta(days=rng.uniform(0, 7)))))
+
+            content_id = self._content(content, class_id, professor_id, ta_ids, start,
+                                       content_per_class[index], content_id)
+            self._doubts(doubts, class_id, roster, ta_ids, start, doubts_per_class[index])
+
+    def _content(self, out, class_id, professor_id, ta_ids, start, count, content_id):
+        """Write `count` items in bursts spread over the term."""
+        rng = self.rng
+        remaining = count
+        while remaining:
+            # A burst: several uploads minutes apart, often right before a deadline
+            burst = min(remaining, max(1, int(rng.expovariate(1 / 4))))
+            moment = start + timedelta(days=rng.uniform(0, TERM_WEEKS * 7))
+            author = rng.choice(ta_ids) if ta_ids and rng.random() < 0.2 else professor_id
+            for _ in range(burst):
+                content_id += 1
+                moment += timedelta(minutes=rng.expovariate(1 / 6))
+                kind = rng.choices(CONTENT_TYPES, CONTENT_TYPE_WEIGHTS)[0]
+                due = moment + timedelta(days=rng.choice((3, 7, 7, 14, 21))) if kind == "assignment" else None
+                if due is not None:
+                    due = min(due, start + timedelta(weeks=TERM_WEEKS))
+                week = int((moment - start).days // 7) + 1
+                updated = moment + timedelta(hours=rng.expovariate(1 / 48)) if rng.random() < 0.3 else moment
+                out.write((
+                    content_id, class_id, f"Week {week} {kind}: {rng.choice(WORDS)} {rng.choice(WORDS)}", kind,
+                    " ".join(rng.choices(WORDS, k=rng.randint(8, 40))), self.body(),
+                    rng.choices(VISIBILITIES, VISIBILITY_WEIGHTS)[0], author, ts(moment), ts(updated),
+                    ts(due) if due else None,
+                ))
+            remaining -= burst
+        return content_id
+
+    def _doubts(self, out, class_id, roster, ta_ids, start, count):
+        rng = self.rng
+        for _ in range(count):
+            asked = start + timedelta(days=rng.uniform(0, TERM_WEEKS * 7))
+            ta_id = rng.choice(ta_ids) if ta_ids else None
+            # Classes without TAs have nobody to answer
+            status = rng.choices(("pending", "answered", "closed"), (25, 55, 20))[0] if ta_id else "pending"
+            answered = asked + timedelta(hours=rng.expovariate(1 / 20)) if status != "pending" else None
+            out.write((
+                class_id, rng.choice(roster), ta_id, rng.choice(QUESTIONS).format(n=rng.randint(1, 12)),
+                " ".join(rng.choices(WORDS, k=rng.randint(15, 80))) if answered else None,
+                status, ts(asked), ts(answered) if answered else None,
+            ))
+
+    def pending_registrations(self):
+        rng = self.rng
+        out = self.spool("pending_registrations", (
+            "university_id", "username", "password", "name", "email", "requested_role",
+            "status", "reason", "requested_at", "reviewed_by", "reviewed_at",
+        ))
+        base = self.offsets["pending_registrations"]
+        for n in range(base + 1, base + self.n_pending + 1):
+            requested = self.epoch - timedelta(days=rng.expovariate(1 / 20))
+            status = rng.choices(("pending", "approved", "rejected"), (40, 45, 15))[0]
+            reviewed = status != "pending"
+            out.write((
+                f"R{n:08d}", f"r{n}", self.password_hash, self.person(), f"r{n}@university.edu",
+                rng.choices(("student", "professor", "ta"), (90, 3, 7))[0], status,
+                "Duplicate or unverifiable identity" if status == "rejected" else None,
+                ts(requested), self.admin_id if reviewed else None,
+                ts(requested + timedelta(hours=rng.expovariate(1 / 30))) if reviewed else None,
+            ))
+
+    def generate(self):
+        self.users()
+        self.classes()
+        self.pending_registrations()
+        return [self.spools[table] for table in TABLES]
+
+
+# ---------------------------------------------------------------- loading
+
+SECONDARY_INDEXES = """
+    SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+    FROM pg_index i
+    JOIN pg_class t ON t.oid = i.indrelid
+    WHERE t.relname = ANY(%s)
+      AND t.relnamespace = 'public'::regnamespace
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+"""
+
+
+def offsets_of(cursor):
+    offsets = {}
+    for table in TABLES:
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+        offsets[table] = cursor.fetchone()[0]
+    return offsets
+
+
+def truncate_keeping_admins(cursor):
+    cursor.execute("SELECT * FROM users WHERE role = 'admin' ORDER BY id")
+    columns = [d[0] for d in cursor.description]
+    admins = cursor.fetchall()
+    cursor.execute(f"TRUNCATE {', '.join(TABLES)}, revoked_tokens RESTART IDENTITY CASCADE")
+    for admin in admins:
+        cursor.execute(
+            f"INSERT INTO users ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})", admin
+        )
+
+
+def step(label, started):
+    print(f"{label:<28} {time.perf_counter() - started:8.1f} s", file=sys.stderr)
+    return time.perf_counter()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--rows", type=int, default=100_000, help="approximate rows across all tables (1k-10M)")
+    parser.add_argument("--seed", type=int, default=412)
+    parser.add_argument("--truncate", action="store_true",
+                        help="empty the generated tables first (admin accounts are kept)")
+    parser.add_argument("--epoch", type=date.fromisoformat, default=date(2025, 10, 1),
+                        help="'today' for the generated data")
+    parser.add_argument("--first-year", type=int, default=2022, help="year of the earliest term")
+    parser.add_argument("--terms", type=int, default=6, help="terms of history up to the epoch")
+    parser.add_argument("--zipf-exponent", type=float, default=1.1, help="skew of class sizes")
+    parser.add_argument("--median-body-bytes", type=int, default=600)
+    parser.add_argument("--large-body-fraction", type=float, default=0.005,
+                        help="share of content bodies between 32 KB and --max-body-kb")
+    parser.add_argument("--max-body-kb", type=int, default=256)
+    parser.add_argument("--password", default="password123", help="password of every generated account")
+    parser.add_argument("--bcrypt-rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    parser.add_argument("--maintenance-work-mem", default="512MB", help="for the index rebuild")
+    args = parser.parse_args()
+    if not 1_000 <= args.rows <= 10_000_000:
+        parser.error("--rows must be between 1000 and 10000000")
+
+    connection = psycopg2.connect(args.database_url.replace("postgresql+psycopg2://", "postgresql://"))
+    connection.set_client_encoding("UTF8")
+    started = time.perf_counter()
+    try:
+        with connection, connection.cursor() as cursor:
+            if args.truncate:
+                truncate_keeping_admins(cursor)
+            cursor.execute("SELECT MIN(id) FROM users WHERE role = 'admin'")
+            admin_id = cursor.fetchone()[0]
+            offsets = offsets_of(cursor)
+
+            password_hash = bcrypt.hashpw(args.password.encode(), bcrypt.gensalt(args.bcrypt_rounds)).decode()
+            spools = Generator(args, offsets, admin_id, password_hash).generate()
+            started = step("generate", started)
+
+            cursor.execute(SECONDARY_INDEXES, (list(TABLES),))
+            indexes = cursor.fetchall()
+            for name, _ in indexes:
+                cursor.execute(f"DROP INDEX {name}")
+            for table in TABLES:
+                cursor.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+            for spool in spools:
+                spool.copy_into(cursor)
+                started = step(f"copy {spool.table} ({spool.rows:,})", started)
+
+            cursor.execute("SET LOCAL maintenance_work_mem = %s", (args.maintenance_work_mem,))
+            for _, definition in indexes:
+                cursor.execute(definition)
+            started = step(f"rebuild {len(indexes)} indexes", started)
+
+            for table in TABLES:
+                cursor.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), GREATEST((SELECT MAX(id) FROM {table}), 1))",
+                    (table,),
+                )
+            # Counters and ETag versions missed every row while the triggers were off
+            cursor.execute("SELECT reconcile_system_stats()")
+            cursor.execute(
+                "UPDATE table_versions SET version = version + 1, "
+                "changed_at = CURRENT_TIMESTAMP AT TIME ZONE 'UTC'"
+            )
+            started = step("reconcile counters", started)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {', '.join(TABLES)}")
+        step("analyze", started)
+    finally:
+        connection.close()
+
+    total = sum(spool.rows for spool in spools)
+    print(f"{total:,} rows: " + ", ".join(f"{spool.table} {spool.rows:,}" for spool in spools))
+
+
+if __name__ == "__main__":
+    main()
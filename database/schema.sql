@@ -2,6 +2,10 @@
 -- Admin-controlled system with TA role support
 
 -- Drop old tables if they exist
+DROP TABLE IF EXISTS content_events CASCADE;
+DROP TABLE IF EXISTS table_versions CASCADE;
+DROP TABLE IF EXISTS revoked_tokens CASCADE;
+DROP TABLE IF EXISTS system_stats CASCADE;
 DROP TABLE IF EXISTS student_doubts CASCADE;
 DROP TABLE IF EXISTS ta_assignments CASCADE;
 DROP TABLE IF EXISTS course_content CASCADE;
@@ -21,7 +25,7 @@ CREATE TABLE users (
     role VARCHAR(20) NOT NULL CHECK (role IN ('admin', 'professor', 'ta', 'student')),
     office_hours VARCHAR(255),
     created_by INTEGER REFERENCES users(id),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     last_login TIMESTAMP,
     is_active BOOLEAN DEFAULT true
 );
@@ -37,10 +41,12 @@ CREATE TABLE pending_registrations (
     requested_role VARCHAR(20) NOT NULL CHECK (requested_role IN ('student', 'professor', 'ta')),
     status VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'approved', 'rejected')),
     reason TEXT,
-    requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    requested_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     reviewed_by INTEGER REFERENCES users(id),
     reviewed_at TIMESTAMP,
-    UNIQUE(university_id, email)
+    -- Set when the review didn't go as asked, e.g. an approval refused because
+    -- the account already exists
+    review_note TEXT
 );
 
 -- Classes table
@@ -55,7 +61,10 @@ CREATE TABLE classes (
     location VARCHAR(100),
     max_students INTEGER DEFAULT 30,
     is_active BOOLEAN DEFAULT true,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- Denormalized child counts, maintained by triggers on enrollments/course_content
+    enrollment_count INTEGER NOT NULL DEFAULT 0,
+    content_count INTEGER NOT NULL DEFAULT 0
 );
 
 -- Enrollments table (for students)
@@ -89,9 +98,17 @@ CREATE TABLE course_content (
     content TEXT,
     visibility VARCHAR(20) DEFAULT 'private' CHECK (visibility IN ('public', 'private', 'enrolled')),
     created_by INTEGER REFERENCES users(id),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    due_date TIMESTAMP
+    due_date TIMESTAMP,
+    -- Full-text search document, recomputed by Postgres on every insert/update.
+    -- Title outranks description outranks body; the body is capped so a huge
+    -- upload can't exceed the 1MB tsvector limit and fail the insert.
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', title), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('english', left(coalesce(content, ''), 100000)), 'C')
+    ) STORED
 );
 
 -- Student doubts/questions for TAs
@@ -107,21 +124,403 @@ CREATE TABLE student_doubts (
     answered_at TIMESTAMP
 );
 
+-- Admin dashboard counters, kept current by the triggers below so the
+-- dashboard sums a few rows instead of running COUNT(*) over every table.
+-- Each counter is split into shards and a writer only touches the shard of
+-- its own backend, so concurrent inserts don't queue on one row lock until
+-- commit; a counter's value is the sum of its shards.
+CREATE TABLE system_stats (
+    stat_key VARCHAR(50) NOT NULL,
+    shard SMALLINT NOT NULL DEFAULT 0,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (stat_key, shard)
+);
+
+-- Access token deny-list. A row with a jti revokes that token (logout); a
+-- row without one revokes every token issued to user_id up to revoked_at
+-- (deactivation, password reset). Times are UTC; rows are only needed until
+-- the tokens they cover would have expired anyway.
+CREATE TABLE revoked_tokens (
+    id SERIAL PRIMARY KEY,
+    jti VARCHAR(64) UNIQUE,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    revoked_at TIMESTAMP NOT NULL DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'UTC'),
+    expires_at TIMESTAMP NOT NULL
+);
+
+-- Change counters behind the API's ETags: a conditional GET compares a few
+-- of these rows instead of re-running the list query. Times are UTC. Sharded
+-- like system_stats so concurrent writers don't queue on one row; a table's
+-- version is the sum of its shards. 'class_counts' covers the trigger-kept
+-- enrollment_count/content_count columns, which change with every enrollment
+-- and would otherwise invalidate everything that depends on 'classes'.
+CREATE TABLE table_versions (
+    table_name VARCHAR(50) NOT NULL,
+    shard SMALLINT NOT NULL DEFAULT 0,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP NOT NULL DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'UTC'),
+    PRIMARY KEY (table_name, shard)
+);
+
+INSERT INTO table_versions (table_name) VALUES ('classes'), ('class_counts'), ('course_content'), ('users');
+
+-- Change log behind the content stream (GET /api/student/content/stream),
+-- written by triggers on course_content. Streams resume from it by event id
+-- after a reconnect; rows older than CONTENT_EVENT_RETENTION_HOURS are pruned.
+-- Events are read in (txid, id) order: txid is the writing transaction, and
+-- only transactions older than every one still running are read, so no event
+-- can commit behind a reader. visibility is the state after the change (NULL
+-- once deleted), old_visibility the state before it (NULL for new content).
+-- Times are UTC.
+CREATE TABLE content_events (
+    id BIGSERIAL PRIMARY KEY,
+    txid BIGINT NOT NULL DEFAULT txid_current(),
+    content_id INTEGER NOT NULL,
+    class_id INTEGER NOT NULL,
+    kind VARCHAR(20) NOT NULL CHECK (kind IN ('created', 'updated', 'visibility_changed', 'deleted')),
+    visibility VARCHAR(20),
+    old_visibility VARCHAR(20),
+    title VARCHAR(255),
+    content_type VARCHAR(50),
+    due_date TIMESTAMP,
+    occurred_at TIMESTAMP NOT NULL DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'UTC')
+);
+
 -- Create indexes for performance
-CREATE INDEX idx_users_role ON users(role);
 CREATE INDEX idx_users_university_id ON users(university_id);
 CREATE INDEX idx_classes_professor ON classes(professor_id);
 CREATE INDEX idx_enrollments_student ON enrollments(student_id);
 CREATE INDEX idx_enrollments_class ON enrollments(class_id);
-CREATE INDEX idx_content_class ON course_content(class_id);
-CREATE INDEX idx_content_visibility ON course_content(visibility);
 CREATE INDEX idx_ta_assignments_ta ON ta_assignments(ta_id);
 CREATE INDEX idx_ta_assignments_class ON ta_assignments(class_id);
 CREATE INDEX idx_doubts_ta ON student_doubts(ta_id);
 CREATE INDEX idx_doubts_student ON student_doubts(student_id);
+CREATE INDEX idx_revoked_tokens_expires ON revoked_tokens(expires_at);
+CREATE INDEX idx_content_events_occurred ON content_events(occurred_at);
+CREATE INDEX idx_content_events_txid ON content_events(txid, id);
+
+-- Keyset pagination: list endpoints seek on (created_at, id) newest first,
+-- optionally after an equality filter on the leading column
+CREATE INDEX idx_users_created ON users(created_at DESC, id DESC);
+CREATE INDEX idx_users_role_created ON users(role, created_at DESC, id DESC);
+CREATE INDEX idx_classes_created ON classes(created_at DESC, id DESC);
+CREATE INDEX idx_content_created ON course_content(created_at DESC, id DESC);
+CREATE INDEX idx_content_class_created ON course_content(class_id, created_at DESC, id DESC);
+CREATE INDEX idx_content_visibility_created ON course_content(visibility, created_at DESC, id DESC);
+-- Student feed: one ordered seek per (class, visibility) the student can see
+CREATE INDEX idx_content_class_visibility_created ON course_content(class_id, visibility, created_at DESC, id DESC);
+CREATE INDEX idx_content_search ON course_content USING GIN (search_vector);
+CREATE INDEX idx_registrations_requested ON pending_registrations(requested_at DESC, id DESC);
+CREATE INDEX idx_registrations_status_requested ON pending_registrations(status, requested_at DESC, id DESC);
+-- Registration: at most one pending request per university ID and per email
+-- (reviewed rows don't count, so a rejected applicant may apply again), and
+-- an index probe, not a scan, to find an existing account by email
+CREATE UNIQUE INDEX idx_registrations_pending_university_id ON pending_registrations(university_id) WHERE status = 'pending';
+CREATE UNIQUE INDEX idx_registrations_pending_email ON pending_registrations(email) WHERE status = 'pending';
+CREATE INDEX idx_users_email ON users(email);
+
+-- The system_stats / table_versions shard this session writes to. Two
+-- sessions share a shard only when their backend pids collide modulo the
+-- shard count.
+CREATE OR REPLACE FUNCTION stats_shard() RETURNS SMALLINT AS $$
+    SELECT (pg_backend_pid() % 16)::SMALLINT;
+$$ LANGUAGE sql STABLE;
+
+-- Statement-level triggers: one counter update per statement, however many
+-- rows it touched (bulk inserts and cascading deletes included)
+CREATE OR REPLACE FUNCTION table_count_stats() RETURNS trigger AS $$
+DECLARE
+    delta BIGINT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT COUNT(*) INTO delta FROM new_rows;
+    ELSE
+        SELECT -COUNT(*) INTO delta FROM old_rows;
+    END IF;
+
+    IF delta <> 0 THEN
+        INSERT INTO system_stats AS s (stat_key, shard, value)
+        VALUES (TG_ARGV[0], stats_shard(), delta)
+        ON CONFLICT (stat_key, shard) DO UPDATE
+        SET value = s.value + EXCLUDED.value, updated_at = CURRENT_TIMESTAMP;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Roles are fixed at creation through the API; run reconcile_system_stats()
+-- after changing a role by hand
+CREATE OR REPLACE FUNCTION user_count_stats() RETURNS trigger AS $$
+DECLARE
+    roles TEXT[];
+    direction INTEGER;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        roles := ARRAY(SELECT role FROM new_rows);
+        direction := 1;
+    ELSE
+        roles := ARRAY(SELECT role FROM old_rows);
+        direction := -1;
+    END IF;
+
+    -- Keys in a fixed order, so two sessions sharing a shard can't deadlock
+    INSERT INTO system_stats AS s (stat_key, shard, value)
+    SELECT k.stat_key, stats_shard(), direction * COUNT(*)
+    FROM unnest(roles) AS r(role)
+    CROSS JOIN LATERAL (VALUES
+        ('total_users', r.role <> 'admin'),
+        ('total_students', r.role = 'student'),
+        ('total_professors', r.role = 'professor')
+    ) AS k(stat_key, matches)
+    WHERE k.matches
+    GROUP BY k.stat_key
+    ORDER BY k.stat_key
+    ON CONFLICT (stat_key, shard) DO UPDATE
+    SET value = s.value + EXCLUDED.value, updated_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER users_stats_insert AFTER INSERT ON users
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION user_count_stats();
+CREATE TRIGGER users_stats_delete AFTER DELETE ON users
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION user_count_stats();
+CREATE TRIGGER classes_stats_insert AFTER INSERT ON classes
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION table_count_stats('total_classes');
+CREATE TRIGGER classes_stats_delete AFTER DELETE ON classes
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION table_count_stats('total_classes');
+CREATE TRIGGER enrollments_stats_insert AFTER INSERT ON enrollments
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION table_count_stats('total_enrollments');
+CREATE TRIGGER enrollments_stats_delete AFTER DELETE ON enrollments
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION table_count_stats('total_enrollments');
+CREATE TRIGGER content_stats_insert AFTER INSERT ON course_content
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION table_count_stats('total_content');
+CREATE TRIGGER content_stats_delete AFTER DELETE ON course_content
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION table_count_stats('total_content');
+
+-- Keep classes.enrollment_count / content_count in step with their child
+-- tables; TG_ARGV[0] names the column to adjust
+CREATE OR REPLACE FUNCTION class_child_counts() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        EXECUTE format(
+            'UPDATE classes c SET %1$I = c.%1$I + d.n
+             FROM (SELECT class_id, COUNT(*) AS n FROM new_rows GROUP BY class_id) d
+             WHERE c.id = d.class_id', TG_ARGV[0]);
+    ELSE
+        EXECUTE format(
+            'UPDATE classes c SET %1$I = c.%1$I - d.n
+             FROM (SELECT class_id, COUNT(*) AS n FROM old_rows GROUP BY class_id) d
+             WHERE c.id = d.class_id', TG_ARGV[0]);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER enrollments_class_count_insert AFTER INSERT ON enrollments
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION class_child_counts('enrollment_count');
+CREATE TRIGGER enrollments_class_count_delete AFTER DELETE ON enrollments
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION class_child_counts('enrollment_count');
+CREATE TRIGGER content_class_count_insert AFTER INSERT ON course_content
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION class_child_counts('content_count');
+CREATE TRIGGER content_class_count_delete AFTER DELETE ON course_content
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION class_child_counts('content_count');
+
+-- Bump a version (the table's own unless named by the trigger argument) once
+-- per statement that changed it, deletes and truncates included (which a
+-- max(updated_at) probe would miss)
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_versions AS v (table_name, shard, version)
+    VALUES (COALESCE(TG_ARGV[0], TG_TABLE_NAME), stats_shard(), 1)
+    ON CONFLICT (table_name, shard) DO UPDATE
+    SET version = v.version + 1, changed_at = CURRENT_TIMESTAMP AT TIME ZONE 'UTC';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Every column but the child counts, which class_child_counts() rewrites on
+-- each enrollment or content insert/delete; those bump 'class_counts'
+CREATE TRIGGER classes_version
+    AFTER INSERT OR DELETE OR TRUNCATE
+    OR UPDATE OF class_code, title, description, professor_id, term, schedule, location, max_students,
+                 is_active, created_at
+    ON classes
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+CREATE TRIGGER classes_counts_version AFTER UPDATE OF enrollment_count, content_count ON classes
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version('class_counts');
+CREATE TRIGGER content_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON course_content
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+-- Responses only carry user names; last_login and password rehash writes
+-- must not invalidate every cached list
+CREATE TRIGGER users_version AFTER INSERT OR DELETE OR TRUNCATE OR UPDATE OF name ON users
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+-- Cache invalidation bus: every API worker LISTENs on cache_invalidation and
+-- evicts what a committed statement made stale, whichever worker (or psql
+-- session) ran it. Payloads are JSON keyed by entity; for enrollments and TA
+-- assignments they list the users and classes touched, TG_ARGV[0] naming the
+-- user column. A statement touching too many rows for one payload (8000 bytes)
+-- sends "all" instead, and listeners drop the whole cache.
+CREATE OR REPLACE FUNCTION notify_cache_invalidation() RETURNS trigger AS $$
+DECLARE
+    changed TEXT;
+    payload TEXT;
+BEGIN
+    IF TG_NARGS = 0 THEN
+        payload := json_build_object('entity', TG_TABLE_NAME)::text;
+    ELSE
+        changed := CASE TG_OP
+            WHEN 'INSERT' THEN 'SELECT %1$I AS user_id, class_id FROM new_rows'
+            WHEN 'DELETE' THEN 'SELECT %1$I AS user_id, class_id FROM old_rows'
+            ELSE 'SELECT %1$I AS user_id, class_id FROM new_rows
+                  UNION SELECT %1$I AS user_id, class_id FROM old_rows'
+        END;
+        EXECUTE format(
+            'SELECT json_build_object(''entity'', $1,
+                                      ''users'', json_agg(DISTINCT c.user_id),
+                                      ''classes'', json_agg(DISTINCT c.class_id))::text
+             FROM (' || changed || ') c HAVING COUNT(*) > 0', TG_ARGV[0])
+        INTO payload USING TG_TABLE_NAME;
+    END IF;
+
+    IF payload IS NULL THEN
+        RETURN NULL;
+    END IF;
+    IF octet_length(payload) > 7900 THEN
+        payload := json_build_object('entity', TG_TABLE_NAME, 'all', true)::text;
+    END IF;
+    PERFORM pg_notify('cache_invalidation', payload);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- New deny-list rows, so workers reject the tokens now instead of at their
+-- next full reload. revoked_at is UTC, as the API compares it.
+CREATE OR REPLACE FUNCTION notify_token_revocation() RETURNS trigger AS $$
+DECLARE
+    payload TEXT;
+BEGIN
+    SELECT json_build_object(
+               'entity', 'revoked_tokens',
+               'jtis', COALESCE(json_agg(jti) FILTER (WHERE jti IS NOT NULL), '[]'),
+               'cutoffs', COALESCE(json_object_agg(user_id, EXTRACT(EPOCH FROM revoked_at))
+                                   FILTER (WHERE jti IS NULL), '{}')
+           )::text
+    INTO payload
+    FROM new_rows
+    HAVING COUNT(*) > 0;
+
+    IF payload IS NULL THEN
+        RETURN NULL;
+    END IF;
+    IF octet_length(payload) > 7900 THEN
+        payload := json_build_object('entity', 'revoked_tokens', 'all', true)::text;
+    END IF;
+    PERFORM pg_notify('cache_invalidation', payload);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow one event per trigger, hence three per table
+CREATE TRIGGER enrollments_invalidate_insert AFTER INSERT ON enrollments
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation('student_id');
+CREATE TRIGGER enrollments_invalidate_update AFTER UPDATE ON enrollments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation('student_id');
+CREATE TRIGGER enrollments_invalidate_delete AFTER DELETE ON enrollments
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation('student_id');
+CREATE TRIGGER ta_assignments_invalidate_insert AFTER INSERT ON ta_assignments
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation('ta_id');
+CREATE TRIGGER ta_assignments_invalidate_update AFTER UPDATE ON ta_assignments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation('ta_id');
+CREATE TRIGGER ta_assignments_invalidate_delete AFTER DELETE ON ta_assignments
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation('ta_id');
+-- Identical notifications within a transaction are delivered once, so a
+-- transaction that bumps several counters costs a single message
+CREATE TRIGGER system_stats_invalidate AFTER INSERT OR UPDATE OR DELETE ON system_stats
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation();
+CREATE TRIGGER revoked_tokens_invalidate AFTER INSERT ON revoked_tokens
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION notify_token_revocation();
+
+-- One content_events row per changed course_content row, then a NOTIFY on
+-- content_events so every worker's stream hub reads the new rows
+CREATE OR REPLACE FUNCTION record_content_events() RETURNS trigger AS $$
+DECLARE
+    recorded INTEGER;
+BEGIN
+    -- No lock: ids may commit out of order, which readers allow for by
+    -- ordering on txid (see content_events)
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO content_events (content_id, class_id, kind, visibility, title, content_type, due_date)
+        SELECT id, class_id, 'created', visibility, title, content_type, due_date
+        FROM new_rows ORDER BY id;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO content_events (content_id, class_id, kind, visibility, old_visibility, title, content_type, due_date)
+        SELECT n.id, n.class_id,
+               CASE WHEN n.visibility IS DISTINCT FROM o.visibility THEN 'visibility_changed' ELSE 'updated' END,
+               n.visibility, o.visibility, n.title, n.content_type, n.due_date
+        FROM new_rows n JOIN old_rows o ON o.id = n.id ORDER BY n.id;
+    ELSE
+        INSERT INTO content_events (content_id, class_id, kind, old_visibility, title, content_type, due_date)
+        SELECT id, class_id, 'deleted', visibility, title, content_type, due_date
+        FROM old_rows ORDER BY id;
+    END IF;
+
+    GET DIAGNOSTICS recorded = ROW_COUNT;
+    IF recorded > 0 THEN
+        PERFORM pg_notify('content_events', '');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER content_events_insert AFTER INSERT ON course_content
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION record_content_events();
+CREATE TRIGGER content_events_update AFTER UPDATE ON course_content
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION record_content_events();
+CREATE TRIGGER content_events_delete AFTER DELETE ON course_content
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION record_content_events();
+
+-- Rebuild every counter (dashboard totals and per-class counts) from scratch,
+-- folding each dashboard counter's shards back into shard 0. Writers are
+-- blocked while it counts so no concurrent trigger update can be lost between
+-- the count and the write.
+CREATE OR REPLACE FUNCTION reconcile_system_stats() RETURNS void AS $$
+BEGIN
+    LOCK TABLE users, classes, enrollments, course_content IN SHARE MODE;
+
+    DELETE FROM system_stats WHERE shard <> 0;
+    INSERT INTO system_stats (stat_key, shard, value, updated_at)
+    SELECT v.stat_key, 0, v.value, CURRENT_TIMESTAMP
+    FROM (VALUES
+        ('total_users', (SELECT COUNT(*) FROM users WHERE role != 'admin')),
+        ('total_students', (SELECT COUNT(*) FROM users WHERE role = 'student')),
+        ('total_professors', (SELECT COUNT(*) FROM users WHERE role = 'professor')),
+        ('total_classes', (SELECT COUNT(*) FROM classes)),
+        ('total_enrollments', (SELECT COUNT(*) FROM enrollments)),
+        ('total_content', (SELECT COUNT(*) FROM course_content))
+    ) AS v(stat_key, value)
+    ON CONFLICT (stat_key, shard) DO UPDATE
+    SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at;
+
+    UPDATE classes c
+    SET enrollment_count = COALESCE(e.n, 0), content_count = COALESCE(cc.n, 0)
+    FROM classes base
+    LEFT JOIN (SELECT class_id, COUNT(*) AS n FROM enrollments GROUP BY class_id) e ON e.class_id = base.id
+    LEFT JOIN (SELECT class_id, COUNT(*) AS n FROM course_content GROUP BY class_id) cc ON cc.class_id = base.id
+    WHERE c.id = base.id
+      AND (c.enrollment_count, c.content_count) IS DISTINCT FROM (COALESCE(e.n, 0), COALESCE(cc.n, 0));
+END;
+$$ LANGUAGE plpgsql;
 
 -- Insert default admin account
 INSERT INTO users (university_id, username, password, name, email, role, created_by, is_active)
 VALUES ('ADMIN001', 'admin', 'admin123', 'System Administrator', 'admin@university.edu', 'admin', NULL, true);
 
+SELECT reconcile_system_stats();
+
 SELECT 'Schema created successfully with TA role!' as message;
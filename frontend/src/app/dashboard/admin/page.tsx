@@ -4,6 +4,7 @@ import { useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
 import { Users, BookOpen, GraduationCap, FileText, TrendingUp, LogOut, Plus, Edit2, Trash2, Eye } from 'lucide-react';
 import { api } from '@/lib/api';
+import { usePagedList } from '@/lib/usePagedList';
 
 interface DashboardStats {
   total_users: number;
@@ -68,10 +69,14 @@ export default function AdminDashboard() {
   const router = useRouter();
   const [activeTab, setActiveTab] = useState<'overview' | 'users' | 'classes' | 'enrollments' | 'content' | 'pending'>('overview');
   const [stats, setStats] = useState<DashboardStats | null>(null);
-  const [users, setUsers] = useState<User[]>([]);
-  const [classes, setClasses] = useState<Class[]>([]);
-  const [content, setContent] = useState<Content[]>([]);
-  const [pendingRegistrations, setPendingRegistrations] = useState<PendingRegistration[]>([]);
+  const userList = usePagedList<User>('users', (page) => api.getAllUsers(undefined, page));
+  const classList = usePagedList<Class>('classes', (page) => api.getAllClasses(page));
+  const contentList = usePagedList<Content>('content', (page) => api.getAllContent(page));
+  const pendingList = usePagedList<PendingRegistration>('registrations', (page) => api.getPendingRegistrations('pending', page));
+  const users = userList.items;
+  const classes = classList.items;
+  const content = contentList.items;
+  const pendingRegistrations = pendingList.items;
   const [loading, setLoading] = useState(true);
 
   // User creation modal
@@ -119,17 +124,13 @@ export default function AdminDashboard() {
       const dashboardData = await api.getAdminDashboard();
       setStats(dashboardData);
 
-      const [usersData, classesData, contentData, pendingData] = await Promise.all([
-        api.getAllUsers(),
-        api.getAllClasses(),
-        api.getAllContent(),
-        api.getPendingRegistrations('pending'),
+      // Each list starts again from its first page
+      await Promise.all([
+        userList.reload(),
+        classList.reload(),
+        contentList.reload(),
+        pendingList.reload(),
       ]);
-
-      setUsers(usersData.users || []);
-      setClasses(classesData.classes || []);
-      setContent(contentData.content || []);
-      setPendingRegistrations(pendingData.registrations || []);
     } catch (error: any) {
       console.error('Error fetching dashboard data:', error);
       if (error.response?.status === 401) {
@@ -324,7 +325,7 @@ export default function AdminDashboard() {
             <nav className="flex space-x-8 px-6">
               {[
                 { id: 'overview', label: 'Overview' },
-                { id: 'pending', label: `Pending (${pendingRegistrations.length})` },
+                { id: 'pending', label: `Pending (${pendingRegistrations.length}${pendingList.hasMore ? '+' : ''})` },
                 { id: 'users', label: 'Users' },
                 { id: 'classes', label: 'Classes' },
                 { id: 'enrollments', label: 'Enrollments' },
@@ -384,7 +385,7 @@ export default function AdminDashboard() {
               <div>
                 <div className="flex justify-between items-center mb-4">
                   <h2 className="text-xl font-semibold text-neutral-900">
-                    Pending Registration Requests ({pendingRegistrations.length})
+                    Pending Registration Requests ({pendingRegistrations.length}{pendingList.hasMore ? '+' : ''})
                   </h2>
                 </div>
 
@@ -462,6 +463,17 @@ export default function AdminDashboard() {
                     ))}
                   </div>
                 )}
+                {pendingList.hasMore && (
+                  <div className="flex justify-center mt-4">
+                    <button
+                      onClick={pendingList.loadMore}
+                      disabled={pendingList.loadingMore}
+                      className="btn btn-secondary"
+                    >
+                      {pendingList.loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
 
@@ -469,7 +481,7 @@ export default function AdminDashboard() {
             {activeTab === 'users' && (
               <div>
                 <div className="flex justify-between items-center mb-4">
-                  <h2 className="text-xl font-semibold text-neutral-900">All Users ({users.length})</h2>
+                  <h2 className="text-xl font-semibold text-neutral-900">All Users ({users.length}{userList.hasMore ? '+' : ''})</h2>
                   <button
                     onClick={() => setShowCreateUserModal(true)}
                     className="btn btn-primary"
@@ -518,6 +530,17 @@ export default function AdminDashboard() {
                     </tbody>
                   </table>
                 </div>
+                {userList.hasMore && (
+                  <div className="flex justify-center mt-4">
+                    <button
+                      onClick={userList.loadMore}
+                      disabled={userList.loadingMore}
+                      className="btn btn-secondary"
+                    >
+                      {userList.loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
 
@@ -525,7 +548,7 @@ export default function AdminDashboard() {
             {activeTab === 'classes' && (
               <div>
                 <div className="flex justify-between items-center mb-4">
-                  <h2 className="text-xl font-semibold text-neutral-900">All Classes ({classes.length})</h2>
+                  <h2 className="text-xl font-semibold text-neutral-900">All Classes ({classes.length}{classList.hasMore ? '+' : ''})</h2>
                   <button
                     onClick={() => setShowCreateClassModal(true)}
                     className="btn btn-primary"
@@ -568,6 +591,17 @@ export default function AdminDashboard() {
                     </tbody>
                   </table>
                 </div>
+                {classList.hasMore && (
+                  <div className="flex justify-center mt-4">
+                    <button
+                      onClick={classList.loadMore}
+                      disabled={classList.loadingMore}
+                      className="btn btn-secondary"
+                    >
+                      {classList.loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
 
@@ -611,7 +645,7 @@ export default function AdminDashboard() {
             {activeTab === 'content' && (
               <div>
                 <div className="flex justify-between items-center mb-4">
-                  <h2 className="text-xl font-semibold text-neutral-900">All Course Content ({content.length})</h2>
+                  <h2 className="text-xl font-semibold text-neutral-900">All Course Content ({content.length}{contentList.hasMore ? '+' : ''})</h2>
                 </div>
                 <div className="overflow-x-auto">
                   <table className="w-full">
@@ -664,6 +698,17 @@ export default function AdminDashboard() {
                     </tbody>
                   </table>
                 </div>
+                {contentList.hasMore && (
+                  <div className="flex justify-center mt-4">
+                    <button
+                      onClick={contentList.loadMore}
+                      disabled={contentList.loadingMore}
+                      className="btn btn-secondary"
+                    >
+                      {contentList.loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
           </div>
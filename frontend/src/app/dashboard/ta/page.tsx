@@ -4,12 +4,14 @@ import { useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
 import { BookOpen, FileText, Users, LogOut, Plus, Edit2, Trash2 } from 'lucide-react';
 import { api } from '@/lib/api';
+import { usePagedList } from '@/lib/usePagedList';
 
 export default function TADashboard() {
   const router = useRouter();
   const [activeTab, setActiveTab] = useState<'classes' | 'content'>('classes');
   const [classes, setClasses] = useState<any[]>([]);
-  const [content, setContent] = useState<any[]>([]);
+  const contentList = usePagedList<any>('content', (page) => api.getProfessorContent(page));
+  const content = contentList.items;
   const [loading, setLoading] = useState(true);
 
   // Content creation modal
@@ -30,13 +32,12 @@ export default function TADashboard() {
 
   const fetchDashboardData = async () => {
     try {
-      const [classesData, contentData] = await Promise.all([
+      const [classesData] = await Promise.all([
         api.getProfessorClasses(), // TAs use same endpoint
-        api.getProfessorContent(),  // TAs use same endpoint
+        contentList.reload(),      // TAs use same endpoint
       ]);
 
       setClasses(classesData.classes || []);
-      setContent(contentData.content || []);
     } catch (error: any) {
       console.error('Error fetching dashboard data:', error);
       if (error.response?.status === 401) {
@@ -196,7 +197,7 @@ export default function TADashboard() {
               <div>
                 <div className="flex justify-between items-center mb-4">
                   <h2 className="text-xl font-semibold text-neutral-900">
-                    Course Content ({content.length})
+                    Course Content ({content.length}{contentList.hasMore ? '+' : ''})
                   </h2>
                   <button
                     onClick={() => setShowCreateContentModal(true)}
@@ -267,6 +268,17 @@ export default function TADashboard() {
                     </table>
                   </div>
                 )}
+                {contentList.hasMore && (
+                  <div className="flex justify-center mt-4">
+                    <button
+                      onClick={contentList.loadMore}
+                      disabled={contentList.loadingMore}
+                      className="btn btn-secondary"
+                    >
+                      {contentList.loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
           </div>
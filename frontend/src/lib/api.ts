@@ -2,6 +2,19 @@ import axios, { AxiosError, AxiosInstance } from 'axios';
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
+// List endpoints are cursor-paginated: pass the previous response's next_cursor as `after`
+export interface PageParams {
+  limit?: number;
+  after?: string;
+}
+
+function pageParams(page?: PageParams) {
+  const params = new URLSearchParams();
+  if (page?.limit) params.append('limit', String(page.limit));
+  if (page?.after) params.append('after', page.after);
+  return params;
+}
+
 class ApiClient {
   private client: AxiosInstance;
 
@@ -77,9 +90,10 @@ class ApiClient {
     return response.data;
   }
 
-  async getAllUsers(role?: string) {
-    const params = role ? `?role=${role}` : '';
-    const response = await this.client.get(`/api/admin/users${params}`);
+  async getAllUsers(role?: string, page?: PageParams) {
+    const params = pageParams(page);
+    if (role) params.append('role', role);
+    const response = await this.client.get(`/api/admin/users?${params.toString()}`);
     return response.data;
   }
 
@@ -111,8 +125,9 @@ class ApiClient {
     return response.data;
   }
 
-  async getAllClasses() {
-    const response = await this.client.get('/api/admin/classes');
+  async getAllClasses(page?: PageParams) {
+    const params = pageParams(page);
+    const response = await this.client.get(`/api/admin/classes?${params.toString()}`);
     return response.data;
   }
 
@@ -147,7 +162,7 @@ class ApiClient {
     class_id?: number;
     content_type?: string;
     visibility?: string;
-  }) {
+  } & PageParams) {
     const params = new URLSearchParams();
     if (filters) {
       Object.entries(filters).forEach(([key, value]) => {
@@ -165,9 +180,10 @@ class ApiClient {
     return response.data;
   }
 
-  async getPendingRegistrations(status?: string) {
-    const params = status ? `?status=${status}` : '';
-    const response = await this.client.get(`/api/admin/pending-registrations${params}`);
+  async getPendingRegistrations(status?: string, page?: PageParams) {
+    const params = pageParams(page);
+    if (status) params.append('status', status);
+    const response = await this.client.get(`/api/admin/pending-registrations?${params.toString()}`);
     return response.data;
   }
 
@@ -206,7 +222,7 @@ class ApiClient {
   async getProfessorContent(filters?: {
     class_id?: number;
     content_type?: string;
-  }) {
+  } & PageParams) {
     const params = new URLSearchParams();
     if (filters) {
       Object.entries(filters).forEach(([key, value]) => {
@@ -266,7 +282,7 @@ class ApiClient {
     class_id?: number;
     content_type?: string;
     visibility?: string;
-  }) {
+  } & PageParams) {
     const params = new URLSearchParams();
     if (filters) {
       Object.entries(filters).forEach(([key, value]) => {
@@ -277,8 +293,10 @@ class ApiClient {
     return response.data;
   }
 
-  async getContentDetails(contentId: number) {
-    const response = await this.client.get(`/api/student/content/${contentId}`);
+  async getContentDetails(contentId: number, preview?: number) {
+    const params = new URLSearchParams();
+    if (preview) params.append('preview', String(preview));
+    const response = await this.client.get(`/api/student/content/${contentId}?${params.toString()}`);
     return response.data;
   }
 
@@ -291,6 +309,21 @@ class ApiClient {
     const response = await this.client.get('/api/student/dashboard');
     return response.data;
   }
+
+  // ==================== Search ====================
+  async searchContent(q: string, filters?: {
+    class_id?: number;
+    content_type?: string;
+  } & PageParams) {
+    const params = new URLSearchParams({ q });
+    if (filters) {
+      Object.entries(filters).forEach(([key, value]) => {
+        if (value) params.append(key, String(value));
+      });
+    }
+    const response = await this.client.get(`/api/content/search?${params.toString()}`);
+    return response.data;
+  }
 }
 
 export const api = new ApiClient();
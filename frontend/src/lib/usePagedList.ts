@@ -0,0 +1,41 @@
+import { useCallback, useRef, useState } from 'react';
+import type { PageParams } from './api';
+
+// Accumulates a cursor-paginated list endpoint. `key` names the array in the
+// response ('users', 'classes', ...); reload() starts over from the first page
+// and loadMore() appends the page after the last one loaded.
+export function usePagedList<T>(key: string, fetchPage: (page: PageParams) => Promise<any>) {
+  const [items, setItems] = useState<T[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const fetchRef = useRef(fetchPage);
+  fetchRef.current = fetchPage;
+  // Bumped by reload() so a loadMore() still in flight doesn't append to the new list
+  const generation = useRef(0);
+
+  const reload = useCallback(async () => {
+    const current = ++generation.current;
+    const data = await fetchRef.current({});
+    if (current !== generation.current) return;
+    setItems(data[key] || []);
+    setNextCursor(data.next_cursor ?? null);
+  }, [key]);
+
+  const loadMore = useCallback(async () => {
+    if (!nextCursor || loadingMore) return;
+    const current = generation.current;
+    setLoadingMore(true);
+    try {
+      const data = await fetchRef.current({ after: nextCursor });
+      if (current !== generation.current) return;
+      setItems((loaded) => [...loaded, ...(data[key] || [])]);
+      setNextCursor(data.next_cursor ?? null);
+    } catch (error) {
+      console.error(`Error loading more ${key}:`, error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [key, nextCursor, loadingMore]);
+
+  return { items, hasMore: nextCursor !== null, loadingMore, reload, loadMore };
+}